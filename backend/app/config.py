@@ -1,3 +1,4 @@
+from decimal import Decimal
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -10,9 +11,85 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     ENCRYPTION_KEY: str
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+
     BASE_RPC_URL: str = "https://sepolia.base.org"
     BASE_CHAIN_ID: int = 84532
     CONTRACT_ADDRESS: str = "your_contract_address"
+    RPC_POOL_SIZE: int = 20
+    RPC_TIMEOUT: float = 10.0
+    # Requests to chain-touching endpoints allowed in progress at once, per worker
+    RPC_MAX_IN_FLIGHT: int = 64
+    CHAIN_CACHE_MAX_AGE: float = 4.0
+    CHAIN_CACHE_POLL_INTERVAL: float = 1.0
+    GAS_CODE_CACHE_SIZE: int = 10000
+    GAS_CODE_CACHE_TTL: float = 3600.0
+    BALANCE_CACHE_SIZE: int = 50000
+    BALANCE_CACHE_TTL: float = 2.0
+    BULK_BALANCE_MAX_ADDRESSES: int = 500
+    BULK_BALANCE_CHUNK_SIZE: int = 100
+    BULK_BALANCE_CONCURRENCY: int = 4
+    ACCOUNT_CACHE_ENABLED: bool = False
+    ACCOUNT_CACHE_SIZE: int = 1000
+    ACCOUNT_CACHE_TTL: float = 60.0
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    WALLET_POOL_SIZE: int = 1000
+    WALLET_POOL_LOW_WATER: int = 250
+    WALLET_POOL_BATCH_SIZE: int = 200
+    WALLET_POOL_REFILL_INTERVAL: float = 30.0
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_SWEEP_INTERVAL: float = 15.0
+    OUTBOX_REBROADCAST_AFTER: float = 60.0
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    # A nonce counter ahead of the chain with no outbox rows to show for it is rewound after this long
+    NONCE_REWIND_AFTER: float = 60.0
+    CONFIRMATION_DEPTH: int = 3
+    CONFIRMER_POLL_INTERVAL: float = 1.0
+    CONFIRMER_MAX_BLOCKS: int = 50
+    CONFIRMER_REORG_WINDOW: int = 128
+    CONFIRMER_RELOAD_INTERVAL: float = 30.0
+    # Leave unset to pay every winner with a plain transfer
+    DISPERSE_CONTRACT_ADDRESS: str = ""
+    PAYOUT_FLUSH_INTERVAL: float = 300.0
+    PAYOUT_FLUSH_SIZE: int = 200
+    PAYOUT_CLAIM_LIMIT: int = 1000
+    PAYOUT_MAX_RECIPIENTS: int = 200
+    PAYOUT_MIN_AMOUNT: Decimal = Decimal('0.0001')
+    PAYOUT_GAS_MARGIN: float = 1.2
+    LEADERBOARD_TOP_SIZE: int = 10
+    LEADERBOARD_BROADCAST_INTERVAL: float = 0.25
+    LEADERBOARD_SYNC_INTERVAL: float = 5.0
+    LEADERBOARD_SEND_TIMEOUT: float = 1.0
+    RANKINGS_REFRESH_INTERVAL: float = 10.0
+    RANKINGS_BATCH_SIZE: int = 5000
+    RANKINGS_LAG: float = 5.0
+    REPLAY_BATCH_SIZE: int = 1024
+    REPLAY_MAX_WAIT: float = 0.05
+    REPLAY_MAX_LOG_BYTES: int = 8192
+    # "memory" keeps buckets per worker; "database" shares them through rate_limit_buckets
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_USERS: int = 100000
+    RATE_LIMIT_PURGE_INTERVAL: float = 300.0
+    RATE_LIMIT_WITHDRAW_BURST: int = 3
+    RATE_LIMIT_WITHDRAW_PER_MINUTE: float = 6.0
+    RATE_LIMIT_ESTIMATE_BURST: int = 10
+    RATE_LIMIT_ESTIMATE_PER_MINUTE: float = 30.0
+    RATE_LIMIT_ENTRY_BURST: int = 3
+    RATE_LIMIT_ENTRY_PER_MINUTE: float = 6.0
+    RATE_LIMIT_BALANCES_BURST: int = 5
+    RATE_LIMIT_BALANCES_PER_MINUTE: float = 10.0
+    LOG_LEVEL: str = "INFO"
+    # Records beyond this many waiting to be written are dropped, never waited on
+    LOG_QUEUE_SIZE: int = 10000
 
     DEV_WALLET_ADDRESS: str
     TREASURY_WALLET_ADDRESS: str
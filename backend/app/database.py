@@ -1,16 +1,143 @@
-from sqlalchemy import create_engine
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from .utils.metrics import instrument_engine
+
+
+class PoolMetrics:
+    """Checkout counts and time spent waiting for a pooled connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def stats(self, pool):
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_max_ms": self.wait_max * 1000
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record(time.perf_counter() - start)
+
+
+def _async_url(url: str) -> str:
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+
+    timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    if is_async:
+        connect_args = {"server_settings": {"statement_timeout": timeout}}
+    else:
+        connect_args = {"options": f"-c statement_timeout={timeout}"}
+
+    return {
+        "poolclass": MeteredAsyncQueuePool if is_async else QueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "connect_args": connect_args
+    }
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Engines are created on first use, normally from the app's lifespan hook, so
+# importing the app neither loads DB drivers nor needs the database to be up.
+# The session factories are bound when their engine is created.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+_engine = None
+_async_engine = None
+
+def get_engine():
+    """Sync engine for schema management and scripts; request handlers use the async one."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL, is_async=False))
+        instrument_engine(_engine)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        url = _async_url(settings.DATABASE_URL)
+        _async_engine = create_async_engine(url, **_engine_options(url, is_async=True))
+        instrument_engine(_async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+async def dispose_engines():
+    global _engine, _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def create_sqlite_schema() -> str:
+    """
+    Create the tables in a scratch SQLite database, for tests and benchmarks.
+    SQLite has no schemas, so a fresh file is attached as "wonder-realm" to
+    every connection of both engines; returns its path.
+    """
+    path = os.path.join(tempfile.mkdtemp(), "wonder-realm.db")
+
+    def _attach(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"ATTACH DATABASE '{path}' AS \"wonder-realm\"")
+        cursor.close()
+
+    event.listen(get_engine(), "connect", _attach)
+    event.listen(get_async_engine().sync_engine, "connect", _attach)
+    Base.metadata.create_all(bind=get_engine())
+    return path
+
+def db_pool_stats():
+    # SQLite runs without a connection pool
+    if _async_engine is None or not isinstance(_async_engine.pool, QueuePool):
+        return {}
+    return pool_metrics.stats(_async_engine.pool)
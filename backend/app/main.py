@@ -1,15 +1,88 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import auth, wallet, game
-from .database import engine, Base
+from fastapi.responses import PlainTextResponse
+from .routes import auth, wallet, game, leaderboard
+from .database import get_async_engine, dispose_engines, db_pool_stats
 from .models.user import User
 from .models.wallet import Wallet
 from .models.game import GameEntry
+from .models.nonce import AccountNonce
+from .models.outbox import OutboundTransaction
+from .utils.rpc import create_rpc_client
+from .utils.chain_cache import create_chain_cache
+from .utils.gas import create_gas_limit_resolver
+from .utils.balance_cache import create_balance_cache
+from .utils.confirmer import create_block_confirmer
+from .utils.outbox import create_transaction_outbox
+from .utils.payouts import create_payout_engine
+from .utils.ledger import create_game_ledger
+from .utils.leaderboard import create_leaderboard
+from .utils.rankings import create_ranking_aggregator
+from .utils.replay import create_replay_verifier
+from .utils.wallet import create_wallet_pool
+from .utils.ratelimit import create_rate_limiter
+from .utils.crypto import account_cache_stats
+from .utils.auth import password_pool
+from .utils.metrics import MetricsMiddleware, registry
+from .utils.log import log_stats
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# Tables are managed by Alembic: run `alembic upgrade head` before starting
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Created here rather than at import so workers start without touching the database
+    get_async_engine()
+    # One pooled RPC client shared by every request on this worker
+    app.state.rpc = await create_rpc_client()
+    # Gas price and chain metadata, refreshed in the background every block
+    app.state.chain = create_chain_cache(app.state.rpc)
+    app.state.chain.start()
+    app.state.gas_limits = create_gas_limit_resolver()
+    app.state.balances = create_balance_cache()
+    # Follows new blocks and settles broadcast transactions
+    app.state.confirmer = create_block_confirmer(app.state.rpc, app.state.balances)
+    app.state.confirmer.start()
+    # Broadcasts queued transactions
+    app.state.outbox = create_transaction_outbox(app.state.rpc, app.state.confirmer, app.state.balances)
+    app.state.outbox.start()
+    # Pays cashed-out balances from the treasury, many winners per transaction
+    app.state.payouts = create_payout_engine(app.state.rpc, app.state.chain, app.state.outbox)
+    app.state.payouts.start()
+    # Game balances and their append-only ledger; cash-outs feed the payout engine
+    app.state.ledger = create_game_ledger(app.state.payouts)
+    # Ranked best scores pushed to WebSocket clients; replaces the Node socket.io server
+    app.state.leaderboard = create_leaderboard()
+    await app.state.leaderboard.load()
+    app.state.leaderboard.start()
+    # Folds finished games into the daily/weekly/all-time ranking tables
+    app.state.rankings = create_ranking_aggregator()
+    app.state.rankings.start()
+    # Replays finished games' input logs in batches to check claimed scores
+    app.state.replays = create_replay_verifier()
+    app.state.replays.start()
+    # Wallets generated ahead of time so registration just claims one
+    app.state.wallet_pool = create_wallet_pool()
+    app.state.wallet_pool.start()
+    # Per-user token buckets and the in-flight cap for chain-touching endpoints
+    app.state.rate_limiter = create_rate_limiter()
+    app.state.rate_limiter.start()
+    yield
+    await app.state.rate_limiter.stop()
+    await app.state.wallet_pool.stop()
+    await app.state.replays.stop()
+    await app.state.rankings.stop()
+    await app.state.leaderboard.stop()
+    await app.state.payouts.stop()
+    await app.state.outbox.stop()
+    await app.state.confirmer.stop()
+    await app.state.chain.stop()
+    await app.state.rpc.close()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -19,12 +92,42 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so latencies include CORS handling
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(wallet.router, prefix="/wallet", tags=["wallet"])
 app.include_router(game.router, prefix="/game", tags=["game"])
+app.include_router(leaderboard.router, prefix="/api", tags=["leaderboard"])
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to Wonder Realm API"}
\ No newline at end of file
+    return {"message": "Welcome to Wonder Realm API"}
+
+@app.get("/stats")
+def read_stats():
+    return {
+        "rpc_pool": app.state.rpc.pool_stats(),
+        "db_pool": db_pool_stats(),
+        "chain_cache": app.state.chain.stats(),
+        "gas_code_cache": app.state.gas_limits.stats(),
+        "balance_cache": app.state.balances.stats(),
+        "account_cache": account_cache_stats(),
+        "password_pool": password_pool.stats(),
+        "outbox": app.state.outbox.stats(),
+        "confirmer": app.state.confirmer.stats(),
+        "ledger": app.state.ledger.stats(),
+        "payouts": app.state.payouts.stats(),
+        "leaderboard": app.state.leaderboard.stats(),
+        "rankings": app.state.rankings.stats(),
+        "replays": app.state.replays.stats(),
+        "wallet_pool": app.state.wallet_pool.stats(),
+        "rate_limiter": app.state.rate_limiter.stats(),
+        "log": log_stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Prometheus text format; the /stats numbers are exported as gauges alongside
+    return PlainTextResponse(registry.render(read_stats()), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,17 @@
 from .user import User
-from .wallet import Wallet
+from .wallet import Wallet, PooledWallet
 from .game import GameEntry
+from .nonce import AccountNonce
+from .outbox import OutboundTransaction
+from .ledger import LedgerEntry
+from .result import GameResult
+from .payout import PayoutBatch
+from .leaderboard import LeaderboardScore, LeaderboardAggregate, AggregateWatermark
+from .ratelimit import RateLimitBucket
 
 # Export all models
-__all__ = ["User", "Wallet", "GameEntry"]
\ No newline at end of file
+__all__ = [
+    "User", "Wallet", "PooledWallet", "GameEntry", "AccountNonce", "OutboundTransaction", "LedgerEntry",
+    "PayoutBatch", "GameResult", "LeaderboardScore", "LeaderboardAggregate", "AggregateWatermark",
+    "RateLimitBucket"
+]
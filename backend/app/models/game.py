@@ -1,17 +1,29 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
 
 class GameEntry(Base):
     __tablename__ = "game_entries"
-    __table_args__ = {'schema': 'wonder-realm'}
+    __table_args__ = (
+        # At most one pending or active game per user; also serves the active-game lookup
+        Index(
+            'uq_game_entries_user_active', 'user_id',
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'active')"),
+            sqlite_where=text("status IN ('pending', 'active')")
+        ),
+        Index('ix_game_entries_transaction_hash', 'transaction_hash'),
+        Index('ix_game_entries_last_activity', 'last_activity'),
+        {'schema': 'wonder-realm'}
+    )
 
     id = Column(Integer, primary_key=True, nullable=False)
     user_id = Column(Integer, ForeignKey("wonder-realm.users.id"), nullable=False)
     entry_fee_amount = Column(DECIMAL(20, 18), nullable=False)
     entry_timestamp = Column(DateTime(timezone=True), server_default=func.now())
     transaction_hash = Column(String(66), nullable=False)
+    # pending -> active / failed, following the entry fee transaction; active -> completed on cash-out
     status = Column(String(20), nullable=False)
     balance = Column(DECIMAL(20, 18), nullable=False, server_default='0')
     last_activity = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DECIMAL, Date, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class LeaderboardScore(Base):
+    """Best score per player, snapshotted from the in-memory leaderboard."""
+    __tablename__ = "leaderboard_scores"
+    __table_args__ = {'schema': 'wonder-realm'}
+
+    user_id = Column(Integer, ForeignKey("wonder-realm.users.id"), primary_key=True)
+    score = Column(DECIMAL(38, 18), nullable=False)
+    # Workers poll this to pick up each other's scores
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class LeaderboardAggregate(Base):
+    """
+    Per-player totals for one ranking window: period is 'daily', 'weekly' or
+    'all', and period_start the first day it covers. Maintained incrementally
+    from game_results by the rankings aggregator.
+    """
+    __tablename__ = "leaderboard_aggregates"
+    __table_args__ = (
+        # Keyset pages of one window walk this backwards, highest total first
+        Index('ix_leaderboard_aggregates_ranking', 'period', 'period_start', 'total_score', 'user_id'),
+        {'schema': 'wonder-realm'}
+    )
+
+    period = Column(String(10), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("wonder-realm.users.id"), primary_key=True)
+    total_score = Column(DECIMAL(38, 18), nullable=False)
+    best_score = Column(DECIMAL(38, 18), nullable=False)
+    games = Column(Integer, nullable=False)
+    rewards = Column(DECIMAL(38, 18), nullable=False)
+
+
+class AggregateWatermark(Base):
+    """Highest source row id folded into an aggregate; its row lock serializes refreshes."""
+    __tablename__ = "aggregate_watermarks"
+    __table_args__ = {'schema': 'wonder-realm'}
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
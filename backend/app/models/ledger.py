@@ -0,0 +1,26 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DECIMAL, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class LedgerEntry(Base):
+    """Append-only record of every credit, debit and payout against a game entry."""
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        # Payouts still waiting to be settled on-chain
+        Index(
+            'ix_ledger_entries_unsettled', 'id',
+            postgresql_where=text("kind = 'payout' AND settlement_tx_hash IS NULL")
+        ),
+        Index('ix_ledger_entries_settlement_tx_hash', 'settlement_tx_hash'),
+        {'schema': 'wonder-realm'}
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    game_entry_id = Column(Integer, ForeignKey("wonder-realm.game_entries.id"), nullable=False, index=True)
+    # Positive for credits, negative for debits and payouts
+    amount = Column(DECIMAL(20, 18), nullable=False)
+    kind = Column(String(10), nullable=False)
+    reason = Column(String(50))
+    settlement_tx_hash = Column(String(66))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class AccountNonce(Base):
+    __tablename__ = "account_nonces"
+    __table_args__ = {'schema': 'wonder-realm'}
+
+    address = Column(String(42), primary_key=True)
+    next_nonce = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class OutboundTransaction(Base):
+    """A signed transaction waiting to be broadcast or confirmed."""
+    __tablename__ = "outbound_transactions"
+    __table_args__ = (
+        # Workers scan queued and broadcast rows in id order
+        Index('ix_outbound_transactions_status', 'status', 'id'),
+        # Nonce resyncs look at a sender's newest nonces
+        Index('ix_outbound_transactions_sender_nonce', 'sender', 'nonce'),
+        {'schema': 'wonder-realm'}
+    )
+
+    id = Column(Integer, primary_key=True)
+    game_entry_id = Column(Integer, ForeignKey("wonder-realm.game_entries.id"), index=True)
+    payout_batch_id = Column(Integer, ForeignKey("wonder-realm.payout_batches.id"), index=True)
+    sender = Column(String(42), nullable=False)
+    nonce = Column(BigInteger, nullable=False)
+    tx_hash = Column(String(66), nullable=False, unique=True)
+    raw_transaction = Column(Text, nullable=False)
+    # queued -> broadcast -> confirmed / failed
+    status = Column(String(20), nullable=False, server_default='queued')
+    attempts = Column(Integer, nullable=False, server_default='0')
+    last_error = Column(String)
+    block_number = Column(BigInteger)
+    broadcast_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    payout_batch = relationship("PayoutBatch")
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DECIMAL, DateTime, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class PayoutBatch(Base):
+    """One flush of treasury payouts and what it cost on-chain."""
+    __tablename__ = "payout_batches"
+    __table_args__ = (
+        Index('ix_payout_batches_status', 'status', 'id'),
+        {'schema': 'wonder-realm'}
+    )
+
+    id = Column(Integer, primary_key=True)
+    # disperse: one multi-recipient contract call; transfer: one plain send per recipient
+    method = Column(String(10), nullable=False)
+    recipients = Column(Integer, nullable=False)
+    amount = Column(DECIMAL(38, 18), nullable=False)
+    transactions = Column(Integer, nullable=False)
+    # queued -> confirmed / failed; a failed batch's payouts go back in the queue
+    status = Column(String(20), nullable=False, server_default='queued')
+    gas_price = Column(BigInteger, nullable=False)
+    gas_limit = Column(BigInteger, nullable=False)
+    # Filled in from receipts as the block confirmer settles the batch's transactions
+    confirmed = Column(Integer, nullable=False, server_default='0')
+    failed = Column(Integer, nullable=False, server_default='0')
+    gas_used = Column(BigInteger, nullable=False, server_default='0')
+    fee = Column(DECIMAL(38, 18), nullable=False, server_default='0')
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
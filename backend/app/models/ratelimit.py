@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Float, Index, String
+from ..database import Base
+
+
+class RateLimitBucket(Base):
+    """Token bucket shared by every worker when RATE_LIMIT_BACKEND is "database"."""
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = (
+        Index('ix_rate_limit_buckets_refilled_at', 'refilled_at'),
+        {'schema': 'wonder-realm'}
+    )
+
+    # "<route class>:<user id>"
+    key = Column(String(128), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Unix time tokens was last brought up to date
+    refilled_at = Column(Float, nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, Integer, DECIMAL, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class GameResult(Base):
+    """Outcome of a finished game, written once when it is cashed out."""
+    __tablename__ = "game_results"
+    __table_args__ = {'schema': 'wonder-realm'}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    game_entry_id = Column(Integer, ForeignKey("wonder-realm.game_entries.id"), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("wonder-realm.users.id"), nullable=False)
+    # Total credited during the game ("gold collected")
+    score = Column(DECIMAL(38, 18), nullable=False)
+    # Paid out at cash-out
+    reward = Column(DECIMAL(38, 18), nullable=False)
+    finished_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
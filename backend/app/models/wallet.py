@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from ..database import Base
 
 
@@ -8,7 +9,24 @@ class Wallet(Base):
     __table_args__ = {'schema': 'wonder-realm'}
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('wonder-realm.users.id', ondelete='CASCADE'))
+    user_id = Column(Integer, ForeignKey('wonder-realm.users.id', ondelete='CASCADE'), index=True)
     encrypted_private_key = Column(String)
     
     user = relationship("User", back_populates="wallet")
+
+
+class PooledWallet(Base):
+    """A wallet generated ahead of time, waiting to be handed to a new user."""
+    __tablename__ = "wallet_pool"
+    __table_args__ = (
+        # Registration claims the oldest unclaimed wallet
+        Index('ix_wallet_pool_available', 'id', postgresql_where=text("claimed_at IS NULL")),
+        {'schema': 'wonder-realm'}
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    address = Column(String(42), nullable=False, unique=True)
+    encrypted_private_key = Column(String, nullable=False)
+    # Set in the registering transaction; claimed rows are deleted by the next refill
+    claimed_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
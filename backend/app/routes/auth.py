@@ -1,41 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
-from app.schemas.user import User, UserCreate, UserLogin, Token
+from app.database import AsyncSessionLocal, get_db
+from app.schemas.user import User, UserCreate, Token
 from app.models.user import User as UserModel
-from app.utils.auth import verify_password, get_password_hash, create_access_token, get_current_user
+from app.utils.auth import verify_password_async, get_password_hash_async, create_access_token, get_current_user, token_claims, CurrentUser
 from app.config import settings
-from eth_account import Account
-import secrets
 from app.utils.crypto import encrypt_private_key
+from app.utils.wallet import WalletPool, create_wallet, get_wallet_pool
 from app.models.wallet import Wallet
+from app.utils.log import get_logger
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+log = get_logger(__name__)
 
 
 @router.post("/register", response_model=User)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(
+    user: UserCreate,
+    db: AsyncSession = Depends(get_db),
+    wallets: WalletPool = Depends(get_wallet_pool)
+):
+    # Hash before touching the database so no row stays locked while bcrypt runs
+    hashed_password = await get_password_hash_async(user.password)
     try:
-        # Check existing email
-        db_user = db.query(UserModel).filter(UserModel.email == user.email).first()
-        if db_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        # Check existing username
-        db_username = db.query(UserModel).filter(UserModel.username == user.username).first()
-        if db_username:
-            raise HTTPException(status_code=400, detail="Username already taken")
+        claimed = await wallets.claim(db)
+        if claimed is None:
+            # Pool ran dry: generate one inline, as before the pool existed
+            new_wallet = create_wallet()
+            wallet_address = new_wallet['address']
+            encrypted_key = encrypt_private_key(new_wallet['private_key'])
+        else:
+            wallet_address, encrypted_key = claimed
 
-        # Create wallet
-        private_key = secrets.token_hex(32)
-        account = Account.from_key(private_key)
-        wallet_address = account.address
-
-        # Create user with wallet
-        hashed_password = get_password_hash(user.password)
+        # Create user with wallet; the unique indexes on email and username do the duplicate checks
         db_user = UserModel(
             email=user.email, 
             username=user.username, 
@@ -44,24 +46,35 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
         db.add(db_user)
-        db.flush()
+        await db.flush()
 
         # Create wallet record
         wallet = Wallet(
             user_id=db_user.id,
-            encrypted_private_key=encrypt_private_key(private_key)
+            encrypted_private_key=encrypted_key
         )
         db.add(wallet)
         
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
         
         return db_user
 
+    except IntegrityError as e:
+        await db.rollback()
+        message = str(e.orig)
+        if "username" in message:
+            raise HTTPException(status_code=400, detail="Username already taken")
+        if "email" in message:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        log.error("register_integrity_error", error=message)
+        raise HTTPException(
+            status_code=500,
+            detail="Could not create user account"
+        )
+
     except Exception as e:
-        db.rollback()
-        # Add this print statement to see the error
-        print(f"Error in register: {str(e)}")
+        await db.rollback()
+        log.exception("register_failed")
         raise HTTPException(
             status_code=500,
             detail=f"Could not create user account: {str(e)}"
@@ -69,9 +82,12 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/token", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    # Read the hash on a short-lived session so the pooled connection is back
+    # in the pool while bcrypt waits for and runs on the hasher pool
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(UserModel).where(UserModel.email == form_data.username))
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -80,11 +96,11 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=User)
-async def get_profile(current_user: UserModel = Depends(get_current_user)):
+async def get_profile(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
@@ -1,17 +1,33 @@
 # game.py router
 
+import base64
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from web3 import Web3
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
+from cryptography.fernet import InvalidToken
+from pydantic import BaseModel
 
 from ..config import settings
-from ..utils.crypto import decrypt_private_key
-from ..models import GameEntry, User, Wallet
-from ..utils.auth import get_current_user
+from ..utils.crypto import signing_account
+from ..models import GameEntry, OutboundTransaction, Wallet
+from ..utils.auth import get_current_user, get_fresh_user, CurrentUser
 from ..database import get_db
+from ..utils.rpc import RPCClient, get_rpc
+from ..utils.chain_cache import ChainCache, get_chain_cache
+from ..utils.gas import GasLimitResolver, get_gas_limits
+from ..utils.preflight import run_preflight
+from ..utils.nonce import release_nonce
+from ..utils.outbox import TransactionOutbox, get_outbox, queue_transaction
+from ..utils.ledger import GameLedger, LedgerError, get_ledger
+from ..utils.replay import TICK_RATE, ReplayVerifier, get_replay_verifier, session_seed
+from ..utils.log import get_logger
+from ..utils.ratelimit import rate_limit
 
 router = APIRouter()
+log = get_logger(__name__)
 
 # Constants
 ENTRY_FEE = Decimal('0.0021')        # Total entry fee
@@ -19,10 +35,14 @@ DEV_FEE = Decimal('0.0002')          # To dev wallet
 PLAYER_INITIAL_BALANCE = Decimal('0.0017')  # Amount credited to player's game balance
 TREASURY_FEE = ENTRY_FEE - DEV_FEE - PLAYER_INITIAL_BALANCE  # Remainder goes to treasury for rewards
 
-@router.post("/entry", status_code=status.HTTP_201_CREATED)
+@router.post("/entry", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit("entry"))])
 async def pay_entry_fee(
-   current_user: User = Depends(get_current_user),
-   db: Session = Depends(get_db)
+   current_user: CurrentUser = Depends(get_fresh_user),
+   db: AsyncSession = Depends(get_db),
+   rpc: RPCClient = Depends(get_rpc),
+   chain: ChainCache = Depends(get_chain_cache),
+   gas_limits: GasLimitResolver = Depends(get_gas_limits),
+   outbox: TransactionOutbox = Depends(get_outbox)
 ):
     """
     Process game entry fee payment:
@@ -31,13 +51,15 @@ async def pay_entry_fee(
       - 0.0002 ETH dev fee
       - 0.0002 ETH treasury fee
       - 0.0017 ETH player balance
+    The signed transaction is queued and the entry starts out pending;
+    poll /game/entry/{id} until it turns active or failed.
     """
     try:
-        # Check if user already has an active game
-        active_game = db.query(GameEntry).filter(
+        # Check if user already has an active or pending game
+        active_game = await db.scalar(select(GameEntry).where(
             GameEntry.user_id == current_user.id,
-            GameEntry.status == 'active'
-        ).first()
+            GameEntry.status.in_(('pending', 'active'))
+        ))
         
         if active_game:
             raise HTTPException(
@@ -45,22 +67,16 @@ async def pay_entry_fee(
                 detail="User already has an active game"
             )
 
-        w3 = Web3(Web3.HTTPProvider(settings.BASE_RPC_URL))
+        w3 = rpc.w3
         
         # Get user's wallet
-        wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+        wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
         if not wallet:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Wallet not found. Please create a wallet first."
             )
 
-        # Debug connection and addresses
-        print(f"Connected to network: {w3.is_connected()}")
-        print(f"Chain ID: {w3.eth.chain_id}")
-        print(f"User wallet: {current_user.wallet_address}")
-        print(f"Treasury wallet: {settings.TREASURY_WALLET_ADDRESS}")
-
         # Validate wallet addresses
         if not all(w3.is_address(addr) for addr in [current_user.wallet_address, settings.TREASURY_WALLET_ADDRESS]):
             raise HTTPException(
@@ -69,27 +85,27 @@ async def pay_entry_fee(
             )
 
         try:
-            # Check if RPC is accessible
-            block_number = w3.eth.get_block_number()
-            print(f"Current block number: {block_number}")
-        except Exception as e:
-            print(f"RPC connection error: {str(e)}")
+            # Chain id, block, gas price, nonce, balance and gas estimate in one batch
+            preflight = await run_preflight(
+                rpc,
+                chain,
+                gas_limits,
+                current_user.wallet_address,
+                settings.TREASURY_WALLET_ADDRESS,
+                w3.to_wei(ENTRY_FEE, 'ether')
+            )
+        except Exception:
+            log.exception("entry_preflight_failed", user_id=current_user.id)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Unable to connect to Base network. Please try again later."
             )
 
-        try:
-            # Get current gas price
-            gas_price = w3.eth.gas_price
-            print(f"Current gas price: {gas_price} wei")
-            nonce = w3.eth.get_transaction_count(current_user.wallet_address)
-            print(f"Current nonce: {nonce}")
-        except Exception as e:
-            print(f"Failed to get gas price or nonce: {str(e)}")
+        if preflight.gas_estimate is None:
+            log.warning("entry_gas_estimation_failed", user_id=current_user.id, error=str(preflight.gas_error))
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to get transaction details. Please try again."
+                detail=f"Failed to estimate gas fees: {preflight.gas_error}"
             )
 
         # Prepare single transaction to treasury
@@ -98,43 +114,14 @@ async def pay_entry_fee(
             'to': settings.TREASURY_WALLET_ADDRESS,
             'value': w3.to_wei(ENTRY_FEE, 'ether'),  # Full amount goes to treasury
             'chainId': settings.BASE_CHAIN_ID,
-            'nonce': nonce,
-            'gasPrice': gas_price,
-            'gas': 21000  # Standard ETH transfer gas limit
+            'gasPrice': preflight.gas_price,
+            'gas': preflight.gas_estimate
         }
 
-        print(f"Treasury transaction for estimation: {treasury_tx}")
-
-        try:
-            # Estimate gas for single transaction
-            estimated_gas = w3.eth.estimate_gas(treasury_tx)
-            print(f"Estimated gas: {estimated_gas}")
-            
-            gas_cost = w3.from_wei(estimated_gas * gas_price, 'ether')
-            print(f"Gas cost: {gas_cost} ETH")
-            
-        except Exception as e:
-            print(f"Gas estimation error: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to estimate gas fees: {str(e)}"
-            )
-
         # Check if user has enough balance for entry fee + gas
-        try:
-            total_needed = ENTRY_FEE + Decimal(str(gas_cost))
-            balance = w3.eth.get_balance(current_user.wallet_address)
-            balance_in_eth = Decimal(str(w3.from_wei(balance, 'ether')))
-            
-            print(f"User balance: {balance_in_eth} ETH")
-            print(f"Total needed: {total_needed} ETH")
-            
-        except Exception as e:
-            print(f"Balance check error: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to check wallet balance. Please try again."
-            )
+        gas_cost = w3.from_wei(preflight.gas_estimate * preflight.gas_price, 'ether')
+        total_needed = ENTRY_FEE + Decimal(str(gas_cost))
+        balance_in_eth = Decimal(str(w3.from_wei(preflight.balance, 'ether')))
         
         if balance_in_eth < total_needed:
             raise HTTPException(
@@ -142,80 +129,67 @@ async def pay_entry_fee(
                 detail=f"Insufficient balance. You need {total_needed:.6f} ETH (includes {gas_cost:.6f} ETH for gas)"
             )
 
-        # Get user's private key
         try:
-            private_key = decrypt_private_key(wallet.encrypted_private_key)
-        except Exception as e:
-            print(f"Decryption error: {str(e)}")
+            # Sign with the user's key now; broadcasting happens in the background
+            with signing_account(wallet.encrypted_private_key) as account:
+                outbound = await queue_transaction(db, account, treasury_tx, preflight.nonce)
+
+        except InvalidToken:
+            log.exception("wallet_key_decryption_failed", user_id=current_user.id)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to decrypt wallet. Please contact support."
             )
 
         try:
-            # Update gas value in transaction
-            treasury_tx['gas'] = estimated_gas
-            
-            # Sign and send transaction
-            signed_tx = w3.eth.account.sign_transaction(treasury_tx, private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            print(f"Transaction hash: {w3.to_hex(tx_hash)}")
-            
-        except Exception as e:
-            error_message = str(e).lower()
-            print(f"Transaction error: {error_message}")
-            
-            if "nonce too low" in error_message:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Transaction failed: Nonce too low. Please try again."
-                )
-            elif "insufficient funds" in error_message:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient balance. You need {total_needed:.6f} ETH (includes {gas_cost:.6f} ETH for gas)"
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to process transaction: {str(e)}"
-                )
-
-        try:
-            # Create game entry record
+            # The entry stays pending until the outbox sees the payment mined
             new_game_entry = GameEntry(
                 user_id=current_user.id,
                 entry_fee_amount=ENTRY_FEE,
-                transaction_hash=w3.to_hex(tx_hash),
-                status='active',
+                transaction_hash=outbound.tx_hash,
+                status='pending',
                 balance=PLAYER_INITIAL_BALANCE
             )
-            
             db.add(new_game_entry)
-            db.commit()
-        except Exception as e:
-            print(f"Database error: {str(e)}")
+            await db.flush()
+            outbound.game_entry_id = new_game_entry.id
+            await db.commit()
+        except IntegrityError:
+            # Lost a race with another entry request for the same user
+            await release_nonce(outbound.sender, outbound.nonce)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User already has an active game"
+            )
+        except Exception:
+            log.exception("game_entry_insert_failed", user_id=current_user.id)
+            await release_nonce(outbound.sender, outbound.nonce)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create game entry. Please contact support."
             )
-        
+
+        outbox.notify()
+        log.info("entry_fee_queued", user_id=current_user.id, tx_hash=outbound.tx_hash)
+
         return {
-            "message": "Entry fee paid successfully",
-            "transaction_hash": w3.to_hex(tx_hash),
+            "message": "Entry fee payment submitted",
+            "transaction_hash": outbound.tx_hash,
             "game_entry_id": new_game_entry.id,
+            "status": new_game_entry.status,
+            "status_url": f"/game/entry/{new_game_entry.id}",
             "initial_balance": float(PLAYER_INITIAL_BALANCE),
             "total_paid": float(total_needed),
             "gas_cost": float(gas_cost)
         }
 
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
 
-    except Exception as e:
-        db.rollback()
-        print(f"Unexpected error: {str(e)}")
+    except Exception:
+        await db.rollback()
+        log.exception("entry_fee_payment_failed", user_id=current_user.id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred. Please try again or contact support."
@@ -224,27 +198,38 @@ async def pay_entry_fee(
 
 @router.get("/status", response_model=dict)
 async def check_game_status(
-   current_user: User = Depends(get_current_user),
-   db: Session = Depends(get_db)
+   current_user: CurrentUser = Depends(get_current_user),
+   db: AsyncSession = Depends(get_db)
 ):
    """
    Check if user has an active game and return appropriate status.
    Returns:
-   - If in game: Entry details and balance
+   - If in game: Entry details, balance and the seed its replay log is checked with
+   - If the entry fee is still confirming: the pending entry
    - If not in game: Entry fee information
    """
-   active_game = db.query(GameEntry).filter(
+   game = await db.scalar(select(GameEntry).where(
        GameEntry.user_id == current_user.id,
-       GameEntry.status == 'active'
-   ).first()
+       GameEntry.status.in_(('pending', 'active'))
+   ))
    
-   if active_game:
+   if game and game.status == 'active':
        return {
            "is_in_game": True,
-           "game_entry_id": active_game.id,
-           "entry_timestamp": active_game.entry_timestamp,
-           "balance": float(active_game.balance),
-           "status": active_game.status
+           "game_entry_id": game.id,
+           "entry_timestamp": game.entry_timestamp,
+           "balance": float(game.balance),
+           "replay_seed": session_seed(game.id),
+           "status": game.status
+       }
+
+   if game:
+       return {
+           "is_in_game": False,
+           "game_entry_id": game.id,
+           "transaction_hash": game.transaction_hash,
+           "status": game.status,
+           "message": "Entry fee payment is confirming"
        }
    
    return {
@@ -252,3 +237,135 @@ async def check_game_status(
        "entry_fee": float(ENTRY_FEE),
        "message": "Entry fee required to play"
    }
+
+
+@router.post("/cashout", response_model=dict)
+async def cash_out(
+   current_user: CurrentUser = Depends(get_fresh_user),
+   db: AsyncSession = Depends(get_db),
+   ledger: GameLedger = Depends(get_ledger)
+):
+   """
+   End the active game and pay its balance out to the player's wallet.
+   Payouts are netted per wallet and settled by the treasury in batches.
+   """
+   active_game = await db.scalar(select(GameEntry).where(
+       GameEntry.user_id == current_user.id,
+       GameEntry.status == 'active'
+   ))
+   if not active_game:
+       raise HTTPException(
+           status_code=status.HTTP_400_BAD_REQUEST,
+           detail="No active game"
+       )
+
+   try:
+       payout = await ledger.cash_out(active_game.id)
+   except LedgerError as e:
+       raise HTTPException(
+           status_code=status.HTTP_409_CONFLICT,
+           detail=str(e)
+       )
+   except Exception:
+       log.exception("cash_out_failed", user_id=current_user.id)
+       raise HTTPException(
+           status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+           detail="Failed to cash out. Please try again."
+       )
+
+   return {
+       "game_entry_id": active_game.id,
+       "payout": float(payout),
+       "message": "Payout scheduled; the treasury settles payouts in batches"
+   }
+
+
+class ReplaySubmission(BaseModel):
+    log: str        # Base64 of the binary input log
+    score: Decimal  # Claimed score in ETH
+
+
+@router.post("/replay", response_model=dict)
+async def submit_replay(
+   submission: ReplaySubmission,
+   current_user: CurrentUser = Depends(get_current_user),
+   db: AsyncSession = Depends(get_db),
+   replays: ReplayVerifier = Depends(get_replay_verifier)
+):
+   """
+   Check the active game's input log against its claimed score. The log is
+   replayed on the server with the game's seed and may not cover more time
+   than has passed since the entry. Only verifies; nothing is credited or paid.
+   """
+   active_game = await db.scalar(select(GameEntry).where(
+       GameEntry.user_id == current_user.id,
+       GameEntry.status == 'active'
+   ))
+   if not active_game:
+       raise HTTPException(
+           status_code=status.HTTP_400_BAD_REQUEST,
+           detail="No active game"
+       )
+
+   started = active_game.entry_timestamp
+   started = started if started.tzinfo else started.replace(tzinfo=timezone.utc)
+   elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+   try:
+       result = await replays.verify(
+           session_seed(active_game.id),
+           base64.b64decode(submission.log, validate=True),
+           submission.score,
+           max_ticks=int(elapsed * TICK_RATE)
+       )
+   except ValueError as e:
+       raise HTTPException(
+           status_code=status.HTTP_400_BAD_REQUEST,
+           detail=f"Invalid replay log: {str(e)}"
+       )
+   if not result.valid:
+       log.warning("replay_rejected", user_id=current_user.id, game_entry_id=active_game.id)
+       raise HTTPException(
+           status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+           detail="Claimed score does not match the replay"
+       )
+
+   return {
+       "game_entry_id": active_game.id,
+       "score": float(result.score),
+       "ticks": result.ticks,
+       "valid": result.valid
+   }
+
+
+@router.get("/entry/{entry_id}", response_model=dict)
+async def get_entry_status(
+   entry_id: int,
+   current_user: CurrentUser = Depends(get_current_user),
+   db: AsyncSession = Depends(get_db)
+):
+   """
+   Progress of an entry fee payment: the entry moves pending -> active/failed
+   while its transaction moves queued -> broadcast -> confirmed/failed.
+   """
+   row = (await db.execute(
+       select(GameEntry, OutboundTransaction)
+       .outerjoin(OutboundTransaction, OutboundTransaction.game_entry_id == GameEntry.id)
+       .where(GameEntry.id == entry_id, GameEntry.user_id == current_user.id)
+   )).first()
+
+   if row is None:
+       raise HTTPException(
+           status_code=status.HTTP_404_NOT_FOUND,
+           detail="Game entry not found"
+       )
+
+   entry, outbound = row
+   return {
+       "game_entry_id": entry.id,
+       "status": entry.status,
+       "transaction_hash": entry.transaction_hash,
+       "transaction_status": outbound.status if outbound else None,
+       "attempts": outbound.attempts if outbound else None,
+       "block_number": outbound.block_number if outbound else None,
+       "error": outbound.last_error if outbound else None
+   }
@@ -0,0 +1,190 @@
+import base64
+import json
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_db
+from ..models import LeaderboardAggregate, User
+from ..utils.auth import get_current_user, user_from_token, CurrentUser
+from ..utils.leaderboard import Leaderboard, get_leaderboard
+from ..utils.rankings import aggregates_version, current_windows
+
+router = APIRouter()
+
+
+def _encode_cursor(total_score: Decimal, user_id: int, rank: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([str(total_score), user_id, rank]).encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        total_score, user_id, rank = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return Decimal(total_score), int(user_id), int(rank)
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _not_modified(request: Request, headers: dict) -> Optional[Response]:
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
+
+
+@router.get("/leaderboard")
+async def read_leaderboard(
+    request: Request,
+    response: Response,
+    period: str = Query("all", pattern="^(daily|weekly|all)$"),
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Players ranked by gold collected in the current day, week or all time,
+    read from the precomputed aggregates. Pass next_cursor back as cursor
+    for the following page.
+    """
+    start = current_windows()[period]
+    after = _decode_cursor(cursor) if cursor else None
+
+    # Pages only change when the aggregator folds in new results
+    version = await aggregates_version(db)
+    headers = {
+        "ETag": f'W/"{period}-{start.isoformat()}-{version}-{limit}-{cursor or ""}"',
+        "Cache-Control": f"public, max-age={int(settings.RANKINGS_REFRESH_INTERVAL)}"
+    }
+    cached = _not_modified(request, headers)
+    if cached is not None:
+        return cached
+
+    query = (
+        select(
+            LeaderboardAggregate.user_id, User.username, LeaderboardAggregate.total_score,
+            LeaderboardAggregate.best_score, LeaderboardAggregate.games, LeaderboardAggregate.rewards
+        )
+        .join(User, User.id == LeaderboardAggregate.user_id)
+        .where(LeaderboardAggregate.period == period, LeaderboardAggregate.period_start == start)
+        .order_by(LeaderboardAggregate.total_score.desc(), LeaderboardAggregate.user_id.desc())
+        .limit(limit)
+    )
+    rank = 0
+    if after is not None:
+        total_score, user_id, rank = after
+        query = query.where(
+            tuple_(LeaderboardAggregate.total_score, LeaderboardAggregate.user_id) < tuple_(total_score, user_id)
+        )
+    rows = (await db.execute(query)).all()
+
+    entries = [
+        {
+            "rank": rank + i + 1,
+            "id": user_id,
+            "name": username,
+            "score": float(total_score),
+            "best_score": float(best_score),
+            "games": games,
+            "rewards": float(rewards)
+        }
+        for i, (user_id, username, total_score, best_score, games, rewards) in enumerate(rows)
+    ]
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = _encode_cursor(rows[-1].total_score, rows[-1].user_id, rank + len(rows))
+
+    response.headers.update(headers)
+    return {
+        "period": period,
+        "period_start": start.isoformat(),
+        "entries": entries,
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/player/stats")
+async def read_player_stats(
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """The player's totals for the current day, week and all time."""
+    windows = current_windows()
+    version = await aggregates_version(db)
+    headers = {
+        "ETag": f'W/"{current_user.id}-{windows["daily"].isoformat()}-{version}"',
+        "Cache-Control": f"private, max-age={int(settings.RANKINGS_REFRESH_INTERVAL)}"
+    }
+    cached = _not_modified(request, headers)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(
+        select(LeaderboardAggregate).where(
+            LeaderboardAggregate.user_id == current_user.id,
+            tuple_(LeaderboardAggregate.period, LeaderboardAggregate.period_start).in_(list(windows.items()))
+        )
+    )).scalars().all()
+    found = {row.period: row for row in rows}
+
+    periods = {}
+    for period in windows:
+        row = found.get(period)
+        periods[period] = {
+            "totalGold": float(row.total_score) if row else 0.0,
+            "bestScore": float(row.best_score) if row else 0.0,
+            "huntsParticipated": row.games if row else 0,
+            "rewardsEarned": float(row.rewards) if row else 0.0
+        }
+
+    response.headers.update(headers)
+    # All-time totals at the top level, as the stats card reads them
+    return {**periods["all"], "periods": periods}
+
+
+@router.get("/leaderboard/live")
+async def read_live_leaderboard(
+    limit: int = Query(10, ge=1, le=100),
+    leaderboard: Leaderboard = Depends(get_leaderboard)
+):
+    """Best single scores from the live board that the WebSocket feed pushes."""
+    return leaderboard.top(limit)
+
+
+@router.websocket("/leaderboard/ws")
+async def leaderboard_socket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Live leaderboard. Browsers can't set headers on a WebSocket, so the access
+    token comes in the query string.
+
+    The client sends {"type": "scoreUpdate" | "gameOver", "score": <ETH>}.
+    The server sends a "snapshot" of the top players on connect, then
+    "diff" frames (rows that changed and ids that left the top) and "rank"
+    frames with the player's own position, at most once per broadcast interval.
+    """
+    try:
+        user = await user_from_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    leaderboard: Leaderboard = websocket.app.state.leaderboard
+    await websocket.accept()
+    await leaderboard.connect(websocket, user.id)
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                event = json.loads(message)
+                if not isinstance(event, dict) or event.get("type") not in ("scoreUpdate", "gameOver"):
+                    raise ValueError("Unknown message type")
+                leaderboard.submit(user.id, user.username, event.get("score"))
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        leaderboard.disconnect(websocket)
@@ -1,24 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from web3 import Web3
-from typing import Dict
+from typing import Dict, List
 from pydantic import BaseModel
 
 from ..database import get_db
-from ..models.user import User
 from ..models.wallet import Wallet
-from ..utils.auth import get_current_user
-from ..utils.crypto import decrypt_private_key
+from ..models.outbox import OutboundTransaction
+from ..utils.auth import get_current_user, get_fresh_user, CurrentUser
+from ..utils.crypto import signing_account
+from ..utils.rpc import RPCClient, get_rpc
+from ..utils.chain_cache import ChainCache, get_chain_cache
+from ..utils.gas import GasLimitResolver, get_gas_limits
+from ..utils.balance_cache import BalanceCache, get_balance_cache
+from ..utils.balances import BalanceFetchError, fetch_balances
+from ..utils.preflight import run_preflight
+from ..utils.nonce import release_nonce
+from ..utils.outbox import TransactionOutbox, get_outbox, queue_transaction
+from ..utils.log import get_logger
+from ..utils.ratelimit import InFlightSlot, rate_limit
 from ..config import settings
 
 router = APIRouter()
+log = get_logger(__name__)
 
 
 @router.get("/balance/{address}", tags=["wallet"])
 async def get_wallet_balance(
     address: str, 
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    rpc: RPCClient = Depends(get_rpc),
+    chain: ChainCache = Depends(get_chain_cache),
+    balances: BalanceCache = Depends(get_balance_cache)
 ) -> Dict[str, str]:
     # Verify this wallet belongs to the requesting user
     if current_user.wallet_address != address:
@@ -28,8 +46,22 @@ async def get_wallet_balance(
         )
     
     try:
-        w3 = Web3(Web3.HTTPProvider(settings.BASE_RPC_URL))
-        balance = w3.eth.get_balance(address)
+        w3 = rpc.w3
+
+        # Serve from cache while we are still on the same block
+        block_number = chain.block_number if chain.is_fresh() else None
+        balance = balances.get(address, block_number)
+        if balance is None:
+            balance = await w3.eth.get_balance(address)
+            balances.set(address, block_number, balance)
+
+        # Polling clients revalidate with If-None-Match and get a bodiless 304
+        etag = f'"{balance:x}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
         # Convert from Wei to ETH
         balance_in_eth = w3.from_wei(balance, 'ether')
         
@@ -38,19 +70,87 @@ async def get_wallet_balance(
             "address": address
         }
     except Exception as e:
-        print(f"Error fetching balance: {str(e)}")
+        log.exception("balance_fetch_failed", user_id=current_user.id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch wallet balance: {str(e)}"
         )
 
 
-@router.get("/estimate-gas")
+# Pydantic model for bulk balance request
+class BulkBalanceRequest(BaseModel):
+    addresses: List[str]
+
+@router.post("/balances")
+async def get_wallet_balances(
+    balance_data: BulkBalanceRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    rpc: RPCClient = Depends(get_rpc),
+    slot: InFlightSlot = Depends(rate_limit("balances"))
+):
+    """
+    Balances for many addresses, streamed back as newline-delimited JSON.
+    All addresses are read at the same block. If some could not be fetched,
+    the last line is {"error": ..., "addresses": [...]} listing them.
+    """
+    addresses = list(dict.fromkeys(balance_data.addresses))
+    if len(addresses) > settings.BULK_BALANCE_MAX_ADDRESSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BULK_BALANCE_MAX_ADDRESSES} addresses per request"
+        )
+    invalid = [address for address in addresses if not Web3.is_address(address)]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid Ethereum address: {invalid[0]}"
+        )
+
+    try:
+        block_number = await rpc.w3.eth.block_number
+    except Exception:
+        log.exception("block_number_fetch_failed")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Unable to connect to Base network. Please try again later."
+        )
+
+    async def stream():
+        try:
+            async for address, balance in fetch_balances(
+                rpc,
+                addresses,
+                chunk_size=settings.BULK_BALANCE_CHUNK_SIZE,
+                concurrency=settings.BULK_BALANCE_CONCURRENCY,
+                block_number=block_number
+            ):
+                yield json.dumps({
+                    "address": address,
+                    "balance": None if balance is None else str(Web3.from_wei(balance, 'ether')),
+                    "block_number": block_number
+                }) + "\n"
+        except BalanceFetchError as e:
+            # The status line has gone out already, so the failure is reported as the last line
+            log.warning("bulk_balance_fetch_failed", user_id=current_user.id, error=str(e))
+            yield json.dumps({
+                "error": "Unable to fetch some balances. Please retry these addresses.",
+                "addresses": e.addresses,
+                "block_number": block_number
+            }) + "\n"
+
+    # The in-flight slot is held until the last chunk has been fetched and sent
+    return slot.stream(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/estimate-gas", dependencies=[Depends(rate_limit("estimate"))])
 async def estimate_gas_fee(
     recipient_address: str = Query(...),
     amount: float = Query(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    rpc: RPCClient = Depends(get_rpc),
+    chain: ChainCache = Depends(get_chain_cache),
+    gas_limits: GasLimitResolver = Depends(get_gas_limits)
 ):
     if not Web3.is_address(recipient_address):
         raise HTTPException(
@@ -59,72 +159,43 @@ async def estimate_gas_fee(
         )
 
     try:
-        w3 = Web3(Web3.HTTPProvider(settings.BASE_RPC_URL))
-        
-        # Debug connection
-        print(f"Connected to network: {w3.is_connected()}")
-        print(f"Chain ID: {w3.eth.chain_id}")
-        print(f"Gas price: {w3.eth.gas_price}")
-        print(f"Current user wallet: {current_user.wallet_address}")
-        print(f"Recipient address: {recipient_address}")
-        print(f"Amount: {amount} ETH")
+        w3 = rpc.w3
         
-        # Create transaction for estimation
-        transaction = {
-            'from': current_user.wallet_address,
-            'to': recipient_address,
-            'value': w3.to_wei(amount, 'ether'),
-            'chainId': settings.BASE_CHAIN_ID,
-            # Add these fields for more accurate estimation
-            'nonce': w3.eth.get_transaction_count(current_user.wallet_address),
-            'gasPrice': w3.eth.gas_price,
-            'gas': 21000  # Standard ETH transfer gas limit
-        }
+        # Chain id, gas price and the gas estimate arrive in one batch
+        preflight = await run_preflight(
+            rpc,
+            chain,
+            gas_limits,
+            current_user.wallet_address,
+            recipient_address,
+            w3.to_wei(amount, 'ether')
+        )
 
-        try:
-            # Print debug info
-            print(f"Transaction for estimation: {transaction}")
-            
-            # Get gas price first
-            gas_price = w3.eth.gas_price
-            print(f"Current gas price: {gas_price}")
-            
-            # Use default gas limit for ETH transfers if estimation fails
-            try:
-                gas_estimate = w3.eth.estimate_gas(transaction)
-                print(f"Estimated gas: {gas_estimate}")
-            except Exception as gas_err:
-                print(f"Gas estimation failed: {str(gas_err)}, using default")
-                gas_estimate = 21000  # Standard ETH transfer
+        # Falls back to the plain transfer limit if estimation failed
+        gas_estimate = preflight.gas_limit
+        gas_price = preflight.gas_price
 
-            # Calculate total gas fee in ETH
-            gas_fee_wei = gas_estimate * gas_price
-            gas_fee_eth = w3.from_wei(gas_fee_wei, 'ether')
-            
-            print(f"Gas fee in ETH: {gas_fee_eth}")
-            print(f"Gas fee in Wei: {gas_fee_wei}")
-            print(f"Gas price in Gwei: {w3.from_wei(gas_price, 'gwei')}")
+        # Calculate total gas fee in ETH
+        gas_fee_wei = gas_estimate * gas_price
+        gas_fee_eth = w3.from_wei(gas_fee_wei, 'ether')
 
-            return {
-                "gas_estimate": gas_estimate,
-                "gas_price": gas_price,
-                "gas_fee_eth": float(gas_fee_eth),
-                "total_amount_eth": float(gas_fee_eth) + float(amount),
-                "debug_info": {
-                    "gas_price_gwei": float(w3.from_wei(gas_price, 'gwei')),
-                    "gas_limit": int(gas_estimate),
-                    "gas_fee_wei": str(gas_fee_wei),
-                    "chain_id": w3.eth.chain_id,
-                    "is_connected": w3.is_connected()
-                }
+        return {
+            "gas_estimate": gas_estimate,
+            "gas_price": gas_price,
+            "gas_fee_eth": float(gas_fee_eth),
+            "total_amount_eth": float(gas_fee_eth) + float(amount),
+            "debug_info": {
+                "gas_price_gwei": float(w3.from_wei(gas_price, 'gwei')),
+                "gas_limit": int(gas_estimate),
+                "gas_fee_wei": str(gas_fee_wei),
+                "chain_id": preflight.chain_id,
+                # The batch above only succeeds against a reachable node
+                "is_connected": True
             }
-
-        except Exception as inner_e:
-            print(f"Inner estimation error: {str(inner_e)}")
-            raise
+        }
 
     except Exception as e:
-        print(f"Gas estimation error: {str(e)}")
+        log.exception("gas_estimation_failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Gas estimation failed: {str(e)}"
@@ -136,182 +207,102 @@ class WithdrawRequest(BaseModel):
     recipient_address: str
     amount: float
 
-@router.post("/withdraw")
+@router.post("/withdraw", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit("withdraw"))])
 async def withdraw_eth(
     withdraw_data: WithdrawRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_fresh_user),
+    db: AsyncSession = Depends(get_db),
+    rpc: RPCClient = Depends(get_rpc),
+    chain: ChainCache = Depends(get_chain_cache),
+    gas_limits: GasLimitResolver = Depends(get_gas_limits),
+    outbox: TransactionOutbox = Depends(get_outbox)
 ):
-    print(f"Received withdrawal request: {withdraw_data}")
-    
     if not Web3.is_address(withdraw_data.recipient_address):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid Ethereum address"
         )
 
-    w3 = Web3(Web3.HTTPProvider(settings.BASE_RPC_URL))
+    w3 = rpc.w3
     
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    wallet = await db.scalar(select(Wallet).where(Wallet.user_id == current_user.id))
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
 
-    balance = w3.eth.get_balance(current_user.wallet_address)
-    balance_in_eth = w3.from_wei(balance, 'ether')
-    if balance_in_eth < withdraw_data.amount:
-        raise HTTPException(
-            status_code=400, 
-            detail="Insufficient balance"
-        )
-
     try:
-        private_key = decrypt_private_key(wallet.encrypted_private_key)
-        nonce = w3.eth.get_transaction_count(current_user.wallet_address)
-        gas_price = w3.eth.gas_price
-
-        print(f"Preparing transaction:")
-        print(f"From: {current_user.wallet_address}")
-        print(f"To: {withdraw_data.recipient_address}")
-        print(f"Amount: {withdraw_data.amount} ETH")
-        print(f"Nonce: {nonce}")
-        print(f"Gas Price: {gas_price}")
+        preflight = await run_preflight(
+            rpc,
+            chain,
+            gas_limits,
+            current_user.wallet_address,
+            withdraw_data.recipient_address,
+            w3.to_wei(withdraw_data.amount, 'ether')
+        )
+        balance_in_eth = w3.from_wei(preflight.balance, 'ether')
+        if balance_in_eth < withdraw_data.amount:
+            raise HTTPException(
+                status_code=400, 
+                detail="Insufficient balance"
+            )
 
         transaction = {
-            'nonce': nonce,
-            'gasPrice': gas_price,
-            'gas': 21000,
+            'gasPrice': preflight.gas_price,
+            'gas': preflight.gas_limit,
             'to': withdraw_data.recipient_address,
             'value': w3.to_wei(withdraw_data.amount, 'ether'),
             'chainId': settings.BASE_CHAIN_ID,
             'from': current_user.wallet_address
         }
 
-        # Estimate gas
+        # Sign now and let the outbox broadcast it; the block confirmer settles it
+        with signing_account(wallet.encrypted_private_key) as account:
+            outbound = await queue_transaction(db, account, transaction, preflight.nonce)
         try:
-            estimated_gas = w3.eth.estimate_gas(transaction)
-            transaction['gas'] = estimated_gas
-        except Exception as gas_error:
-            print(f"Gas estimation failed: {str(gas_error)}, using default")
-            transaction['gas'] = 21000
-
-        # Sign and send transaction
-        signed_txn = w3.eth.account.sign_transaction(
-            transaction_dict=transaction,
-            private_key=private_key
-        )
-        
-        # Use raw_transaction (with underscore)
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        tx_hash_hex = w3.to_hex(tx_hash)
+            await db.commit()
+        except Exception:
+            await release_nonce(outbound.sender, outbound.nonce)
+            raise
+        outbox.notify()
         
-        print(f"Transaction hash: {tx_hash_hex}")
+        log.info("withdrawal_queued", user_id=current_user.id, tx_hash=outbound.tx_hash)
         
         return {
             "message": "Withdrawal initiated",
-            "tx_hash": tx_hash_hex,
+            "tx_hash": outbound.tx_hash,
+            "status": outbound.status,
+            "status_url": f"/wallet/transactions/{outbound.tx_hash}",
             "amount": withdraw_data.amount,
             "recipient": withdraw_data.recipient_address
         }
 
+    except HTTPException:
+        raise
+
     except Exception as e:
-        print(f"Withdrawal error: {str(e)}")
+        log.exception("withdrawal_failed", user_id=current_user.id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Withdrawal failed: {str(e)}"
         )
 
-class EntryFeePayment(BaseModel):
-    amount: float = 0.1  # Fixed entry fee
-
-@router.post("/game/pay-entry")
-async def pay_entry_fee(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/transactions/{tx_hash}")
+async def get_transaction_status(
+    tx_hash: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    # Check if user already has an active game
-    active_game = db.query(GameEntry).filter(
-        GameEntry.user_id == current_user.id,
-        GameEntry.status == 'active'
-    ).first()
-    
-    if active_game:
-        raise HTTPException(
-            status_code=400,
-            detail="User already has an active game"
-        )
-
-    ENTRY_FEE = 0.1  # ETH
-    GAME_WALLET_ADDRESS = settings.GAME_WALLET_ADDRESS  # Treasury wallet that collects entry fees
-
-    w3 = Web3(Web3.HTTPProvider(settings.BASE_RPC_URL))
-    
-    # Get user's wallet
-    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
-    if not wallet:
-        raise HTTPException(status_code=404, detail="Wallet not found")
-
-    # Check balance
-    balance = w3.eth.get_balance(current_user.wallet_address)
-    balance_in_eth = w3.from_wei(balance, 'ether')
-    if balance_in_eth < ENTRY_FEE:
-        raise HTTPException(
-            status_code=400, 
-            detail="Insufficient balance for entry fee"
-        )
-
-    try:
-        private_key = decrypt_private_key(wallet.encrypted_private_key)
-        nonce = w3.eth.get_transaction_count(current_user.wallet_address)
-        gas_price = w3.eth.gas_price
-
-        transaction = {
-            'nonce': nonce,
-            'gasPrice': gas_price,
-            'gas': 21000,
-            'to': GAME_WALLET_ADDRESS,
-            'value': w3.to_wei(ENTRY_FEE, 'ether'),
-            'chainId': settings.BASE_CHAIN_ID,
-            'from': current_user.wallet_address
-        }
-
-        # Estimate gas
-        try:
-            estimated_gas = w3.eth.estimate_gas(transaction)
-            transaction['gas'] = estimated_gas
-        except Exception as gas_error:
-            print(f"Gas estimation failed: {str(gas_error)}, using default")
-            transaction['gas'] = 21000
-
-        # Sign and send transaction
-        signed_txn = w3.eth.account.sign_transaction(
-            transaction_dict=transaction,
-            private_key=private_key
-        )
-        
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        tx_hash_hex = w3.to_hex(tx_hash)
-        
-        # Create game entry record
-        new_game_entry = GameEntry(
-            user_id=current_user.id,
-            entry_fee_amount=ENTRY_FEE,
-            transaction_hash=tx_hash_hex,
-            status='active'
-        )
-        
-        db.add(new_game_entry)
-        db.commit()
-        
-        return {
-            "message": "Entry fee paid successfully",
-            "tx_hash": tx_hash_hex,
-            "game_entry_id": new_game_entry.id,
-            "amount": ENTRY_FEE
-        }
-
-    except Exception as e:
-        print(f"Entry fee payment error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Entry fee payment failed: {str(e)}"
-        )
+    """Progress of a transaction sent from the user's wallet: queued -> broadcast -> confirmed/failed."""
+    outbound = await db.scalar(select(OutboundTransaction).where(
+        OutboundTransaction.tx_hash == tx_hash.lower(),
+        OutboundTransaction.sender == current_user.wallet_address
+    ))
+    if not outbound:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+
+    return {
+        "tx_hash": outbound.tx_hash,
+        "status": outbound.status,
+        "attempts": outbound.attempts,
+        "block_number": outbound.block_number,
+        "error": outbound.last_error
+    }
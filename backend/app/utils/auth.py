@@ -1,15 +1,18 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..config import settings
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from fastapi import Depends, HTTPException, status
-from ..database import get_db
+from ..database import AsyncSessionLocal
 from ..models.user import User as UserModel
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password, hashed_password):
@@ -18,6 +21,56 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+
+class PasswordHasherPool:
+    """
+    Dedicated, bounded thread pool for bcrypt so a login spike can't starve
+    the default threadpool. Once workers plus queue_size calls are in flight,
+    new calls are rejected with 429 instead of queueing without limit.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests in progress. Please try again.",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "in_flight": self.pending,
+            "queue_depth": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+password_pool = PasswordHasherPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -28,21 +81,109 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def token_claims(user) -> dict:
+    """Claims carried by access tokens; get_current_user builds the user from them alone."""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "username": user.username,
+        "wallet": user.wallet_address,
+        "active": user.is_active
+    }
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of the authenticated user, safe to share between requests."""
+    id: int
+    email: str
+    username: str
+    wallet_address: str
+    is_active: bool
+
+    @classmethod
+    def from_model(cls, user: UserModel) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            wallet_address=user.wallet_address,
+            is_active=user.is_active
+        )
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["CurrentUser"]:
+        """None for tokens issued before all of token_claims() was included."""
+        if any(payload.get(claim) is None for claim in ("sub", "uid", "username", "wallet", "active")):
+            return None
+        return cls(
+            id=payload["uid"],
+            email=payload["sub"],
+            username=payload["username"],
+            wallet_address=payload["wallet"],
+            is_active=payload["active"]
+        )
+
+
+async def _load_user(user_id: Optional[int], email: str) -> Optional[CurrentUser]:
+    async with AsyncSessionLocal() as db:
+        if user_id is not None:
+            user = await db.get(UserModel, user_id)
+        else:
+            # Tokens issued before uid was added only carry the email
+            user = await db.scalar(select(UserModel).where(UserModel.email == email))
+        return CurrentUser.from_model(user) if user is not None else None
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    return await user_from_token(token)
+
+
+async def get_fresh_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    """
+    The token's user as it is in the database right now, for handlers that
+    move funds: a user deactivated or deleted since the token was issued is
+    refused instead of being served from the token's claims.
+    """
+    payload = _decode(token)
+    user = await _load_user(payload.get("uid"), payload["sub"])
+    if user is None:
+        raise _credentials_exception()
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return user
+
+
+async def user_from_token(token: str) -> CurrentUser:
+    """
+    Resolve an access token outside dependency injection, e.g. for WebSockets.
+    The user comes from the verified claims without touching the database;
+    only older tokens that lack some of them are looked up.
+    """
+    payload = _decode(token)
+    user = CurrentUser.from_claims(payload)
+    if user is not None:
+        return user
 
-    user = db.query(UserModel).filter(UserModel.email == email).first()
+    user = await _load_user(payload.get("uid"), payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
@@ -0,0 +1,51 @@
+from typing import Optional
+from fastapi import Request
+from .cache import TTLCache
+from ..config import settings
+
+
+class BalanceCache:
+    """
+    Read-through cache of wallet balances keyed by (address, block number).
+    Entries also expire after a short TTL, and are dropped as soon as we
+    broadcast a transaction from the address.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, address: str, block_number: Optional[int]) -> Optional[int]:
+        entry = self.entries.get(address.lower())
+        if entry is not None and entry[0] == block_number:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def set(self, address: str, block_number: Optional[int], balance: int):
+        self.entries.set(address.lower(), (block_number, balance))
+
+    def invalidate(self, address: str):
+        self.entries.pop(address.lower())
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
+
+
+def create_balance_cache() -> BalanceCache:
+    return BalanceCache(
+        maxsize=settings.BALANCE_CACHE_SIZE,
+        ttl=settings.BALANCE_CACHE_TTL
+    )
+
+
+def get_balance_cache(request: Request) -> BalanceCache:
+    return request.app.state.balances
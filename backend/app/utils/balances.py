@@ -0,0 +1,58 @@
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+from .rpc import RPCClient, RPCError
+
+
+class BalanceFetchError(Exception):
+    """Some chunks failed; addresses lists the ones left without a balance."""
+
+    def __init__(self, addresses: List[str], error: Exception):
+        self.addresses = addresses
+        super().__init__(f"{len(addresses)} balances not fetched: {error}")
+
+
+async def fetch_balances(
+    rpc: RPCClient,
+    addresses: List[str],
+    chunk_size: int,
+    concurrency: int,
+    block_number: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Optional[int]]]:
+    """
+    Resolve many balances with chunked JSON-RPC batches, yielding
+    (address, balance in wei) as each chunk completes. Every chunk is read at
+    the same block so the result is a consistent snapshot; addresses the node
+    rejects come back with a balance of None. If a whole batch fails, the
+    other chunks are still yielded and BalanceFetchError is raised at the end.
+    """
+    if block_number is None:
+        block_number = await rpc.w3.eth.block_number
+    block = hex(block_number)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(chunk):
+        async with semaphore:
+            try:
+                results = await rpc.batch([("eth_getBalance", [address, block]) for address in chunk])
+            except Exception as e:
+                return chunk, e
+        return chunk, results
+
+    failed: List[str] = []
+    error = None
+    chunks = [addresses[i:i + chunk_size] for i in range(0, len(addresses), chunk_size)]
+    for done in asyncio.as_completed([fetch(chunk) for chunk in chunks]):
+        chunk, results = await done
+        if isinstance(results, Exception):
+            failed.extend(chunk)
+            error = results
+            continue
+        for address, result in zip(chunk, results):
+            if isinstance(result, RPCError):
+                yield address, None
+            else:
+                yield address, int(result, 16)
+
+    if failed:
+        raise BalanceFetchError(failed, error)
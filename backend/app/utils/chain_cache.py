@@ -0,0 +1,141 @@
+import asyncio
+import time
+from typing import Optional
+from fastapi import Request
+from .log import get_logger
+from .rpc import RPCClient, RPCError
+from ..config import settings
+
+log = get_logger(__name__)
+
+
+class ChainCache:
+    """
+    Shared chain id, gas price and fee history, refreshed once per new block.
+    Readers get the cached values while they are younger than max_age and
+    fall back to a live call otherwise.
+    """
+
+    def __init__(self, rpc: RPCClient, max_age: float, poll_interval: float):
+        self.rpc = rpc
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+
+        self.chain_id: Optional[int] = None
+        self.block_number: Optional[int] = None
+        self.gas_price: Optional[int] = None
+        self.fee_history: Optional[dict] = None
+        self.updated_at: Optional[float] = None
+
+        self.hits = 0
+        self.misses = 0
+        self._task = None
+
+    def age(self) -> Optional[float]:
+        if self.updated_at is None:
+            return None
+        return time.monotonic() - self.updated_at
+
+    def is_fresh(self) -> bool:
+        age = self.age()
+        return age is not None and age <= self.max_age
+
+    def lookup(self) -> bool:
+        """Count a read against the cache and report whether it can be served."""
+        if self.is_fresh():
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def record(self, block_number: int, gas_price: int, fee_history: Optional[dict] = None, chain_id: Optional[int] = None):
+        self.block_number = block_number
+        self.gas_price = gas_price
+        if fee_history is not None:
+            self.fee_history = fee_history
+        if chain_id is not None:
+            self.chain_id = chain_id
+        self.updated_at = time.monotonic()
+
+    async def refresh(self):
+        calls = [
+            ("eth_blockNumber", []),
+            ("eth_gasPrice", []),
+            ("eth_feeHistory", [hex(4), "latest", [50]]),
+        ]
+        if self.chain_id is None:
+            calls.append(("eth_chainId", []))
+
+        results = await self.rpc.batch(calls)
+        for result in results:
+            if isinstance(result, RPCError):
+                raise result
+
+        self.record(
+            block_number=int(results[0], 16),
+            gas_price=int(results[1], 16),
+            fee_history=results[2],
+            chain_id=int(results[3], 16) if len(results) > 3 else None
+        )
+
+    async def get_gas_price(self) -> int:
+        if not self.lookup():
+            await self.refresh()
+        return self.gas_price
+
+    async def get_chain_id(self) -> int:
+        # Chain id never changes, so it is served regardless of age
+        if self.chain_id is None:
+            self.misses += 1
+            await self.refresh()
+        else:
+            self.hits += 1
+        return self.chain_id
+
+    async def run(self):
+        while True:
+            try:
+                block_number = await self.rpc.w3.eth.block_number
+                if block_number != self.block_number:
+                    await self.refresh()
+                elif self.updated_at is not None:
+                    # Same block, same gas price: the cached values are still current
+                    self.updated_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("chain_cache_refresh_failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "age_seconds": self.age(),
+            "block_number": self.block_number
+        }
+
+
+def create_chain_cache(rpc: RPCClient) -> ChainCache:
+    return ChainCache(
+        rpc,
+        max_age=settings.CHAIN_CACHE_MAX_AGE,
+        poll_interval=settings.CHAIN_CACHE_POLL_INTERVAL
+    )
+
+
+def get_chain_cache(request: Request) -> ChainCache:
+    return request.app.state.chain
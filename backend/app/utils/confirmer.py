@@ -0,0 +1,349 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from fastapi import Request
+from sqlalchemy import bindparam, case, select, update
+from web3 import Web3
+from .balance_cache import BalanceCache
+from .log import get_logger
+from .rpc import RPCClient, RPCError
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.game import GameEntry
+from ..models.ledger import LedgerEntry
+from ..models.outbox import OutboundTransaction
+from ..models.payout import PayoutBatch
+
+log = get_logger(__name__)
+
+_payout_batches = PayoutBatch.__table__
+
+
+@dataclass
+class TrackedTransaction:
+    id: int
+    sender: str
+    game_entry_id: Optional[int]
+    payout_batch_id: Optional[int]
+
+
+@dataclass
+class Inclusion:
+    block_number: int
+    block_hash: str
+
+
+class BlockConfirmer:
+    """
+    Follows new blocks and settles broadcast transactions in bulk.
+
+    Every tick fetches the blocks added since the last tick in one JSON-RPC
+    batch and matches their transaction hashes against an in-memory index of
+    broadcast outbox rows, so no per-hash receipt polling is needed. A match
+    is settled once it is `depth` blocks deep: its receipt is read for the
+    success flag and each block's matches are written with one UPDATE. Gas
+    used by treasury payouts is added to their payout batch, and payouts
+    whose transaction failed go back in the payout queue. Only rows the
+    UPDATE moves out of broadcast are counted, so workers settling the same
+    block don't count a transaction twice.
+
+    Hashes of the last `reorg_window` blocks are kept. When a new block does
+    not extend them, matches above the fork point go back to waiting for
+    inclusion and the replacement blocks are scanned instead.
+    """
+
+    def __init__(
+        self,
+        rpc: RPCClient,
+        balances: Optional[BalanceCache],
+        depth: int,
+        poll_interval: float,
+        max_blocks: int,
+        reorg_window: int,
+        reload_interval: float
+    ):
+        self.rpc = rpc
+        self.balances = balances
+        self.depth = depth
+        self.poll_interval = poll_interval
+        self.max_blocks = max_blocks
+        self.reorg_window = reorg_window
+        self.reload_interval = reload_interval
+        self.head: Optional[int] = None
+        self.latest: Optional[int] = None
+        self.block_hashes: "OrderedDict[int, str]" = OrderedDict()
+        self.pending: Dict[str, TrackedTransaction] = {}
+        self.included: Dict[str, Inclusion] = {}
+        self._tracked_during_reload: Dict[str, TrackedTransaction] = {}
+        self._reloaded_at = None
+        self._task = None
+        self.blocks = 0
+        self.confirmed = 0
+        self.reverted = 0
+        self.reorgs = 0
+        self.errors = 0
+
+    def track(self, rows: Iterable[OutboundTransaction]):
+        """Start watching freshly broadcast transactions."""
+        for row in rows:
+            tracked = TrackedTransaction(row.id, row.sender, row.game_entry_id, row.payout_batch_id)
+            self.pending[row.tx_hash] = tracked
+            self._tracked_during_reload[row.tx_hash] = tracked
+
+    def note_inclusion(self, tx_hash: str, block_number: int, block_hash: str):
+        """Record an inclusion found outside block following, e.g. by the outbox sweep."""
+        if tx_hash in self.pending:
+            self.included[tx_hash] = Inclusion(block_number, block_hash)
+
+    async def reload(self):
+        # Picks up rows broadcast by other workers and forgets ones settled elsewhere
+        self._tracked_during_reload = {}
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(OutboundTransaction).where(OutboundTransaction.status == 'broadcast')
+            )).all()
+        pending = {row.tx_hash: TrackedTransaction(row.id, row.sender, row.game_entry_id, row.payout_batch_id) for row in rows}
+        # Rows tracked while the query ran may not have been committed in time to show up
+        pending.update(self._tracked_during_reload)
+        self.pending = pending
+        self.included = {h: inclusion for h, inclusion in self.included.items() if h in self.pending}
+        self._reloaded_at = time.monotonic()
+
+    async def _rewind(self):
+        """Find the highest known block still on the canonical chain and resume from there."""
+        numbers = list(self.block_hashes)
+        blocks = await self.rpc.batch([("eth_getBlockByNumber", [hex(n), False]) for n in numbers])
+
+        fork = numbers[0] - 1
+        for number, block in zip(numbers, blocks):
+            if isinstance(block, dict) and block["hash"] == self.block_hashes[number]:
+                fork = number
+            else:
+                break
+
+        for number in [n for n in self.block_hashes if n > fork]:
+            del self.block_hashes[number]
+        for tx_hash in [h for h, inclusion in self.included.items() if inclusion.block_number > fork]:
+            del self.included[tx_hash]
+        self.head = fork
+        self.reorgs += 1
+        log.warning("chain_reorganised", rescan_from=fork + 1)
+
+    async def follow(self, latest: int):
+        """Scan blocks after head up to latest, at most max_blocks per call."""
+        if self.head is None:
+            self.head = latest - 1
+        numbers = range(self.head + 1, min(latest, self.head + self.max_blocks) + 1)
+        if not numbers:
+            return
+
+        blocks = await self.rpc.batch([("eth_getBlockByNumber", [hex(n), False]) for n in numbers])
+        for number, block in zip(numbers, blocks):
+            if not isinstance(block, dict):
+                # Node has not caught up with its own head yet
+                break
+
+            parent_hash = self.block_hashes.get(number - 1)
+            if parent_hash is not None and block["parentHash"] != parent_hash:
+                await self._rewind()
+                return
+
+            self.block_hashes[number] = block["hash"]
+            while len(self.block_hashes) > self.reorg_window:
+                self.block_hashes.popitem(last=False)
+
+            for tx in block["transactions"]:
+                tx_hash = tx if isinstance(tx, str) else tx["hash"]
+                if tx_hash in self.pending:
+                    self.included[tx_hash] = Inclusion(number, block["hash"])
+            self.head = number
+            self.blocks += 1
+
+    async def settle(self, latest: int):
+        """Write out every inclusion that is at least depth blocks deep."""
+        due = [
+            (tx_hash, inclusion) for tx_hash, inclusion in self.included.items()
+            if latest - inclusion.block_number + 1 >= self.depth
+        ]
+        if not due:
+            return
+
+        receipts = await self.rpc.batch([("eth_getTransactionReceipt", [tx_hash]) for tx_hash, _ in due])
+
+        by_block: Dict[int, List[tuple]] = {}
+        fees: Dict[str, tuple] = {}
+        for (tx_hash, inclusion), receipt in zip(due, receipts):
+            if not isinstance(receipt, dict) or receipt["blockHash"] != inclusion.block_hash:
+                # Re-mined elsewhere since we saw it; wait for the new inclusion
+                del self.included[tx_hash]
+                continue
+            succeeded = int(receipt["status"], 16) == 1
+            by_block.setdefault(inclusion.block_number, []).append((tx_hash, succeeded))
+
+            if self.pending[tx_hash].payout_batch_id is not None:
+                gas_used = int(receipt["gasUsed"], 16)
+                gas_price = int(receipt.get("effectiveGasPrice", "0x0"), 16)
+                fees[tx_hash] = (gas_used, gas_used * gas_price)
+
+        mine = set()
+        payouts: Dict[int, List[int]] = {}
+        async with AsyncSessionLocal() as db:
+            for block_number, settled in by_block.items():
+                hashes = [tx_hash for tx_hash, _ in settled]
+                reverted = [tx_hash for tx_hash, succeeded in settled if not succeeded]
+                transitioned = set(await db.scalars(
+                    update(OutboundTransaction)
+                    .where(OutboundTransaction.tx_hash.in_(hashes), OutboundTransaction.status == 'broadcast')
+                    .values(
+                        status=case((OutboundTransaction.tx_hash.in_(reverted), 'failed'), else_='confirmed'),
+                        last_error=case((OutboundTransaction.tx_hash.in_(reverted), 'transaction reverted'), else_=None),
+                        block_number=block_number
+                    )
+                    .returning(OutboundTransaction.tx_hash)
+                    .execution_options(synchronize_session=False)
+                ))
+                # Rows another worker settled first are left to its counts
+                settled = [(tx_hash, succeeded) for tx_hash, succeeded in settled if tx_hash in transitioned]
+                mine.update(transitioned)
+
+                entries = {
+                    self.pending[tx_hash].game_entry_id: succeeded for tx_hash, succeeded in settled
+                    if self.pending[tx_hash].game_entry_id is not None
+                }
+                if entries:
+                    failed_entries = [entry_id for entry_id, succeeded in entries.items() if not succeeded]
+                    await db.execute(
+                        update(GameEntry)
+                        .where(GameEntry.id.in_(list(entries)), GameEntry.status == 'pending')
+                        .values(status=case((GameEntry.id.in_(failed_entries), 'failed'), else_='active'))
+                        .execution_options(synchronize_session=False)
+                    )
+
+                failed_payouts = [
+                    tx_hash for tx_hash, succeeded in settled
+                    if not succeeded and self.pending[tx_hash].payout_batch_id is not None
+                ]
+                if failed_payouts:
+                    await db.execute(
+                        update(LedgerEntry)
+                        .where(LedgerEntry.settlement_tx_hash.in_(failed_payouts))
+                        .values(settlement_tx_hash=None)
+                        .execution_options(synchronize_session=False)
+                    )
+
+                for tx_hash, succeeded in settled:
+                    batch_id = self.pending[tx_hash].payout_batch_id
+                    if batch_id is not None:
+                        totals = payouts.setdefault(batch_id, [0, 0, 0, 0])
+                        totals[0 if succeeded else 1] += 1
+                        totals[2] += fees[tx_hash][0]
+                        totals[3] += fees[tx_hash][1]
+
+            if payouts:
+                await db.execute(
+                    update(_payout_batches)
+                    .where(_payout_batches.c.id == bindparam("batch_id"))
+                    .values(
+                        confirmed=_payout_batches.c.confirmed + bindparam("confirmed"),
+                        failed=_payout_batches.c.failed + bindparam("failed"),
+                        gas_used=_payout_batches.c.gas_used + bindparam("gas_used"),
+                        fee=_payout_batches.c.fee + bindparam("fee"),
+                        status=case(
+                            (_payout_batches.c.failed + bindparam("failed") > 0, 'failed'),
+                            (_payout_batches.c.confirmed + bindparam("confirmed") >= _payout_batches.c.transactions, 'confirmed'),
+                            else_=_payout_batches.c.status
+                        )
+                    ),
+                    [
+                        {
+                            "batch_id": batch_id,
+                            "confirmed": confirmed,
+                            "failed": failed,
+                            "gas_used": gas_used,
+                            "fee": Web3.from_wei(fee, 'ether')
+                        }
+                        for batch_id, (confirmed, failed, gas_used, fee) in payouts.items()
+                    ]
+                )
+            await db.commit()
+
+        for settled in by_block.values():
+            for tx_hash, succeeded in settled:
+                tracked = self.pending.pop(tx_hash)
+                del self.included[tx_hash]
+                if self.balances is not None:
+                    self.balances.invalidate(tracked.sender)
+                if tx_hash not in mine:
+                    continue
+                if succeeded:
+                    self.confirmed += 1
+                else:
+                    self.reverted += 1
+
+    async def tick(self):
+        if self._reloaded_at is None or time.monotonic() - self._reloaded_at > self.reload_interval:
+            await self.reload()
+
+        result = (await self.rpc.batch([("eth_blockNumber", [])]))[0]
+        if isinstance(result, RPCError):
+            raise result
+        latest = self.latest = int(result, 16)
+
+        await self.follow(latest)
+        await self.settle(latest)
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("block_confirmer_failed")
+
+            # Keep going without sleeping while catching up on a backlog of blocks
+            if self.head is None or self.latest is None or self.head >= self.latest:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        return {
+            "head": self.head,
+            "depth": self.depth,
+            "pending": len(self.pending),
+            "included": len(self.included),
+            "blocks": self.blocks,
+            "confirmed": self.confirmed,
+            "reverted": self.reverted,
+            "reorgs": self.reorgs,
+            "errors": self.errors
+        }
+
+
+def create_block_confirmer(rpc: RPCClient, balances: Optional[BalanceCache] = None) -> BlockConfirmer:
+    return BlockConfirmer(
+        rpc,
+        balances,
+        depth=settings.CONFIRMATION_DEPTH,
+        poll_interval=settings.CONFIRMER_POLL_INTERVAL,
+        max_blocks=settings.CONFIRMER_MAX_BLOCKS,
+        reorg_window=settings.CONFIRMER_REORG_WINDOW,
+        reload_interval=settings.CONFIRMER_RELOAD_INTERVAL
+    )
+
+
+def get_confirmer(request: Request) -> BlockConfirmer:
+    return request.app.state.confirmer
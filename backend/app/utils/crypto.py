@@ -1,4 +1,9 @@
-from cryptography.fernet import Fernet
+from contextlib import contextmanager
+from typing import Iterator
+from cryptography.fernet import Fernet, MultiFernet
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from .cache import TTLCache
 from ..config import settings
 
 def get_encryption_key():
@@ -6,10 +11,48 @@ def get_encryption_key():
     # For development, store this in your .env file
     return settings.ENCRYPTION_KEY
 
+def _build_fernet() -> MultiFernet:
+    # ENCRYPTION_KEY may hold several comma-separated keys, newest first.
+    # New tokens use the first key; older keys stay valid for decryption.
+    keys = [key.strip() for key in get_encryption_key().split(",") if key.strip()]
+    return MultiFernet([Fernet(key) for key in keys])
+
+_fernet = _build_fernet()
+
 def encrypt_private_key(private_key: str) -> str:
-    f = Fernet(get_encryption_key())
-    return f.encrypt(private_key.encode()).decode()
+    return _fernet.encrypt(private_key.encode()).decode()
 
 def decrypt_private_key(encrypted_key: str) -> str:
-    f = Fernet(get_encryption_key())
-    return f.decrypt(encrypted_key.encode()).decode()
+    return _fernet.decrypt(encrypted_key.encode()).decode()
+
+def rotate_private_key(encrypted_key: str) -> str:
+    """Re-encrypt a stored key under the newest ENCRYPTION_KEY."""
+    return _fernet.rotate(encrypted_key.encode()).decode()
+
+
+# Opt-in: keeps decrypted accounts in memory for a short time so repeated
+# signing from the same wallet skips decryption and key derivation
+_accounts = TTLCache(maxsize=settings.ACCOUNT_CACHE_SIZE, ttl=settings.ACCOUNT_CACHE_TTL)
+
+@contextmanager
+def signing_account(encrypted_key: str) -> Iterator[LocalAccount]:
+    """
+    Decrypted account for a stored key, only to be used inside the with block.
+    Key material is never wiped: the decrypted key lives in immutable str and
+    bytes objects that Python copies freely, so it stays in memory until the
+    garbage collector reuses it. Uncached accounts are dropped on exit, cached
+    ones once evicted.
+    """
+    if not settings.ACCOUNT_CACHE_ENABLED:
+        yield Account.from_key(decrypt_private_key(encrypted_key))
+        return
+
+    _accounts.purge_expired()
+    account = _accounts.get(encrypted_key)
+    if account is None:
+        account = Account.from_key(decrypt_private_key(encrypted_key))
+        _accounts.set(encrypted_key, account)
+    yield account
+
+def account_cache_stats():
+    return {"enabled": settings.ACCOUNT_CACHE_ENABLED, **_accounts.stats()}
@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import Request
+from .cache import TTLCache
+from ..config import settings
+
+# Intrinsic gas of a plain value transfer to an account without code
+TRANSFER_GAS_LIMIT = 21000
+
+
+class GasLimitResolver:
+    """
+    Remembers which recipients have code so plain ETH transfers to EOAs can
+    use the intrinsic gas limit instead of a call to eth_estimateGas.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.has_code = TTLCache(maxsize, ttl)
+
+    def lookup(self, recipient: str) -> Optional[bool]:
+        """True for contracts, False for EOAs, None when eth_getCode is needed."""
+        return self.has_code.get(recipient.lower())
+
+    def record_code(self, recipient: str, code: str):
+        # Any code at all, including an EIP-7702 delegation, means the
+        # transfer can run arbitrary logic and has to be estimated
+        self.has_code.set(recipient.lower(), code not in (None, "", "0x"))
+
+    def stats(self):
+        return self.has_code.stats()
+
+
+def create_gas_limit_resolver() -> GasLimitResolver:
+    return GasLimitResolver(
+        maxsize=settings.GAS_CODE_CACHE_SIZE,
+        ttl=settings.GAS_CODE_CACHE_TTL
+    )
+
+
+def get_gas_limits(request: Request) -> GasLimitResolver:
+    return request.app.state.gas_limits
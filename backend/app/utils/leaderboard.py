@@ -0,0 +1,276 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import Request, WebSocket
+from sortedcontainers import SortedList
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from .log import get_logger
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.leaderboard import LeaderboardScore
+from ..models.user import User
+
+log = get_logger(__name__)
+
+MAX_SCORE = Decimal(10) ** 20
+# Re-read a window before the sync cursor, so commits that landed out of order are not missed
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+@dataclass
+class Client:
+    user_id: int
+    # (rank, score) last sent to this connection
+    sent: Optional[Tuple[int, Decimal]] = None
+
+
+def _parse_score(score) -> Decimal:
+    try:
+        value = Decimal(str(score))
+    except (InvalidOperation, ValueError):
+        raise ValueError("Score must be a number")
+    if not value.is_finite() or value < 0 or value >= MAX_SCORE:
+        raise ValueError("Score out of range")
+    return value
+
+
+class Leaderboard:
+    """
+    Best score per player, ranked in memory and pushed to WebSocket clients.
+
+    Scores are kept in a SortedList keyed by (-score, user_id), so an update,
+    a rank lookup and a top-K slice are all O(log n). Updates only mark the
+    board as changed; every broadcast_interval one diff frame with the top-K
+    rows that moved is sent to all clients, plus a rank frame to players whose
+    own position changed.
+
+    Raised scores are upserted into leaderboard_scores every sync_interval,
+    and rows written by other workers since the last sync are merged back in,
+    so every worker converges on the same board.
+    """
+
+    def __init__(self, top_size: int, broadcast_interval: float, sync_interval: float, send_timeout: float):
+        self.top_size = top_size
+        self.broadcast_interval = broadcast_interval
+        self.sync_interval = sync_interval
+        self.send_timeout = send_timeout
+        self.scores: Dict[int, Decimal] = {}
+        self.names: Dict[int, str] = {}
+        self.ranking = SortedList()
+        self.clients: Dict[WebSocket, Client] = {}
+        self._dirty: Set[int] = set()
+        self._changed = False
+        self._sent_top: Dict[int, dict] = {}
+        self._synced_to: Optional[datetime] = None
+        self._tasks: List[asyncio.Task] = []
+        self.seq = 0
+        self.updates = 0
+        self.frames = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def _set(self, user_id: int, name: str, score: Decimal) -> bool:
+        current = self.scores.get(user_id)
+        if current is not None:
+            if score <= current:
+                return False
+            self.ranking.remove((-current, user_id))
+        self.scores[user_id] = score
+        self.names[user_id] = name
+        self.ranking.add((-score, user_id))
+        self._changed = True
+        return True
+
+    def submit(self, user_id: int, name: str, score) -> bool:
+        """Record a score; returns True if it beat the player's best."""
+        if not self._set(user_id, name, _parse_score(score)):
+            return False
+        self._dirty.add(user_id)
+        self.updates += 1
+        return True
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.ranking.index((-score, user_id)) + 1
+
+    def top(self, k: int, offset: int = 0) -> List[dict]:
+        return [
+            {"rank": offset + i + 1, "id": user_id, "name": self.names[user_id], "score": float(-score)}
+            for i, (score, user_id) in enumerate(self.ranking.islice(offset, offset + k))
+        ]
+
+    async def load(self):
+        """Read every persisted score; called once at startup."""
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(LeaderboardScore.user_id, User.username, LeaderboardScore.score, LeaderboardScore.updated_at)
+                .join(User, User.id == LeaderboardScore.user_id)
+            )).all()
+        self._merge(rows)
+        self._sent_top = {row["id"]: row for row in self.top(self.top_size)}
+
+    def _merge(self, rows):
+        for user_id, name, score, updated_at in rows:
+            self._set(user_id, name, Decimal(score))
+            if self._synced_to is None or updated_at > self._synced_to:
+                self._synced_to = updated_at
+
+    async def save(self) -> int:
+        """Upsert the best scores raised since the last save."""
+        user_ids, self._dirty = self._dirty, set()
+        if not user_ids:
+            return 0
+        now = datetime.now(timezone.utc)
+        rows = [{"user_id": user_id, "score": self.scores[user_id], "updated_at": now} for user_id in user_ids]
+        try:
+            async with AsyncSessionLocal() as db:
+                if db.bind.dialect.name == "sqlite":
+                    stmt = sqlite.insert(LeaderboardScore)
+                    best = func.max(LeaderboardScore.score, stmt.excluded.score)
+                else:
+                    stmt = postgresql.insert(LeaderboardScore)
+                    best = func.greatest(LeaderboardScore.score, stmt.excluded.score)
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[LeaderboardScore.user_id],
+                        set_={"score": best, "updated_at": stmt.excluded.updated_at}
+                    ),
+                    rows
+                )
+                await db.commit()
+        except Exception:
+            self._dirty |= user_ids
+            raise
+        return len(rows)
+
+    async def sync(self):
+        """Merge in scores other workers have saved since the last sync."""
+        query = (
+            select(LeaderboardScore.user_id, User.username, LeaderboardScore.score, LeaderboardScore.updated_at)
+            .join(User, User.id == LeaderboardScore.user_id)
+        )
+        if self._synced_to is not None:
+            query = query.where(LeaderboardScore.updated_at >= self._synced_to - SYNC_OVERLAP)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+        self._merge(rows)
+
+    async def connect(self, websocket: WebSocket, user_id: int):
+        """Register an accepted connection and send it the last broadcast board."""
+        client = self.clients[websocket] = Client(user_id)
+        snapshot = {
+            "type": "snapshot",
+            "seq": self.seq,
+            "top": sorted(self._sent_top.values(), key=lambda row: row["rank"])
+        }
+        await self._send(websocket, json.dumps(snapshot))
+        await self._send_rank(websocket, client)
+
+    def disconnect(self, websocket: WebSocket):
+        self.clients.pop(websocket, None)
+
+    async def _send(self, websocket: WebSocket, text: str):
+        try:
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            self.frames += 1
+        except Exception:
+            # Slow or gone; its receive loop ends when the socket closes
+            if self.clients.pop(websocket, None) is not None:
+                self.dropped += 1
+
+    async def _send_rank(self, websocket: WebSocket, client: Client):
+        rank = self.rank(client.user_id)
+        if rank is None:
+            return
+        position = (rank, self.scores[client.user_id])
+        if position != client.sent:
+            client.sent = position
+            await self._send(websocket, json.dumps({"type": "rank", "rank": rank, "score": float(position[1])}))
+
+    async def broadcast(self):
+        """Send what changed since the last broadcast, if anything did."""
+        if not self._changed:
+            return
+        self._changed = False
+
+        top = {row["id"]: row for row in self.top(self.top_size)}
+        updated = [row for user_id, row in top.items() if self._sent_top.get(user_id) != row]
+        removed = [user_id for user_id in self._sent_top if user_id not in top]
+        self._sent_top = top
+
+        clients = list(self.clients.items())
+        sends = [self._send_rank(websocket, client) for websocket, client in clients]
+        if updated or removed:
+            self.seq += 1
+            # Serialized once and shared by every connection
+            frame = json.dumps({"type": "diff", "seq": self.seq, "updated": updated, "removed": removed})
+            sends += [self._send(websocket, frame) for websocket, _ in clients]
+        await asyncio.gather(*sends)
+
+    async def _broadcaster(self):
+        while True:
+            await asyncio.sleep(self.broadcast_interval)
+            try:
+                await self.broadcast()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("leaderboard_broadcast_failed")
+
+    async def _syncer(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.save()
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("leaderboard_sync_failed")
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._broadcaster()), asyncio.create_task(self._syncer())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            await self.save()
+        except Exception:
+            log.exception("leaderboard_save_on_shutdown_failed")
+
+    def stats(self):
+        return {
+            "players": len(self.scores),
+            "clients": len(self.clients),
+            "unsaved": len(self._dirty),
+            "updates": self.updates,
+            "seq": self.seq,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
+
+def create_leaderboard() -> Leaderboard:
+    return Leaderboard(
+        top_size=settings.LEADERBOARD_TOP_SIZE,
+        broadcast_interval=settings.LEADERBOARD_BROADCAST_INTERVAL,
+        sync_interval=settings.LEADERBOARD_SYNC_INTERVAL,
+        send_timeout=settings.LEADERBOARD_SEND_TIMEOUT
+    )
+
+
+def get_leaderboard(request: Request) -> Leaderboard:
+    return request.app.state.leaderboard
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import func, select, update
+from .payouts import PayoutEngine
+from ..database import AsyncSessionLocal
+from ..models.game import GameEntry
+from ..models.ledger import LedgerEntry
+from ..models.result import GameResult
+
+
+class LedgerError(Exception):
+    pass
+
+
+class GameLedger:
+    """
+    Game balances kept in the game entry row, with every change recorded in
+    the append-only ledger table.
+
+    credit() and debit() are one short transaction each: an atomic
+    UPDATE ... SET balance = balance + :amount, guarded by the game still
+    being active (and, for debits, by the balance staying non-negative), plus
+    its ledger row. Nothing is cached per worker, so any worker can apply
+    events for any game, and a cash-out pays out everything committed before it.
+
+    Cash-outs become payout rows, which the payout engine sends from the
+    treasury in batches.
+    """
+
+    def __init__(self, payouts: Optional[PayoutEngine]):
+        self.payouts = payouts
+        self.events = 0
+        self.cash_outs = 0
+        self.rejected = 0
+
+    async def _apply(self, game_entry_id: int, amount: Decimal, kind: str, reason: Optional[str]) -> Decimal:
+        async with AsyncSessionLocal() as db:
+            guarded = update(GameEntry).where(GameEntry.id == game_entry_id, GameEntry.status == 'active')
+            if amount < 0:
+                guarded = guarded.where(GameEntry.balance + amount >= 0)
+            balance = await db.scalar(
+                guarded
+                .values(balance=GameEntry.balance + amount, last_activity=func.now())
+                .returning(GameEntry.balance)
+            )
+            if balance is None:
+                game_status = await db.scalar(select(GameEntry.status).where(GameEntry.id == game_entry_id))
+                await db.rollback()
+                self.rejected += 1
+                if game_status == 'active':
+                    raise LedgerError("Insufficient game balance")
+                raise LedgerError(f"Game entry {game_entry_id} is not active")
+
+            db.add(LedgerEntry(game_entry_id=game_entry_id, amount=amount, kind=kind, reason=reason))
+            await db.commit()
+
+        self.events += 1
+        return balance
+
+    async def credit(self, game_entry_id: int, amount: Decimal, reason: Optional[str] = None) -> Decimal:
+        return await self._apply(game_entry_id, amount, 'credit', reason)
+
+    async def debit(self, game_entry_id: int, amount: Decimal, reason: Optional[str] = None) -> Decimal:
+        return await self._apply(game_entry_id, -amount, 'debit', reason)
+
+    async def cash_out(self, game_entry_id: int) -> Decimal:
+        """
+        End a game: its whole balance becomes a payout, the entry is completed
+        and its result (total credited, amount paid) is recorded for rankings.
+        Completing the entry locks its row, so credits racing the cash-out
+        either land before it and are paid or find the game closed.
+        """
+        async with AsyncSessionLocal() as db:
+            completed = (await db.execute(
+                update(GameEntry)
+                .where(GameEntry.id == game_entry_id, GameEntry.status == 'active')
+                .values(status='completed', last_activity=func.now())
+                .returning(GameEntry.user_id, GameEntry.balance)
+            )).one_or_none()
+            if completed is None:
+                await db.rollback()
+                self.rejected += 1
+                raise LedgerError(f"Game entry {game_entry_id} is not active")
+
+            user_id, amount = completed
+            if amount > 0:
+                await db.execute(
+                    update(GameEntry)
+                    .where(GameEntry.id == game_entry_id)
+                    .values(balance=GameEntry.balance - amount)
+                )
+                db.add(LedgerEntry(game_entry_id=game_entry_id, amount=-amount, kind='payout', reason='cash out'))
+                await db.flush()
+            credited = await db.scalar(
+                select(func.coalesce(func.sum(LedgerEntry.amount), 0))
+                .where(LedgerEntry.game_entry_id == game_entry_id, LedgerEntry.kind == 'credit')
+            )
+            db.add(GameResult(
+                game_entry_id=game_entry_id,
+                user_id=user_id,
+                score=credited,
+                reward=amount,
+                finished_at=datetime.now(timezone.utc)
+            ))
+            await db.commit()
+
+        self.cash_outs += 1
+        if amount > 0 and self.payouts is not None:
+            self.payouts.notify()
+        return amount
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "cash_outs": self.cash_outs,
+            "rejected": self.rejected
+        }
+
+
+def create_game_ledger(payouts: PayoutEngine) -> GameLedger:
+    return GameLedger(payouts)
+
+
+def get_ledger(request: Request) -> GameLedger:
+    return request.app.state.ledger
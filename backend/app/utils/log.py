@@ -0,0 +1,98 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from ..config import settings
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and the record's structured fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the event
+    loop: when the queue is full the record is dropped and counted instead.
+    """
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (and the traceback) happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredLogger:
+    """logging.Logger wrapper taking an event name plus keyword fields: log.info("tx_queued", tx_hash=...)."""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def _log(self, level: int, event: str, exc_info=None, **fields):
+        if self.logger.isEnabledFor(level):
+            # Built directly: Logger.log would walk the stack for a caller the JSON lines don't include
+            record = self.logger.makeRecord(
+                self.logger.name, level, "", 0, event, None, sys.exc_info() if exc_info else None
+            )
+            record.fields = fields
+            self.logger.handle(record)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, **fields)
+
+    def exception(self, event: str, **fields):
+        self._log(logging.ERROR, event, exc_info=True, **fields)
+
+
+_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+_stream = logging.StreamHandler(sys.stdout)
+_stream.setFormatter(JsonFormatter())
+_listener = QueueListener(_handler.queue, _stream, respect_handler_level=False)
+
+_root = logging.getLogger("wonder_realm")
+_root.setLevel(settings.LOG_LEVEL)
+_root.addHandler(_handler)
+_root.propagate = False
+
+_listener.start()
+# Drains whatever is still queued before the process exits
+atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(_root.getChild(name.rsplit(".", 1)[-1]))
+
+
+def log_stats():
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
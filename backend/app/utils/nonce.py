@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.nonce import AccountNonce
+from ..models.outbox import OutboundTransaction
+
+
+async def _locked_row(db, address: str, chain_nonce: int) -> AccountNonce:
+    # Create the row on first use; ON CONFLICT keeps concurrent first uses safe
+    insert = sqlite.insert if db.bind.dialect.name == "sqlite" else postgresql.insert
+    await db.execute(
+        insert(AccountNonce)
+        .values(address=address, next_nonce=chain_nonce)
+        .on_conflict_do_nothing(index_elements=[AccountNonce.address])
+    )
+    return (await db.execute(
+        select(AccountNonce).where(AccountNonce.address == address).with_for_update()
+    )).scalar_one()
+
+
+async def allocate_nonce(address: str, chain_nonce: int) -> int:
+    """
+    Reserve the next nonce for address.
+    The row lock serializes allocations across requests and uvicorn workers.
+    chain_nonce, the node's pending transaction count, moves the counter
+    forward if transactions were sent from elsewhere, and back over nonces
+    whose transactions all failed (see _rewind).
+    """
+    async with AsyncSessionLocal() as db:
+        row = await _locked_row(db, address, chain_nonce)
+        await _rewind(db, row, chain_nonce)
+        nonce = max(row.next_nonce, chain_nonce)
+        row.next_nonce = nonce + 1
+        await db.commit()
+        return nonce
+
+
+async def release_nonce(address: str, nonce: int):
+    """Hand back a nonce whose transaction was never accepted, if it is still the latest."""
+    async with AsyncSessionLocal() as db:
+        row = await _locked_row(db, address, nonce)
+        if row.next_nonce == nonce + 1:
+            row.next_nonce = nonce
+        await db.commit()
+
+
+async def _rewind(db, row: AccountNonce, chain_nonce: int):
+    """
+    Move the counter back to chain_nonce if it is ahead of the node only
+    because nonces were lost: their transactions were rejected or dropped,
+    or never reached the outbox (a worker died between allocating and
+    committing). Nothing is rewound while an outbox row at or above
+    chain_nonce is still outstanding. Lost allocations are told apart from
+    ones whose request hasn't committed yet by the newest row holding the
+    latest nonce, or else by the counter standing still for NONCE_REWIND_AFTER.
+    """
+    if row.next_nonce <= chain_nonce:
+        return
+    sent = (await db.execute(
+        select(OutboundTransaction.nonce, OutboundTransaction.status)
+        .where(OutboundTransaction.sender == row.address, OutboundTransaction.nonce >= chain_nonce)
+    )).all()
+    if any(status != 'failed' for _, status in sent):
+        return
+    if sent and max(nonce for nonce, _ in sent) + 1 == row.next_nonce:
+        row.next_nonce = chain_nonce
+        return
+    # SQLite hands back naive datetimes
+    updated_at = row.updated_at if row.updated_at.tzinfo else row.updated_at.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) - updated_at > timedelta(seconds=settings.NONCE_REWIND_AFTER):
+        row.next_nonce = chain_nonce
+
+
+async def rewind_nonce(address: str, chain_nonce: int):
+    """
+    After transactions from address were rejected or dropped, move the
+    counter back to chain_nonce so their nonces are used again instead of
+    leaving a gap that stalls every later transaction.
+    """
+    async with AsyncSessionLocal() as db:
+        row = await _locked_row(db, address, chain_nonce)
+        await _rewind(db, row, chain_nonce)
+        await db.commit()
@@ -0,0 +1,317 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+from eth_account.signers.local import LocalAccount
+from fastapi import Request
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .balance_cache import BalanceCache
+from .confirmer import BlockConfirmer
+from .log import get_logger
+from .nonce import allocate_nonce, release_nonce, rewind_nonce
+from .rpc import RPCClient, RPCError
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.game import GameEntry
+from ..models.ledger import LedgerEntry
+from ..models.outbox import OutboundTransaction
+from ..models.payout import PayoutBatch
+
+log = get_logger(__name__)
+
+
+async def queue_transaction(
+    db: AsyncSession,
+    account: LocalAccount,
+    transaction: dict,
+    chain_nonce: int
+) -> OutboundTransaction:
+    """
+    Sign transaction with a freshly allocated nonce and add it to the outbox.
+    The row is only added to db: the caller commits it together with whatever
+    the transaction pays for, and releases the nonce if that commit fails.
+    """
+    transaction['nonce'] = await allocate_nonce(transaction['from'], chain_nonce)
+    try:
+        signed_tx = account.sign_transaction(transaction)
+    except Exception:
+        await release_nonce(transaction['from'], transaction['nonce'])
+        raise
+    row = OutboundTransaction(
+        sender=transaction['from'],
+        nonce=transaction['nonce'],
+        tx_hash='0x' + signed_tx.hash.hex().removeprefix('0x'),
+        raw_transaction='0x' + signed_tx.raw_transaction.hex().removeprefix('0x'),
+        status='queued',
+        attempts=0
+    )
+    db.add(row)
+    return row
+
+
+def _already_accepted(error: RPCError) -> bool:
+    message = str(error).lower()
+    return "already known" in message or "known transaction" in message
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class TransactionOutbox:
+    """
+    Broadcasts queued transactions and keeps them moving until they settle.
+
+    Broadcaster tasks claim queued rows with FOR UPDATE SKIP LOCKED, so several
+    uvicorn workers can drain the same table, and send each claim as one
+    JSON-RPC batch. Broadcast rows are handed to the block confirmer, which
+    settles them; a slow sweep re-sends the ones no block has picked up.
+    When the node rejects a transaction or drops it for good, the sender's
+    nonce counter is resynced from its pending count so no gap is left.
+    """
+
+    def __init__(
+        self,
+        rpc: RPCClient,
+        confirmer: BlockConfirmer,
+        balances: Optional[BalanceCache],
+        workers: int,
+        batch_size: int,
+        poll_interval: float,
+        sweep_interval: float,
+        rebroadcast_after: float,
+        max_attempts: int
+    ):
+        self.rpc = rpc
+        self.confirmer = confirmer
+        self.balances = balances
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self.rebroadcast_after = rebroadcast_after
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._sweep_cursor = 0
+        self.broadcasts = 0
+        self.rebroadcasts = 0
+        self.failed = 0
+        self.errors = 0
+
+    def notify(self):
+        """Wake the broadcasters after committing new rows."""
+        self._wakeup.set()
+
+    async def _fail(self, db: AsyncSession, rows: List[OutboundTransaction], reason: str, requeue_payouts: bool = False):
+        for row in rows:
+            row.status = 'failed'
+            row.last_error = reason[:500]
+        entry_ids = [row.game_entry_id for row in rows if row.game_entry_id is not None]
+        if entry_ids:
+            await db.execute(
+                update(GameEntry)
+                .where(GameEntry.id.in_(entry_ids), GameEntry.status == 'pending')
+                .values(status='failed')
+            )
+        payouts = [row for row in rows if row.payout_batch_id is not None]
+        if payouts:
+            if requeue_payouts:
+                # Rejected by the node, so never mined: pay these wallets in the next flush
+                await db.execute(
+                    update(LedgerEntry)
+                    .where(LedgerEntry.settlement_tx_hash.in_([row.tx_hash for row in payouts]))
+                    .values(settlement_tx_hash=None)
+                )
+            for row in payouts:
+                await db.execute(
+                    update(PayoutBatch)
+                    .where(PayoutBatch.id == row.payout_batch_id)
+                    .values(failed=PayoutBatch.failed + 1, status='failed')
+                )
+        self.failed += len(rows)
+
+    async def _resync_nonces(self, senders: Set[str]):
+        """Rewind the nonce counters of senders whose transactions failed to their pending counts."""
+        senders = list(senders)
+        counts = await self.rpc.batch([("eth_getTransactionCount", [sender, "pending"]) for sender in senders])
+        for sender, count in zip(senders, counts):
+            if isinstance(count, RPCError):
+                log.warning("nonce_resync_failed", sender=sender, error=str(count))
+                continue
+            await rewind_nonce(sender, int(count, 16))
+
+    async def broadcast_once(self) -> int:
+        """Claim and send one batch of queued transactions; returns how many were claimed."""
+        rejected = set()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(OutboundTransaction)
+                .where(OutboundTransaction.status == 'queued')
+                .order_by(OutboundTransaction.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not rows:
+                return 0
+
+            # The claim is held until commit, so no other worker sends these rows
+            results = await self.rpc.batch([
+                ("eth_sendRawTransaction", [row.raw_transaction]) for row in rows
+            ])
+
+            now = datetime.now(timezone.utc)
+            for row, result in zip(rows, results):
+                row.attempts += 1
+                if isinstance(result, RPCError) and not _already_accepted(result):
+                    if row.attempts > 1 and "nonce too low" in str(result).lower():
+                        # An earlier send was probably mined; the confirmer or sweep decides
+                        row.status = 'broadcast'
+                        row.broadcast_at = now
+                        continue
+                    await self._fail(db, [row], str(result), requeue_payouts=True)
+                    rejected.add(row.sender)
+                    continue
+                row.status = 'broadcast'
+                row.broadcast_at = now
+                self.broadcasts += 1
+            await db.commit()
+
+        sent = [row for row in rows if row.status == 'broadcast']
+        self.confirmer.track(sent)
+        if self.balances is not None:
+            # The sender's balance is about to change; don't keep serving the old one
+            for row in sent:
+                self.balances.invalidate(row.sender)
+        if rejected:
+            await self._resync_nonces(rejected)
+        return len(rows)
+
+    async def sweep_once(self) -> bool:
+        """
+        Check the next batch of broadcast transactions that have gone without
+        a confirmation for rebroadcast_after seconds. Inclusions the block
+        confirmer missed (mined while no worker was running) are handed to it;
+        transactions the node has forgotten are re-sent or, after max_attempts,
+        failed. Batches walk the table by id; returns True once a sweep is complete.
+        """
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.rebroadcast_after)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(OutboundTransaction)
+                .where(
+                    OutboundTransaction.status == 'broadcast',
+                    OutboundTransaction.broadcast_at < stale_before,
+                    OutboundTransaction.id > self._sweep_cursor
+                )
+                .order_by(OutboundTransaction.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            swept = len(rows) < self.batch_size
+            self._sweep_cursor = 0 if swept else rows[-1].id
+            if not rows:
+                return swept
+
+            receipts = await self.rpc.batch([
+                ("eth_getTransactionReceipt", [row.tx_hash]) for row in rows
+            ])
+
+            dropped = []
+            for row, receipt in zip(rows, receipts):
+                if isinstance(receipt, dict):
+                    self.confirmer.note_inclusion(row.tx_hash, int(receipt["blockNumber"], 16), receipt["blockHash"])
+                elif receipt is None:
+                    if row.attempts >= self.max_attempts:
+                        dropped.append(row)
+                    else:
+                        # Not seen by the node any more: send the same signed bytes again
+                        row.status = 'queued'
+                        self.rebroadcasts += 1
+
+            if dropped:
+                await self._fail(db, dropped, f"no receipt after {self.max_attempts} broadcasts")
+            await db.commit()
+
+        if dropped:
+            await self._resync_nonces({row.sender for row in dropped})
+        if any(row.status == 'queued' for row in rows):
+            self.notify()
+        return swept
+
+    async def _broadcaster(self):
+        while True:
+            # Cleared before claiming so a notify() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                claimed = await self.broadcast_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("outbox_broadcast_failed")
+                claimed = 0
+
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _sweeper(self):
+        while True:
+            try:
+                swept = await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("outbox_sweep_failed")
+                self._sweep_cursor = 0
+                swept = True
+
+            if swept:
+                await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._broadcaster()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "broadcasts": self.broadcasts,
+            "rebroadcasts": self.rebroadcasts,
+            "failed": self.failed,
+            "errors": self.errors
+        }
+
+
+def create_transaction_outbox(
+    rpc: RPCClient,
+    confirmer: BlockConfirmer,
+    balances: Optional[BalanceCache] = None
+) -> TransactionOutbox:
+    return TransactionOutbox(
+        rpc,
+        confirmer,
+        balances,
+        workers=settings.OUTBOX_WORKERS,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL,
+        sweep_interval=settings.OUTBOX_SWEEP_INTERVAL,
+        rebroadcast_after=settings.OUTBOX_REBROADCAST_AFTER,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS
+    )
+
+
+def get_outbox(request: Request) -> TransactionOutbox:
+    return request.app.state.outbox
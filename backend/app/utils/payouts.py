@@ -0,0 +1,299 @@
+import asyncio
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from eth_abi import encode
+from fastapi import Request
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from web3 import Web3
+from .chain_cache import ChainCache
+from .crypto import signing_account
+from .gas import TRANSFER_GAS_LIMIT
+from .log import get_logger
+from .nonce import release_nonce
+from .outbox import TransactionOutbox, queue_transaction
+from .rpc import RPCClient, RPCError
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.game import GameEntry
+from ..models.ledger import LedgerEntry
+from ..models.outbox import OutboundTransaction
+from ..models.payout import PayoutBatch
+from ..models.user import User
+
+log = get_logger(__name__)
+
+# disperseEther(address[] recipients, uint256[] values), as deployed by disperse.app
+DISPERSE_ETHER = Web3.keccak(text="disperseEther(address[],uint256[])")[:4]
+
+
+def disperse_calldata(recipients: List[str], values: List[int]) -> str:
+    return '0x' + (DISPERSE_ETHER + encode(['address[]', 'uint256[]'], [recipients, values])).hex()
+
+
+class PayoutEngine:
+    """
+    Sends the treasury's payouts to players in batches.
+
+    Cash-outs leave unsettled payout rows in the ledger; those rows are the
+    queue. A flush runs every flush_interval seconds, or sooner once this
+    worker has queued flush_size payouts. It claims up to claim_limit rows
+    with FOR UPDATE SKIP LOCKED, nets them per wallet and pays up to
+    max_recipients wallets with one disperseEther call to the disperse
+    contract. Each call is estimated first; when there is no contract, a
+    single recipient, or the estimate fails (e.g. a recipient rejects
+    ether), that group falls back to one plain transfer per wallet.
+
+    Every group is recorded as a payout_batches row. The block confirmer
+    adds the gas used and fee paid from each receipt and, if a transaction
+    fails, hands its payouts back to the queue.
+    """
+
+    def __init__(
+        self,
+        rpc: RPCClient,
+        chain: ChainCache,
+        outbox: TransactionOutbox,
+        treasury_key: str,
+        contract_address: Optional[str],
+        flush_interval: float,
+        flush_size: int,
+        claim_limit: int,
+        max_recipients: int,
+        min_payout: Decimal,
+        gas_margin: float
+    ):
+        self.rpc = rpc
+        self.chain = chain
+        self.outbox = outbox
+        self.treasury_key = treasury_key
+        self.contract_address = Web3.to_checksum_address(contract_address) if contract_address else None
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.claim_limit = claim_limit
+        self.max_recipients = max_recipients
+        self.min_payout = min_payout
+        self.gas_margin = gas_margin
+        self.pending = 0
+        self.backlog = False
+        self._flush_now = asyncio.Event()
+        self._task = None
+        self.flushes = 0
+        self.disperse_calls = 0
+        self.transfers = 0
+        self.fallbacks = 0
+        self.recipients = 0
+        self.errors = 0
+
+    def notify(self, payouts: int = 1):
+        """Count payouts queued on this worker; flush early once there are flush_size."""
+        self.pending += payouts
+        if self.pending >= self.flush_size:
+            self._flush_now.set()
+
+    async def _claim(self, db: AsyncSession) -> Tuple[Dict[str, Decimal], Dict[str, List[int]]]:
+        rows = (await db.execute(
+            select(LedgerEntry.id, LedgerEntry.amount, User.wallet_address)
+            .join(GameEntry, GameEntry.id == LedgerEntry.game_entry_id)
+            .join(User, User.id == GameEntry.user_id)
+            .where(LedgerEntry.kind == 'payout', LedgerEntry.settlement_tx_hash.is_(None))
+            .order_by(LedgerEntry.id)
+            .limit(self.claim_limit)
+            .with_for_update(skip_locked=True, of=LedgerEntry)
+        )).all()
+        self.backlog = len(rows) >= self.claim_limit
+
+        owed = defaultdict(Decimal)
+        ledger_ids = defaultdict(list)
+        for ledger_id, amount, wallet_address in rows:
+            address = Web3.to_checksum_address(wallet_address)
+            owed[address] -= amount
+            ledger_ids[address].append(ledger_id)
+        return owed, ledger_ids
+
+    async def _plan(self, sender: str, groups: List[List[str]], owed: Dict[str, Decimal]) -> Tuple[int, List[Optional[int]]]:
+        """
+        The sender's pending nonce and a gas limit for each group's disperse
+        call, fetched in one JSON-RPC batch; None means send that group as
+        plain transfers.
+        """
+        estimated = [
+            i for i, group in enumerate(groups)
+            if self.contract_address is not None and len(group) > 1
+        ]
+        calls = [("eth_getTransactionCount", [sender, "pending"])] + [
+            ("eth_estimateGas", [{
+                "from": sender,
+                "to": self.contract_address,
+                "value": hex(sum(Web3.to_wei(owed[a], 'ether') for a in groups[i])),
+                "data": disperse_calldata(groups[i], [Web3.to_wei(owed[a], 'ether') for a in groups[i]])
+            }]) for i in estimated
+        ]
+        results = await self.rpc.batch(calls)
+        if isinstance(results[0], RPCError):
+            raise results[0]
+
+        gas_limits: List[Optional[int]] = [None] * len(groups)
+        for i, estimate in zip(estimated, results[1:]):
+            if isinstance(estimate, RPCError):
+                log.warning("disperse_estimate_failed", wallets=len(groups[i]), error=str(estimate))
+                self.fallbacks += 1
+                continue
+            gas_limits[i] = int(int(estimate, 16) * self.gas_margin)
+        return int(results[0], 16), gas_limits
+
+    async def flush(self) -> int:
+        """
+        Queue transactions for every claimed wallet owed at least min_payout;
+        smaller amounts keep accumulating. Returns the number of wallets paid.
+        """
+        self.pending = 0
+        async with AsyncSessionLocal() as db:
+            owed, ledger_ids = await self._claim(db)
+            recipients = [address for address, total in owed.items() if total >= self.min_payout]
+            if not recipients:
+                return 0
+            groups = [recipients[i:i + self.max_recipients] for i in range(0, len(recipients), self.max_recipients)]
+
+            gas_price = await self.chain.get_gas_price()
+            queued: List[OutboundTransaction] = []
+            paid: List[List[str]] = []
+            try:
+                with signing_account(self.treasury_key) as treasury:
+                    chain_nonce, gas_limits = await self._plan(treasury.address, groups, owed)
+                    # Sign everything before the first write: allocate_nonce commits on its
+                    # own connection, which SQLite can't do while this session holds its lock
+                    for group, gas_limit in zip(groups, gas_limits):
+                        await self._sign_group(db, treasury, group, owed, gas_price, gas_limit, chain_nonce, queued, paid)
+                for outbound, wallets in zip(queued, paid):
+                    await db.execute(
+                        update(LedgerEntry)
+                        .where(LedgerEntry.id.in_([i for address in wallets for i in ledger_ids[address]]))
+                        .values(settlement_tx_hash=outbound.tx_hash)
+                    )
+                await db.commit()
+            except Exception:
+                # Newest first, so each release finds its nonce at the head of the counter
+                for outbound in reversed(queued):
+                    await release_nonce(outbound.sender, outbound.nonce)
+                raise
+
+        self.outbox.notify()
+        self.flushes += 1
+        self.recipients += len(recipients)
+        self.disperse_calls += sum(1 for gas_limit in gas_limits if gas_limit is not None)
+        self.transfers += sum(len(group) for group, gas_limit in zip(groups, gas_limits) if gas_limit is None)
+        return len(recipients)
+
+    async def _sign_group(
+        self,
+        db: AsyncSession,
+        treasury,
+        group: List[str],
+        owed: Dict[str, Decimal],
+        gas_price: int,
+        gas_limit: Optional[int],
+        chain_nonce: int,
+        queued: List[OutboundTransaction],
+        paid: List[List[str]]
+    ):
+        """
+        Queue one disperse call for the group, or one transfer per wallet when
+        gas_limit is None; each transaction goes on queued and the wallets it
+        pays on paid.
+        """
+        values = [Web3.to_wei(owed[address], 'ether') for address in group]
+        batch = PayoutBatch(
+            method='disperse' if gas_limit is not None else 'transfer',
+            recipients=len(group),
+            amount=sum(owed[address] for address in group),
+            transactions=1 if gas_limit is not None else len(group),
+            gas_price=gas_price,
+            gas_limit=gas_limit if gas_limit is not None else TRANSFER_GAS_LIMIT * len(group)
+        )
+        db.add(batch)
+
+        if gas_limit is not None:
+            transactions = [(group, {
+                'to': self.contract_address,
+                'value': sum(values),
+                'data': disperse_calldata(group, values),
+                'gas': gas_limit
+            })]
+        else:
+            transactions = [([address], {
+                'to': address,
+                'value': value,
+                'gas': TRANSFER_GAS_LIMIT
+            }) for address, value in zip(group, values)]
+
+        for wallets, transaction in transactions:
+            outbound = await queue_transaction(db, treasury, {
+                'from': treasury.address,
+                'chainId': settings.BASE_CHAIN_ID,
+                'gasPrice': gas_price,
+                **transaction
+            }, chain_nonce)
+            outbound.payout_batch = batch
+            queued.append(outbound)
+            paid.append(wallets)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                # Keep going while claims come back full
+                while await self.flush() and self.backlog:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("payout_flush_failed")
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "recipients": self.recipients,
+            "disperse_calls": self.disperse_calls,
+            "transfers": self.transfers,
+            "fallbacks": self.fallbacks,
+            "errors": self.errors
+        }
+
+
+def create_payout_engine(rpc: RPCClient, chain: ChainCache, outbox: TransactionOutbox) -> PayoutEngine:
+    return PayoutEngine(
+        rpc,
+        chain,
+        outbox,
+        treasury_key=settings.TREASURY_ENCRYPTED_KEY,
+        contract_address=settings.DISPERSE_CONTRACT_ADDRESS,
+        flush_interval=settings.PAYOUT_FLUSH_INTERVAL,
+        flush_size=settings.PAYOUT_FLUSH_SIZE,
+        claim_limit=settings.PAYOUT_CLAIM_LIMIT,
+        max_recipients=settings.PAYOUT_MAX_RECIPIENTS,
+        min_payout=settings.PAYOUT_MIN_AMOUNT,
+        gas_margin=settings.PAYOUT_GAS_MARGIN
+    )
+
+
+def get_payouts(request: Request) -> PayoutEngine:
+    return request.app.state.payouts
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from typing import Optional
+from .chain_cache import ChainCache
+from .gas import GasLimitResolver, TRANSFER_GAS_LIMIT
+from .rpc import RPCClient, RPCError
+
+
+@dataclass
+class Preflight:
+    """Chain state needed to build and price a value transfer."""
+    chain_id: int
+    block_number: int
+    gas_price: int
+    nonce: int
+    balance: int
+    gas_estimate: Optional[int] = None
+    gas_error: Optional[str] = None
+
+    @property
+    def gas_limit(self) -> int:
+        # Fall back to the plain transfer limit when estimation failed
+        if self.gas_estimate is None:
+            return TRANSFER_GAS_LIMIT
+        return self.gas_estimate
+
+
+async def run_preflight(
+    rpc: RPCClient,
+    chain: ChainCache,
+    gas_limits: GasLimitResolver,
+    sender: str,
+    recipient: str,
+    value: int
+) -> Preflight:
+    """
+    Fetch everything a transfer needs before signing in a single JSON-RPC batch.
+    Gas price and chain id come from the chain cache; when it is stale they ride
+    along in the same batch and refresh it. Transfers to known EOAs use the
+    intrinsic gas limit; eth_estimateGas is only sent for contracts and for
+    recipients whose code isn't cached yet. Raises RPCError if any read fails;
+    a failed gas estimate is reported on the result instead, since callers
+    fall back to a default gas limit.
+    """
+    calls = {
+        "nonce": ("eth_getTransactionCount", [sender, "pending"]),
+        "balance": ("eth_getBalance", [sender, "latest"]),
+    }
+
+    is_contract = gas_limits.lookup(recipient)
+    if is_contract is None:
+        calls["code"] = ("eth_getCode", [recipient, "latest"])
+    if is_contract is not False:
+        tx = {"from": sender, "to": recipient, "value": hex(value)}
+        calls["gas"] = ("eth_estimateGas", [tx])
+
+    cached = chain.lookup() and chain.chain_id is not None
+    if not cached:
+        calls["block_number"] = ("eth_blockNumber", [])
+        calls["gas_price"] = ("eth_gasPrice", [])
+        calls["chain_id"] = ("eth_chainId", [])
+
+    results = dict(zip(calls, await rpc.batch(list(calls.values()))))
+    for name, result in results.items():
+        if name != "gas" and isinstance(result, RPCError):
+            raise result
+
+    if not cached:
+        chain.record(
+            block_number=int(results["block_number"], 16),
+            gas_price=int(results["gas_price"], 16),
+            chain_id=int(results["chain_id"], 16)
+        )
+    if "code" in results:
+        gas_limits.record_code(recipient, results["code"])
+
+    preflight = Preflight(
+        chain_id=chain.chain_id,
+        block_number=chain.block_number,
+        gas_price=chain.gas_price,
+        nonce=int(results["nonce"], 16),
+        balance=int(results["balance"], 16)
+    )
+
+    gas = results.get("gas")
+    if gas is None:
+        preflight.gas_estimate = TRANSFER_GAS_LIMIT
+    elif isinstance(gas, RPCError):
+        preflight.gas_error = str(gas)
+    else:
+        preflight.gas_estimate = int(gas, 16)
+    return preflight
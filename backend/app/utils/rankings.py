@@ -0,0 +1,197 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from .log import get_logger
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.leaderboard import AggregateWatermark, LeaderboardAggregate
+from ..models.result import GameResult
+
+log = get_logger(__name__)
+
+PERIODS = ('daily', 'weekly', 'all')
+ALL_TIME_START = date(1970, 1, 1)
+WATERMARK = 'game_results'
+
+
+def period_start(period: str, day: date) -> date:
+    """First day of the window containing day; weeks start on Monday (UTC)."""
+    if period == 'daily':
+        return day
+    if period == 'weekly':
+        return day - timedelta(days=day.weekday())
+    return ALL_TIME_START
+
+
+def current_windows(now: Optional[datetime] = None) -> dict:
+    today = (now or datetime.now(timezone.utc)).date()
+    return {period: period_start(period, today) for period in PERIODS}
+
+
+async def aggregates_version(db: AsyncSession) -> int:
+    """Changes whenever new results are folded in; used for ETags."""
+    return await db.scalar(
+        select(AggregateWatermark.last_id).where(AggregateWatermark.name == WATERMARK)
+    ) or 0
+
+
+class RankingAggregator:
+    """
+    Folds new game_results rows into leaderboard_aggregates, so the ranking
+    endpoints read precomputed totals instead of grouping results per request.
+
+    Each refresh locks the watermark row, reads the results after it in id
+    order, adds them to the daily, weekly and all-time totals with one
+    upsert, and advances the watermark in the same transaction; workers
+    therefore take turns and every result is counted exactly once. Results
+    younger than `lag` seconds are left for the next refresh, so a lower id
+    whose transaction commits late is not skipped.
+    """
+
+    def __init__(self, refresh_interval: float, batch_size: int, lag: float):
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.lag = lag
+        self.last_id = 0
+        self._task = None
+        self.refreshes = 0
+        self.results = 0
+        self.errors = 0
+
+    async def _lock_watermark(self, db: AsyncSession) -> AggregateWatermark:
+        insert = sqlite.insert if db.bind.dialect.name == "sqlite" else postgresql.insert
+        await db.execute(
+            insert(AggregateWatermark)
+            .values(name=WATERMARK, last_id=0)
+            .on_conflict_do_nothing(index_elements=[AggregateWatermark.name])
+        )
+        return (await db.execute(
+            select(AggregateWatermark).where(AggregateWatermark.name == WATERMARK).with_for_update()
+        )).scalar_one()
+
+    async def refresh_once(self) -> int:
+        """Fold in up to batch_size results; returns how many were folded."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.lag)
+        async with AsyncSessionLocal() as db:
+            watermark = await self._lock_watermark(db)
+            rows = (await db.execute(
+                select(GameResult.id, GameResult.user_id, GameResult.score, GameResult.reward, GameResult.finished_at)
+                .where(GameResult.id > watermark.last_id)
+                .order_by(GameResult.id)
+                .limit(self.batch_size)
+            )).all()
+
+            totals = defaultdict(lambda: [Decimal(0), Decimal(0), 0, Decimal(0)])
+            folded = 0
+            for result_id, user_id, score, reward, finished_at in rows:
+                # SQLite hands back naive datetimes
+                finished_at = finished_at if finished_at.tzinfo else finished_at.replace(tzinfo=timezone.utc)
+                if finished_at > cutoff:
+                    break
+                for period in PERIODS:
+                    total = totals[(period, period_start(period, finished_at.date()), user_id)]
+                    total[0] += score
+                    total[1] = max(total[1], score)
+                    total[2] += 1
+                    total[3] += reward
+                watermark.last_id = result_id
+                folded += 1
+
+            if folded:
+                if db.bind.dialect.name == "sqlite":
+                    stmt = sqlite.insert(LeaderboardAggregate)
+                    greatest = func.max
+                else:
+                    stmt = postgresql.insert(LeaderboardAggregate)
+                    greatest = func.greatest
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[
+                            LeaderboardAggregate.period,
+                            LeaderboardAggregate.period_start,
+                            LeaderboardAggregate.user_id
+                        ],
+                        set_={
+                            "total_score": LeaderboardAggregate.total_score + stmt.excluded.total_score,
+                            "best_score": greatest(LeaderboardAggregate.best_score, stmt.excluded.best_score),
+                            "games": LeaderboardAggregate.games + stmt.excluded.games,
+                            "rewards": LeaderboardAggregate.rewards + stmt.excluded.rewards
+                        }
+                    ),
+                    [
+                        {
+                            "period": period,
+                            "period_start": start,
+                            "user_id": user_id,
+                            "total_score": total_score,
+                            "best_score": best_score,
+                            "games": games,
+                            "rewards": rewards
+                        }
+                        for (period, start, user_id), (total_score, best_score, games, rewards) in totals.items()
+                    ]
+                )
+            self.last_id = watermark.last_id
+            await db.commit()
+
+        self.results += folded
+        return folded
+
+    async def refresh(self) -> int:
+        """Fold in every result old enough to count."""
+        total = 0
+        while True:
+            folded = await self.refresh_once()
+            total += folded
+            if folded < self.batch_size:
+                break
+        self.refreshes += 1
+        return total
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("ranking_refresh_failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        return {
+            "last_id": self.last_id,
+            "refreshes": self.refreshes,
+            "results": self.results,
+            "errors": self.errors
+        }
+
+
+def create_ranking_aggregator() -> RankingAggregator:
+    return RankingAggregator(
+        refresh_interval=settings.RANKINGS_REFRESH_INTERVAL,
+        batch_size=settings.RANKINGS_BATCH_SIZE,
+        lag=settings.RANKINGS_LAG
+    )
+
+
+def get_rankings(request: Request) -> RankingAggregator:
+    return request.app.state.rankings
@@ -0,0 +1,264 @@
+import asyncio
+import math
+import time
+from typing import AsyncIterator, Dict, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from .auth import CurrentUser, get_current_user
+from .cache import TTLCache
+from .log import get_logger
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.ratelimit import RateLimitBucket
+
+log = get_logger(__name__)
+
+
+class BucketRule:
+    """burst requests at once, refilled at per_minute requests a minute."""
+
+    def __init__(self, burst: int, per_minute: float):
+        self.burst = burst
+        self.rate = per_minute / 60
+
+    @property
+    def refill_time(self) -> float:
+        # After this long untouched a bucket is full again, so it can be forgotten
+        return self.burst / self.rate
+
+    def take(self, tokens: float, elapsed: float) -> Tuple[float, float]:
+        """(tokens left, seconds to wait): wait is 0 if a token was taken."""
+        tokens = min(self.burst, tokens + elapsed * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+
+class MemoryBucketStore:
+    """Buckets of this worker only: each uvicorn worker admits up to the limit on its own."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.caches: Dict[str, TTLCache] = {}
+
+    async def take(self, route_class: str, user_id: int, rule: BucketRule) -> float:
+        cache = self.caches.get(route_class)
+        if cache is None:
+            cache = self.caches[route_class] = TTLCache(self.maxsize, rule.refill_time)
+        now = time.monotonic()
+        tokens, refilled_at = cache.get(user_id, (rule.burst, now))
+        tokens, wait = rule.take(tokens, now - refilled_at)
+        cache.set(user_id, (tokens, now))
+        return wait
+
+    async def purge(self, older_than: float):
+        # Entries expire on their own once their bucket would be full again
+        for cache in self.caches.values():
+            cache.purge_expired()
+
+
+class DatabaseBucketStore:
+    """
+    Buckets in the rate_limit_buckets table, shared by every worker. Each take
+    locks its bucket's row for one short transaction, like nonce allocation.
+    """
+
+    async def take(self, route_class: str, user_id: int, rule: BucketRule) -> float:
+        key = f"{route_class}:{user_id}"
+        now = time.time()
+        async with AsyncSessionLocal() as db:
+            insert = sqlite.insert if db.bind.dialect.name == "sqlite" else postgresql.insert
+            await db.execute(
+                insert(RateLimitBucket)
+                .values(key=key, tokens=rule.burst, refilled_at=now)
+                .on_conflict_do_nothing(index_elements=[RateLimitBucket.key])
+            )
+            bucket = (await db.execute(
+                select(RateLimitBucket).where(RateLimitBucket.key == key).with_for_update()
+            )).scalar_one()
+            bucket.tokens, wait = rule.take(bucket.tokens, max(0.0, now - bucket.refilled_at))
+            bucket.refilled_at = now
+            await db.commit()
+        return wait
+
+    async def purge(self, older_than: float):
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(RateLimitBucket).where(RateLimitBucket.refilled_at < time.time() - older_than))
+            await db.commit()
+
+
+class RateLimiter:
+    """
+    Admission control for endpoints that spend RPC calls and sign transactions.
+
+    A request first needs one of max_in_flight slots shared by all route
+    classes on this worker; when none is free it is turned away immediately
+    rather than queued. It then takes a token from the user's bucket for its
+    route class (rules), so a client polling one endpoint can't exhaust the
+    others. Both rejections carry Retry-After.
+
+    The buckets live in store: any object with async take(route_class,
+    user_id, rule) returning the seconds to wait, and purge(older_than). If
+    a shared store fails, requests are admitted rather than the endpoints
+    going down with it.
+    """
+
+    def __init__(self, rules: Dict[str, BucketRule], store, max_in_flight: int, purge_interval: float):
+        self.rules = rules
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self.purge_interval = purge_interval
+        self.in_flight = 0
+        self._task = None
+        self.admitted = {route_class: 0 for route_class in rules}
+        self.limited = {route_class: 0 for route_class in rules}
+        self.saturated = 0
+        self.errors = 0
+
+    async def acquire(self, route_class: str, user_id: int):
+        """Take an in-flight slot and a token from the user's bucket, or raise 503/429; release() after."""
+        if self.in_flight >= self.max_in_flight:
+            self.saturated += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The network is busy. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        # Held while the store is consulted, so concurrent requests can't overshoot the cap
+        self.in_flight += 1
+        admitted = False
+        try:
+            try:
+                wait = await self.store.take(route_class, user_id, self.rules[route_class])
+            except Exception:
+                self.errors += 1
+                log.exception("rate_limit_store_failed", route_class=route_class)
+                wait = 0.0
+
+            if wait > 0:
+                self.limited[route_class] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests. Please slow down.",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+            self.admitted[route_class] += 1
+            admitted = True
+        finally:
+            # Turned away, or cancelled while waiting on the store
+            if not admitted:
+                self.in_flight -= 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    async def purge(self):
+        await self.store.purge(max(rule.refill_time for rule in self.rules.values()))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("rate_limit_purge_failed")
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        return {
+            "backend": type(self.store).__name__,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": dict(self.admitted),
+            "limited": dict(self.limited),
+            "saturated": self.saturated,
+            "errors": self.errors
+        }
+
+
+def create_rate_limiter() -> RateLimiter:
+    rules = {
+        "withdraw": BucketRule(settings.RATE_LIMIT_WITHDRAW_BURST, settings.RATE_LIMIT_WITHDRAW_PER_MINUTE),
+        "estimate": BucketRule(settings.RATE_LIMIT_ESTIMATE_BURST, settings.RATE_LIMIT_ESTIMATE_PER_MINUTE),
+        "entry": BucketRule(settings.RATE_LIMIT_ENTRY_BURST, settings.RATE_LIMIT_ENTRY_PER_MINUTE),
+        "balances": BucketRule(settings.RATE_LIMIT_BALANCES_BURST, settings.RATE_LIMIT_BALANCES_PER_MINUTE),
+    }
+    if settings.RATE_LIMIT_BACKEND == "database":
+        store = DatabaseBucketStore()
+    elif settings.RATE_LIMIT_BACKEND == "memory":
+        store = MemoryBucketStore(settings.RATE_LIMIT_MAX_USERS)
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+    return RateLimiter(rules, store, settings.RPC_MAX_IN_FLIGHT, settings.RATE_LIMIT_PURGE_INTERVAL)
+
+
+def get_rate_limiter(request: Request) -> RateLimiter:
+    return request.app.state.rate_limiter
+
+
+class InFlightSlot:
+    """
+    An admitted request's in-flight slot, given back when the rate_limit
+    dependency exits. FastAPI runs that exit before a StreamingResponse body
+    is sent, so streaming handlers return stream() instead, which holds the
+    slot until the body is done or the client goes away.
+    """
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self.held = True
+        self.streaming = False
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.limiter.release()
+
+    def stream(self, body: AsyncIterator, media_type: str) -> StreamingResponse:
+        self.streaming = True
+        # The background task covers a body that never started, e.g. the client left first
+        return StreamingResponse(self._hold(body), media_type=media_type, background=BackgroundTask(self.release))
+
+    async def _hold(self, body: AsyncIterator) -> AsyncIterator:
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            self.release()
+
+
+def rate_limit(route_class: str):
+    """
+    Route dependency: @router.post(..., dependencies=[Depends(rate_limit("withdraw"))]).
+    Streaming handlers take it as a parameter instead and return slot.stream(...).
+    """
+
+    async def admit(
+        current_user: CurrentUser = Depends(get_current_user),
+        limiter: RateLimiter = Depends(get_rate_limiter)
+    ):
+        await limiter.acquire(route_class, current_user.id)
+        slot = InFlightSlot(limiter)
+        try:
+            yield slot
+        finally:
+            if not slot.streaming:
+                slot.release()
+
+    return admit
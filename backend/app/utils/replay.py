@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Sequence, Tuple
+import numpy as np
+from fastapi import Request
+from .log import get_logger
+from ..config import settings
+
+log = get_logger(__name__)
+
+# Input log format: b"WR", a version byte, then one byte per run of ticks
+# holding the same input: the high nibble is the input mask, the low nibble
+# the run length minus one. Runs longer than 16 ticks repeat the byte.
+MAGIC = b"WR"
+VERSION = 1
+LEFT, RIGHT, UP, DOWN = 1, 2, 4, 8
+
+# Deterministic version of the crossing game in GameMap.js, in integer world
+# units on a fixed 800x600 field, stepped TICK_RATE times per second.
+TICK_RATE = 20
+MAX_TICKS = 300 * TICK_RATE
+WORLD_WIDTH = 800
+WORLD_HEIGHT = 600
+PLAYER_HALF = 16
+PLAYER_SPEED = 8
+START_X = 400
+START_Y = 550
+FINISH_Y = 50
+LANE_HEIGHT = 80
+
+WATER_TOP = 80
+LOG_SPEEDS = np.array([5, -5, 5], dtype=np.int64)
+LOGS_PER_LANE = 2
+LOG_HALF = 80
+LOG_SPAN = WORLD_WIDTH + 4 * LOG_HALF
+
+ROAD_TOP = 340
+CAR_SPEEDS = np.array([10, -10], dtype=np.int64)
+CARS_PER_LANE = 3
+CAR_HALF = 40
+CAR_SPAN = WORLD_WIDTH + 200
+
+# Score is counted in units of 0.0001 ETH: the first crossing pays 0.5 ETH and
+# each one after pays double, up to REWARD_CAP so the total can't overflow
+SCORE_UNIT = Decimal("0.0001")
+FIRST_REWARD = 5000
+REWARD_CAP = 2 ** 40
+
+
+def encode_inputs(masks: Sequence[int]) -> bytes:
+    """Run-length encode one input mask per tick into a replay log."""
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    i = 0
+    while i < len(masks):
+        run = 1
+        while run < 16 and i + run < len(masks) and masks[i + run] == masks[i]:
+            run += 1
+        out.append((masks[i] << 4) | (run - 1))
+        i += run
+    return bytes(out)
+
+
+def session_seed(game_entry_id: int) -> int:
+    """
+    Obstacle seed for a game, keyed with SECRET_KEY so a log can't be worked
+    out offline from the public entry id before the game starts.
+    """
+    digest = hmac.new(settings.SECRET_KEY.encode(), b"replay:%d" % game_entry_id, hashlib.sha256).digest()
+    return int.from_bytes(digest[:4], "big")
+
+
+def decode_inputs(log: bytes) -> np.ndarray:
+    """One uint8 input mask per tick; raises ValueError on a malformed log."""
+    if len(log) < 3 or log[:2] != MAGIC or log[2] != VERSION:
+        raise ValueError("Not a replay log")
+    body = np.frombuffer(log, dtype=np.uint8, offset=3)
+    masks = np.repeat(body >> 4, (body & 0x0F).astype(np.int64) + 1)
+    if len(masks) > MAX_TICKS:
+        raise ValueError("Replay is longer than a game")
+    return masks
+
+
+def _phases(seeds: np.ndarray, lanes: int, span: int) -> np.ndarray:
+    # Each game's obstacles start at offsets derived from its session seed
+    lane = np.arange(1, lanes + 1, dtype=np.int64)
+    return (seeds[:, None] * 7919 + lane[None, :] * 104729) % span
+
+
+def _obstacles(phases: np.ndarray, speeds: np.ndarray, per_lane: int, span: int, margin: int, tick: int) -> np.ndarray:
+    """x of every obstacle at tick, shaped (sessions, lanes, per_lane)."""
+    offsets = np.arange(per_lane, dtype=np.int64) * (span // per_lane)
+    return (phases[:, :, None] + offsets + speeds[None, :, None] * tick) % span - margin
+
+
+def simulate(seeds: np.ndarray, inputs: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Replay many sessions at once. inputs is (sessions, ticks) of input masks,
+    lengths how many of those ticks each log covers. Returns the score in
+    SCORE_UNITs, the number of ticks played and whether the player was hit.
+
+    Every tick is a handful of array operations over all sessions still in
+    play; finished sessions are compacted away as the batch thins out.
+    """
+    count = len(seeds)
+    score = np.zeros(count, dtype=np.int64)
+    ticks = np.zeros(count, dtype=np.int64)
+    hit = np.zeros(count, dtype=bool)
+
+    # Working set, indexed by position in `ids`
+    ids = np.arange(count)
+    x = np.full(count, START_X, dtype=np.int64)
+    y = np.full(count, START_Y, dtype=np.int64)
+    reward = np.full(count, FIRST_REWARD, dtype=np.int64)
+    won = np.zeros(count, dtype=np.int64)
+    log_phases = _phases(seeds, len(LOG_SPEEDS), LOG_SPAN)
+    car_phases = _phases(seeds, len(CAR_SPEEDS), CAR_SPAN)
+    ends = np.minimum(lengths, MAX_TICKS)
+    alive = np.ones(count, dtype=bool)
+
+    for tick in range(int(ends.max(initial=0))):
+        live = alive & (tick < ends)
+        if tick % 64 == 0:
+            # Store what finished sessions earned and drop them from the working set
+            done = ~live
+            if done.any():
+                score[ids[done]] = won[done]
+                keep = np.flatnonzero(live)
+                ids, x, y, reward, won, ends, alive = (
+                    ids[keep], x[keep], y[keep], reward[keep], won[keep], ends[keep], alive[keep]
+                )
+                log_phases, car_phases = log_phases[keep], car_phases[keep]
+                live = live[keep]
+                if not len(ids):
+                    break
+        rows = np.arange(len(ids))
+
+        masks = inputs[ids, tick]
+        dx = np.where(masks & LEFT, -PLAYER_SPEED, np.where(masks & RIGHT, PLAYER_SPEED, 0))
+        dy = np.where(masks & UP, -PLAYER_SPEED, np.where(masks & DOWN, PLAYER_SPEED, 0))
+        x = np.where(live, np.clip(x + dx, PLAYER_HALF, WORLD_WIDTH - PLAYER_HALF), x)
+        y = np.where(live, np.clip(y + dy, PLAYER_HALF, WORLD_HEIGHT - PLAYER_HALF), y)
+
+        # Cars: touching one ends the game
+        on_road = live & (y >= ROAD_TOP) & (y < ROAD_TOP + LANE_HEIGHT * len(CAR_SPEEDS))
+        lane = np.clip((y - ROAD_TOP) // LANE_HEIGHT, 0, len(CAR_SPEEDS) - 1)
+        cars = _obstacles(car_phases, CAR_SPEEDS, CARS_PER_LANE, CAR_SPAN, 100, tick + 1)[rows, lane]
+        struck = on_road & (np.abs(cars - x[:, None]) < CAR_HALF + PLAYER_HALF).any(axis=1)
+        alive &= ~struck
+        live &= ~struck
+
+        # Water: ride a log or go back to the start
+        in_water = live & (y >= WATER_TOP) & (y < WATER_TOP + LANE_HEIGHT * len(LOG_SPEEDS))
+        lane = np.clip((y - WATER_TOP) // LANE_HEIGHT, 0, len(LOG_SPEEDS) - 1)
+        logs = _obstacles(log_phases, LOG_SPEEDS, LOGS_PER_LANE, LOG_SPAN, 2 * LOG_HALF, tick + 1)[rows, lane]
+        riding = in_water & (np.abs(logs - x[:, None]) < LOG_HALF).any(axis=1)
+        x = np.where(riding, np.clip(x + LOG_SPEEDS[lane], PLAYER_HALF, WORLD_WIDTH - PLAYER_HALF), x)
+        drowned = in_water & ~riding
+
+        # Reaching the top pays the round's reward and starts the next round
+        crossed = live & (y < FINISH_Y)
+        won += np.where(crossed, reward, 0)
+        reward = np.where(crossed, np.minimum(reward * 2, REWARD_CAP), reward)
+        reset = drowned | crossed
+        x = np.where(reset, START_X, x)
+        y = np.where(reset, START_Y, y)
+
+        ticks[ids[live | struck]] = tick + 1
+        hit[ids[struck]] = True
+
+    score[ids] = won
+    return score, ticks, hit
+
+
+@dataclass
+class ReplayResult:
+    score: Decimal
+    ticks: int
+    hit: bool
+    valid: bool
+
+
+class ReplayVerifier:
+    """
+    Checks claimed scores by replaying input logs, many sessions per batch.
+
+    verify() queues a session and waits; a background task takes up to
+    batch_size queued sessions (waiting at most max_wait for a batch to
+    fill) and simulates them together on a dedicated thread, so the event
+    loop keeps serving requests while a batch runs.
+    """
+
+    def __init__(self, batch_size: int, max_wait: float, max_log_bytes: int):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_log_bytes = max_log_bytes
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replay")
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.verified = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def verify(self, seed: int, log: bytes, claimed: Decimal, max_ticks: int = MAX_TICKS) -> ReplayResult:
+        """
+        Raises ValueError if the log can't be decoded or covers more than
+        max_ticks, e.g. more time than the game has been running.
+        """
+        if len(log) > self.max_log_bytes:
+            raise ValueError("Replay log too large")
+        masks = decode_inputs(log)
+        if len(masks) > max_ticks:
+            raise ValueError("Replay is longer than the game has been running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((seed, masks, claimed, future))
+        return await future
+
+    @staticmethod
+    def _run(batch: List[tuple]) -> List[ReplayResult]:
+        seeds = np.array([seed for seed, _, _, _ in batch], dtype=np.int64)
+        lengths = np.array([len(masks) for _, masks, _, _ in batch], dtype=np.int64)
+        inputs = np.zeros((len(batch), int(lengths.max(initial=0)) or 1), dtype=np.uint8)
+        for row, (_, masks, _, _) in enumerate(batch):
+            inputs[row, :len(masks)] = masks
+
+        scores, ticks, hit = simulate(seeds, inputs, lengths)
+        results = []
+        for (_, _, claimed, _), score, played, struck in zip(batch, scores, ticks, hit):
+            score = Decimal(int(score)) * SCORE_UNIT
+            results.append(ReplayResult(score, int(played), bool(struck), score == claimed))
+        return results
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self._run, batch)
+            except Exception as e:
+                self.errors += 1
+                log.exception("replay_batch_failed", sessions=len(batch))
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            for (*_, future), result in zip(batch, results):
+                if result.valid:
+                    self.verified += 1
+                else:
+                    self.rejected += 1
+                if not future.done():
+                    future.set_result(result)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "errors": self.errors
+        }
+
+
+def create_replay_verifier() -> ReplayVerifier:
+    return ReplayVerifier(
+        batch_size=settings.REPLAY_BATCH_SIZE,
+        max_wait=settings.REPLAY_MAX_WAIT,
+        max_log_bytes=settings.REPLAY_MAX_LOG_BYTES
+    )
+
+
+def get_replay_verifier(request: Request) -> ReplayVerifier:
+    return request.app.state.replays
@@ -0,0 +1,141 @@
+import time
+from typing import Any, List, Tuple
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from fastapi import Request
+from web3 import AsyncHTTPProvider, AsyncWeb3
+from .metrics import rpc_call_duration, rpc_call_errors
+from ..config import settings
+
+
+class RPCError(Exception):
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.code = error.get("code")
+        super().__init__(f"{method} failed: {error.get('message', error)}")
+
+
+def _error_class(error: dict) -> str:
+    """Metric label for a JSON-RPC error object, e.g. rpc_-32000 for execution reverted."""
+    return f"rpc_{error.get('code', 'unknown')}" if isinstance(error, dict) else "rpc_unknown"
+
+
+class TimedHTTPProvider(AsyncHTTPProvider):
+    """Records every web3 call's duration, and its failures by error class."""
+
+    async def make_request(self, method, params):
+        start = time.perf_counter()
+        try:
+            response = await super().make_request(method, params)
+        except Exception as e:
+            rpc_call_errors.inc(method, type(e).__name__)
+            raise
+        finally:
+            rpc_call_duration.observe(time.perf_counter() - start, method)
+        if "error" in response:
+            rpc_call_errors.inc(method, _error_class(response["error"]))
+        return response
+
+
+class RPCClient:
+    """Application-scoped async web3 client backed by a keep-alive connection pool."""
+
+    def __init__(self, rpc_url: str, pool_size: int, timeout: float):
+        self.rpc_url = rpc_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.session = None
+        self.w3 = AsyncWeb3(TimedHTTPProvider(
+            rpc_url,
+            request_kwargs={"timeout": ClientTimeout(total=timeout)}
+        ))
+
+    async def connect(self):
+        trace = TraceConfig()
+        trace.on_connection_reuseconn.append(self._on_reuse)
+        trace.on_connection_create_end.append(self._on_create)
+
+        self.session = ClientSession(
+            connector=TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+            timeout=ClientTimeout(total=self.timeout),
+            trace_configs=[trace]
+        )
+        await self.w3.provider.cache_async_session(self.session)
+
+    async def _on_reuse(self, session, context, params):
+        self.hits += 1
+
+    async def _on_create(self, session, context, params):
+        self.misses += 1
+
+    async def batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """
+        Send several JSON-RPC calls in one HTTP round-trip.
+        Returns one entry per call, in order: the raw result, or an RPCError
+        for calls the node rejected, so callers can decide which failures matter.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        start = time.perf_counter()
+        try:
+            async with self.session.post(self.rpc_url, json=payload) as response:
+                response.raise_for_status()
+                body = await response.json(content_type=None)
+        except Exception as e:
+            for method, _ in calls:
+                rpc_call_errors.inc(method, type(e).__name__)
+            raise
+        finally:
+            # Every call in the batch waited for the whole round-trip
+            elapsed = time.perf_counter() - start
+            for method, _ in calls:
+                rpc_call_duration.observe(elapsed, method)
+
+        if not isinstance(body, list):
+            # Some nodes answer a rejected batch with a single error object
+            for method, _ in calls:
+                rpc_call_errors.inc(method, _error_class(body.get("error")))
+            raise RPCError("batch", body.get("error", {}))
+
+        by_id = {item.get("id"): item for item in body}
+        results = []
+        for i, (method, _) in enumerate(calls):
+            item = by_id.get(i)
+            if item is None:
+                rpc_call_errors.inc(method, "missing")
+                results.append(RPCError(method, {"message": "missing from batch response"}))
+            elif "error" in item:
+                rpc_call_errors.inc(method, _error_class(item["error"]))
+                results.append(RPCError(method, item["error"]))
+            else:
+                results.append(item.get("result"))
+        return results
+
+    def pool_stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "requests": self.hits + self.misses,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+async def create_rpc_client() -> RPCClient:
+    client = RPCClient(
+        settings.BASE_RPC_URL,
+        pool_size=settings.RPC_POOL_SIZE,
+        timeout=settings.RPC_TIMEOUT
+    )
+    await client.connect()
+    return client
+
+
+def get_rpc(request: Request) -> RPCClient:
+    return request.app.state.rpc
@@ -1,12 +1,174 @@
-from eth_account import Account
+import asyncio
 import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from eth_account import Account
+from fastapi import Request
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .crypto import encrypt_private_key
+from .log import get_logger
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.wallet import PooledWallet
+
+log = get_logger(__name__)
+
 
 def create_wallet():
     # Generate a private key
     private_key = secrets.token_hex(32)
     account = Account.from_key(private_key)
-    
+
     return {
         'address': account.address,
         'private_key': private_key
     }
+
+
+def _generate(count: int) -> List[dict]:
+    rows = []
+    for _ in range(count):
+        wallet = create_wallet()
+        rows.append({
+            "address": wallet['address'],
+            "encrypted_private_key": encrypt_private_key(wallet['private_key'])
+        })
+    return rows
+
+
+class WalletPool:
+    """
+    Table of wallets generated and encrypted ahead of time, so registration
+    claims one with a single UPDATE ... RETURNING instead of deriving and
+    encrypting a key while the user waits.
+
+    A background task tops the pool up to target_size every refill_interval
+    seconds, or as soon as a claim leaves fewer than low_water on this
+    worker's count. Keys are generated on a dedicated thread in batches of
+    batch_size. Claimed rows, whose keys now live in wallets, are deleted by
+    the next refill. Workers refill independently, so the pool can briefly
+    overshoot its target.
+    """
+
+    def __init__(self, target_size: int, low_water: int, batch_size: int, refill_interval: float):
+        self.target_size = target_size
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.refill_interval = refill_interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wallets")
+        self.depth = 0
+        self._refill_now = asyncio.Event()
+        self._task = None
+        self.generated = 0
+        self.claimed = 0
+        self.empty = 0
+        self.refill_rate = 0.0
+        self.errors = 0
+
+    async def claim(self, db: AsyncSession) -> Optional[Tuple[str, str]]:
+        """
+        Take the oldest unclaimed wallet as part of db's transaction; returns
+        (address, encrypted_private_key), or None when the pool is empty. A
+        rollback puts the wallet back.
+        """
+        available = (
+            select(PooledWallet.id)
+            .where(PooledWallet.claimed_at.is_(None))
+            .order_by(PooledWallet.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        row = (await db.execute(
+            update(PooledWallet)
+            .where(PooledWallet.id == available)
+            .values(claimed_at=func.now())
+            .returning(PooledWallet.address, PooledWallet.encrypted_private_key)
+        )).first()
+
+        if row is None:
+            self.empty += 1
+            self._refill_now.set()
+            return None
+        self.claimed += 1
+        self.depth = max(0, self.depth - 1)
+        if self.depth < self.low_water:
+            self._refill_now.set()
+        return row.address, row.encrypted_private_key
+
+    async def refill(self) -> int:
+        """Delete claimed rows and generate wallets up to target_size; returns how many were added."""
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(PooledWallet).where(PooledWallet.claimed_at.is_not(None)))
+            await db.commit()
+            self.depth = await db.scalar(
+                select(func.count()).select_from(PooledWallet).where(PooledWallet.claimed_at.is_(None))
+            )
+
+        added = 0
+        start = time.perf_counter()
+        while self.depth < self.target_size:
+            count = min(self.batch_size, self.target_size - self.depth)
+            rows = await asyncio.get_running_loop().run_in_executor(self.executor, _generate, count)
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(PooledWallet), rows)
+                await db.commit()
+            self.depth += count
+            added += count
+        if added:
+            self.generated += added
+            self.refill_rate = added / (time.perf_counter() - start)
+        return added
+
+    async def run(self):
+        while True:
+            try:
+                await self.refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                log.exception("wallet_pool_refill_failed")
+            try:
+                await asyncio.wait_for(self._refill_now.wait(), self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refill_now.clear()
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "target_size": self.target_size,
+            "generated": self.generated,
+            "claimed": self.claimed,
+            "empty": self.empty,
+            "refill_per_second": round(self.refill_rate, 1),
+            "errors": self.errors
+        }
+
+
+def create_wallet_pool() -> WalletPool:
+    return WalletPool(
+        target_size=settings.WALLET_POOL_SIZE,
+        low_water=settings.WALLET_POOL_LOW_WATER,
+        batch_size=settings.WALLET_POOL_BATCH_SIZE,
+        refill_interval=settings.WALLET_POOL_REFILL_INTERVAL
+    )
+
+
+def get_wallet_pool(request: Request) -> WalletPool:
+    return request.app.state.wallet_pool
@@ -0,0 +1,348 @@
+"""
+End-to-end benchmark of the API: the full app from app/main.py behind real HTTP.
+
+Boots app.main:app on uvicorn (lifespan and all background services
+included) against a throwaway database, with BASE_RPC_URL pointing at a
+fault-injecting JSON-RPC proxy. The proxy delays every HTTP request by
+--latency (+ up to --jitter) ms, answers --error-rate of the calls with a
+JSON-RPC error and --http-error-rate of the requests with a 503, then
+forwards what's left to --upstream (a local anvil node, say) or, by
+default, to the in-process stub chain from benchmarks.outbox_flow that
+mines everything sent to it.
+
+Each concurrency level in --concurrency drives /auth/token, /auth/me,
+/game/status, /game/entry, /wallet/balance/{address} and /wallet/withdraw
+with --requests requests. Every /game/entry goes to a user who hasn't
+entered yet, and the other endpoints cycle through all seeded users.
+Reports throughput, p50/p95/p99 and status codes (or the client error
+for dropped connections) per endpoint and level,
+and writes the report to --output, by default
+benchmarks/results/<commit>.json, so runs on different commits can be
+compared. --compare adds the change against an earlier report.
+
+The wallet pool is disabled for the run so its key generation doesn't
+compete with the requests being measured, and so are the rate limits
+unless --rate-limits is given (benchmarks.rate_limits covers those). App
+logs go to --log-file.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine), or at a scratch Postgres
+database already migrated with `alembic upgrade head`:
+    BCRYPT_ROUNDS=4 DATABASE_URL=sqlite:////tmp/suite.db python -m benchmarks.app_suite --requests 200
+    BCRYPT_ROUNDS=4 DATABASE_URL=sqlite:////tmp/suite.db python -m benchmarks.app_suite \\
+        --latency 50 --error-rate 0.02 --compare benchmarks/results/<earlier commit>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from aiohttp import ClientError, ClientSession, web
+from sqlalchemy import insert, select
+
+from app.config import settings
+from app.database import SessionLocal, create_sqlite_schema
+from app.models import User, Wallet
+from app.utils.auth import create_access_token, get_password_hash, token_claims
+from app.utils.wallet import _generate
+from benchmarks.outbox_flow import RECIPIENT, StubChain
+
+PASSWORD = "correct horse"
+ENDPOINTS = ("token", "me", "status", "entry", "balance", "withdraw")
+
+
+class FaultProxy:
+    """JSON-RPC proxy adding latency and failures in front of a node or a stub result table."""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, http_error_rate: float,
+                 seed: int, upstream: str = None, results: dict = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.random = random.Random(seed)
+        self.upstream = upstream
+        self.results = results
+        self.session = None
+        self.requests = 0
+        self.calls = 0
+        self.injected_errors = 0
+        self.injected_http_errors = 0
+
+    def _answer(self, call: dict) -> dict:
+        value = self.results.get(call["method"], "0x0")
+        result = value(call.get("params", [])) if callable(value) else value
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    async def _forward(self, calls: list) -> list:
+        if self.upstream is None:
+            return [self._answer(call) for call in calls]
+        async with self.session.post(self.upstream, json=calls) as response:
+            body = await response.json(content_type=None)
+        return body if isinstance(body, list) else [body]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if self.random.random() < self.http_error_rate:
+            self.injected_http_errors += 1
+            return web.Response(status=503, text="injected fault")
+
+        payload = await request.json()
+        calls = payload if isinstance(payload, list) else [payload]
+        self.calls += len(calls)
+        failed = {}
+        for call in calls:
+            if self.random.random() < self.error_rate:
+                self.injected_errors += 1
+                failed[call["id"]] = {
+                    "jsonrpc": "2.0", "id": call["id"],
+                    "error": {"code": -32603, "message": "injected fault"}
+                }
+        forwarded = await self._forward([call for call in calls if call["id"] not in failed]) if len(failed) < len(calls) else []
+        by_id = {**{item.get("id"): item for item in forwarded}, **failed}
+        responses = [by_id.get(call["id"]) for call in calls]
+        return web.json_response(responses if isinstance(payload, list) else responses[0])
+
+    def start(self, port: int):
+        # Own loop and thread, like the stub servers, so the app can't stall it
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        async def serve():
+            if self.upstream is not None:
+                self.session = ClientSession()
+            app = web.Application()
+            app.router.add_post("/", self.handle)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            ready.set()
+
+        def run():
+            loop.run_until_complete(serve())
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "calls": self.calls,
+            "injected_errors": self.injected_errors,
+            "injected_http_errors": self.injected_http_errors
+        }
+
+
+def git_revision() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def seed_users(count: int) -> list:
+    """Users with a wallet each, all sharing one password; returns (id, email, address, token) tuples."""
+    if settings.DATABASE_URL.startswith("sqlite"):
+        create_sqlite_schema()
+
+    hashed_password = get_password_hash(PASSWORD)
+    run = int(time.time())
+    wallets = _generate(count)
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {
+                "email": f"suite{run}-{i}@example.com",
+                "username": f"suite{run}-{i}",
+                "hashed_password": hashed_password,
+                "wallet_address": wallet["address"]
+            }
+            for i, wallet in enumerate(wallets)
+        ])
+        users = db.scalars(select(User).where(User.username.like(f"suite{run}-%")).order_by(User.id)).all()
+        db.execute(insert(Wallet), [
+            {"user_id": user.id, "encrypted_private_key": wallet["encrypted_private_key"]}
+            for user, wallet in zip(users, wallets)
+        ])
+        db.commit()
+        return [(user.id, user.email, user.wallet_address, create_access_token(token_claims(user))) for user in users]
+
+
+def start_app(port: int) -> uvicorn.Server:
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def request_for(endpoint: str, base: str, user: tuple):
+    """(method, url, keyword arguments) for one request to endpoint as user."""
+    _, email, address, token = user
+    auth = {"headers": {"Authorization": f"Bearer {token}"}}
+    return {
+        "token": ("POST", f"{base}/auth/token", {"data": {"username": email, "password": PASSWORD}}),
+        "me": ("GET", f"{base}/auth/me", auth),
+        "status": ("GET", f"{base}/game/status", auth),
+        "entry": ("POST", f"{base}/game/entry", auth),
+        "balance": ("GET", f"{base}/wallet/balance/{address}", auth),
+        "withdraw": ("POST", f"{base}/wallet/withdraw", {**auth, "json": {"recipient_address": RECIPIENT, "amount": 0.0001}}),
+    }[endpoint]
+
+
+async def drive(session: ClientSession, endpoint: str, base: str, users: list, concurrency: int) -> dict:
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(user):
+        method, url, kwargs = request_for(endpoint, base, user)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    await response.read()
+                outcome = str(response.status)
+            except ClientError as e:
+                # The server dropped the connection, e.g. after an unhandled exception
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[outcome] = statuses.get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(user) for user in users))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(users),
+        "requests_per_second": round(len(users) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "statuses": statuses
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change per endpoint and level; positive means more throughput or more latency."""
+    changes = {}
+    for level, endpoints in report["results"].items():
+        for endpoint, now in endpoints.items():
+            before = baseline.get("results", {}).get(level, {}).get(endpoint)
+            if not before:
+                continue
+            changes.setdefault(level, {})[endpoint] = {
+                key: f"{(now[key] - before[key]) / before[key] * 100:+.1f}%"
+                for key in ("requests_per_second", "p50_ms", "p95_ms", "p99_ms") if before[key]
+            }
+    return {"commit": baseline.get("commit"), "changes": changes}
+
+
+async def main(args, users: list, proxy: FaultProxy):
+    base = f"http://127.0.0.1:{args.port}"
+    levels = [int(level) for level in args.concurrency.split(",")]
+    report = {
+        "commit": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": settings.DATABASE_URL.split(":", 1)[0],
+        "chain": args.upstream or "stub",
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "rate_limits": args.rate_limits,
+        "rpc": {
+            "latency_ms": args.latency,
+            "jitter_ms": args.jitter,
+            "error_rate": args.error_rate,
+            "http_error_rate": args.http_error_rate,
+            "seed": args.seed
+        },
+        "requests": args.requests,
+        "results": {}
+    }
+
+    fresh = iter(users)
+    async with ClientSession() as session:
+        for level in levels:
+            results = report["results"][str(level)] = {}
+            for endpoint in ENDPOINTS:
+                if endpoint == "entry":
+                    targets = [next(fresh) for _ in range(args.requests)]
+                else:
+                    targets = [users[i % len(users)] for i in range(args.requests)]
+                results[endpoint] = await drive(session, endpoint, base, targets, level)
+
+        async with session.get(f"{base}/stats") as response:
+            app_stats = await response.json()
+    report["proxy"] = proxy.stats()
+    report["app"] = {name: app_stats.get(name) for name in ("rpc_pool", "db_pool", "outbox", "confirmer", "log")}
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["compared_to"] = compare(report, json.load(f))
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    report["output"] = output
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint and concurrency level")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated levels")
+    parser.add_argument("--latency", type=float, default=20.0, help="ms added to every RPC request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many ms more, uniformly")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of RPC calls answered with an error")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="fraction of RPC requests answered with a 503")
+    parser.add_argument("--block-time", type=float, default=1.0, help="stub chain only")
+    parser.add_argument("--upstream", help="JSON-RPC node to forward to instead of the stub chain")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--rpc-port", type=int, default=8771)
+    parser.add_argument("--output", help="report path; default benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the configured rate limits")
+    parser.add_argument("--log-file", default=os.path.join(tempfile.gettempdir(), "app_suite.log"))
+    args = parser.parse_args()
+
+    chain = StubChain(args.block_time)
+    proxy = FaultProxy(
+        args.latency / 1000, args.jitter / 1000, args.error_rate, args.http_error_rate, args.seed,
+        upstream=args.upstream, results=None if args.upstream else chain.results()
+    )
+    proxy.start(args.rpc_port)
+
+    # Settings are read when the lifespan builds each service
+    settings.BASE_RPC_URL = f"http://127.0.0.1:{args.rpc_port}/"
+    settings.WALLET_POOL_SIZE = 0
+    if not args.rate_limits:
+        settings.RPC_MAX_IN_FLIGHT = 10**6
+        for route_class in ("WITHDRAW", "ESTIMATE", "ENTRY"):
+            setattr(settings, f"RATE_LIMIT_{route_class}_BURST", 10**6)
+
+    from app.utils import log as log_module
+    log_file = open(args.log_file, "w")
+    for handler in log_module._listener.handlers:
+        handler.setStream(log_file)
+
+    levels = args.concurrency.split(",")
+    users = seed_users(args.requests * len(levels))
+    start_app(args.port)
+    asyncio.run(main(args, users, proxy))
@@ -0,0 +1,109 @@
+"""
+Latency of /auth/me and /game/status served from token claims versus a user lookup.
+
+Boots the auth and game routers on uvicorn against a throwaway SQLite database
+(the "wonder-realm" schema is an attached database file) and drives both
+endpoints with a fixed number of concurrent clients, once with a current
+token and once with an older token that only carries sub and uid, which makes
+every request load the user from the database.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.auth_claims --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+import uvicorn
+from aiohttp import ClientSession
+from fastapi import FastAPI
+from app.config import settings
+from app.database import SessionLocal, create_sqlite_schema
+from app.models import User
+from app.routes import auth, game
+from app.utils.auth import create_access_token, token_claims
+
+
+def seed_user() -> dict:
+    with SessionLocal() as db:
+        user = User(
+            email="bench@example.com",
+            username="bench",
+            hashed_password="x",
+            wallet_address="0x0000000000000000000000000000000000000001"
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        claims = token_claims(user)
+        return {
+            "claims": create_access_token(claims),
+            "lookup": create_access_token({"sub": claims["sub"], "uid": claims["uid"]})
+        }
+
+
+def start_server(port: int) -> uvicorn.Server:
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.include_router(game.router, prefix="/game")
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def drive(url: str, token: str, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with ClientSession(headers=headers) as session:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.get(url) as response:
+                    await response.read()
+                    assert response.status == 200, response.status
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main(args, tokens: dict):
+    results = {}
+    for label, token in tokens.items():
+        for path in ("/auth/me", "/game/status"):
+            url = f"http://127.0.0.1:{args.port}{path}"
+            results[f"{path} {label}"] = await drive(url, token, args.requests, args.concurrency)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    create_sqlite_schema()
+    tokens = seed_user()
+    start_server(args.port)
+    asyncio.run(main(args, tokens))
@@ -0,0 +1,68 @@
+"""
+Benchmark for bulk balance lookups against a stub JSON-RPC server.
+
+Compares the per-address loop (one eth_getBalance round-trip each) with
+fetch_balances, which sends chunked JSON-RPC batches.
+
+Run from backend/:
+    python -m benchmarks.bulk_balances --addresses 2000 --latency 30
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from web3 import Web3
+
+from app.utils.balances import fetch_balances
+from app.utils.rpc import RPCClient
+from benchmarks.rpc_load import start_stub
+
+
+async def per_address(rpc: RPCClient, addresses):
+    return [await rpc.w3.eth.get_balance(address) for address in addresses]
+
+
+async def batched(rpc: RPCClient, addresses, chunk_size, concurrency):
+    return [
+        balance async for _, balance in fetch_balances(rpc, addresses, chunk_size, concurrency)
+    ]
+
+
+async def main(args):
+    start_stub(args.latency / 1000, args.port)
+    addresses = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, args.addresses + 1)]
+
+    rpc = RPCClient(f"http://127.0.0.1:{args.port}/", pool_size=args.concurrency, timeout=30)
+    await rpc.connect()
+    try:
+        start = time.perf_counter()
+        await per_address(rpc, addresses)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        resolved = await batched(rpc, addresses, args.chunk_size, args.concurrency)
+        batch_seconds = time.perf_counter() - start
+    finally:
+        await rpc.close()
+
+    assert len(resolved) == len(addresses)
+    print(json.dumps({
+        "addresses": args.addresses,
+        "latency_ms": args.latency,
+        "chunk_size": args.chunk_size,
+        "concurrency": args.concurrency,
+        "per_address_seconds": round(loop_seconds, 3),
+        "batched_seconds": round(batch_seconds, 3),
+        "speedup": round(loop_seconds / batch_seconds, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--addresses", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=30, help="stub RPC latency in ms")
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8546)
+    asyncio.run(main(parser.parse_args()))
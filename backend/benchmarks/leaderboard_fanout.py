@@ -0,0 +1,190 @@
+"""
+Leaderboard update cost and WebSocket fan-out.
+
+First times score updates against a board of --players entries: the ranked
+SortedList the leaderboard uses versus re-sorting a list on every update,
+which is what the old Node server did.
+
+Then boots the leaderboard router on uvicorn against a throwaway SQLite
+database, connects --clients authenticated WebSocket clients that each send
+--updates score updates as fast as they can, and reports how many updates
+were accepted, how many frames each client received (coalesced to at most
+one diff per broadcast interval) and whether every client's view of the top
+players matches the server's. Scores are saved to the database on shutdown
+and read back to check they survive a restart.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    DATABASE_URL=sqlite:////tmp/leaderboard.db python -m benchmarks.leaderboard_fanout --clients 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import uvicorn
+from aiohttp import ClientSession, TCPConnector
+from fastapi import FastAPI
+
+from app.config import settings
+from app.database import SessionLocal, create_sqlite_schema
+from app.models import User
+from app.routes import leaderboard as leaderboard_routes
+from app.utils.auth import create_access_token, token_claims
+from app.utils.leaderboard import Leaderboard
+
+
+def time_updates(players: int, updates: int) -> dict:
+    rng = random.Random(1)
+    board = Leaderboard(10, 1, 1, 1)
+    for user_id in range(players):
+        board.submit(user_id, f"p{user_id}", rng.random() * 100)
+    start = time.perf_counter()
+    for _ in range(updates):
+        user_id = rng.randrange(players)
+        board.submit(user_id, "p", board.scores[user_id] + 1)
+        board.rank(user_id)
+        board.top(10)
+    ranked = time.perf_counter() - start
+
+    scores = [[user_id, rng.random() * 100] for user_id in range(players)]
+    by_id = {row[0]: row for row in scores}
+    start = time.perf_counter()
+    for _ in range(updates):
+        user_id = rng.randrange(players)
+        by_id[user_id][1] += 1
+        scores.sort(key=lambda row: -row[1])
+        scores[:10]
+    resorted = time.perf_counter() - start
+
+    return {
+        "players": players,
+        "sorted_list_us_per_update": round(ranked / updates * 1e6, 2),
+        "full_sort_us_per_update": round(resorted / updates * 1e6, 2),
+    }
+
+
+def seed_users(count: int):
+    with SessionLocal() as db:
+        users = [
+            User(email=f"lb{i}@example.com", username=f"lb{i}", hashed_password="x", wallet_address=f"0x{i:040x}")
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [create_access_token(token_claims(user)) for user in users]
+
+
+def start_server(port: int, broadcast_interval: float) -> uvicorn.Server:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.leaderboard = Leaderboard(10, broadcast_interval, 3600, 1.0)
+        await app.state.leaderboard.load()
+        app.state.leaderboard.start()
+        yield
+        await app.state.leaderboard.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(leaderboard_routes.router, prefix="/api")
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", ws="websockets"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    server.thread = thread
+    return server
+
+
+async def client(session: ClientSession, url: str, token: str, updates: int, sent: asyncio.Barrier, settle: float):
+    rows = {}
+    frames = 0
+    rng = random.Random(token)
+    async with session.ws_connect(f"{url}?token={token}") as ws:
+        async def receive():
+            nonlocal frames
+            async for message in ws:
+                frame = json.loads(message.data)
+                frames += 1
+                if frame["type"] == "snapshot":
+                    rows.clear()
+                    rows.update({row["id"]: row for row in frame["top"]})
+                elif frame["type"] == "diff":
+                    for user_id in frame["removed"]:
+                        rows.pop(user_id, None)
+                    rows.update({row["id"]: row for row in frame["updated"]})
+
+        receiver = asyncio.create_task(receive())
+        score = 0.0
+        for _ in range(updates):
+            score += rng.random()
+            await ws.send_str(json.dumps({"type": "scoreUpdate", "score": round(score, 6)}))
+        # Stay connected until everyone has sent, then give the last diff time to arrive
+        await sent.wait()
+        await asyncio.sleep(settle)
+        receiver.cancel()
+    return frames, sorted(rows.values(), key=lambda row: row["rank"])
+
+
+async def drive(args, tokens):
+    url = f"ws://127.0.0.1:{args.port}/api/leaderboard/ws"
+    sent = asyncio.Barrier(len(tokens))
+    # Every client holds its connection until all have sent, so no connection limit
+    async with ClientSession(connector=TCPConnector(limit=0)) as session:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            client(session, url, token, args.updates, sent, args.broadcast_interval * 4) for token in tokens
+        ))
+        elapsed = time.perf_counter() - start
+        async with session.get(f"http://127.0.0.1:{args.port}/api/leaderboard") as response:
+            server_top = await response.json()
+    return results, server_top, elapsed
+
+
+def main(args):
+    report = {"update_cost": time_updates(args.players, 2000)}
+
+    create_sqlite_schema()
+    tokens = seed_users(args.clients)
+    server = start_server(args.port, args.broadcast_interval)
+    results, server_top, elapsed = asyncio.run(drive(args, tokens))
+    board = server.config.app.state.leaderboard
+    stats = board.stats()
+    server.should_exit = True
+    server.thread.join()
+
+    # A fresh board sees what the first one saved on shutdown
+    restarted = Leaderboard(10, 1, 1, 1)
+    asyncio.run(restarted.load())
+
+    frames = sorted(count for count, _ in results)
+    report["fanout"] = {
+        "clients": args.clients,
+        "updates_sent": args.clients * args.updates,
+        "updates_accepted": stats["updates"],
+        "seconds": round(elapsed, 3),
+        "diff_frames_broadcast": stats["seq"],
+        "frames_per_client_p50": frames[len(frames) // 2],
+        "frames_per_client_max": frames[-1],
+        "clients_in_sync": sum(1 for _, rows in results if rows == server_top),
+        "dropped_clients": stats["dropped"],
+        "restored_top_matches": restarted.top(10) == server_top,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=100000, help="board size for the update cost comparison")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=50, help="score updates per client")
+    parser.add_argument("--broadcast-interval", type=float, default=settings.LEADERBOARD_BROADCAST_INTERVAL)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    main(args)
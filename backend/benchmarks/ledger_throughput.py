@@ -0,0 +1,131 @@
+"""
+Game balance updates per second through the ledger, spread over workers.
+
+Seeds a number of active game entries, then applies a stream of credits and
+debits from concurrent callers, each event going to one of several
+GameLedger instances as requests would land on different workers. Checks
+that every game's balance is its seeded balance plus all of its events,
+then cashes every game out and checks the payouts match those balances.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    DATABASE_URL=sqlite:////tmp/ledger.db python -m benchmarks.ledger_throughput --events 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal, create_sqlite_schema
+from app.models import GameEntry, GameResult, LedgerEntry, User
+from app.utils.ledger import GameLedger
+
+SEED_BALANCE = 100
+
+
+def prepare_database(games: int):
+    create_sqlite_schema()
+    with SessionLocal() as db:
+        users = [User(email=f"bench{i}@example.com", username=f"bench{i}", hashed_password="x") for i in range(games)]
+        db.add_all(users)
+        db.flush()
+        db.add_all(
+            GameEntry(user_id=user.id, entry_fee_amount=1, transaction_hash="0x", status='active', balance=SEED_BALANCE)
+            for user in users
+        )
+        db.commit()
+
+
+def event_stream(game_ids, events: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(events):
+        amount = Decimal(rng.randint(1, 100)) / 1000
+        yield rng.choice(game_ids), amount if rng.random() < 0.6 else -amount
+
+
+async def game_ids(status: str):
+    async with AsyncSessionLocal() as db:
+        return list(await db.scalars(select(GameEntry.id).where(GameEntry.status == status).order_by(GameEntry.id)))
+
+
+def rounded(amount) -> Decimal:
+    # SQLite keeps DECIMAL columns as floats
+    return round(Decimal(amount), 9)
+
+
+async def balances():
+    async with AsyncSessionLocal() as db:
+        return {i: rounded(b) for i, b in (await db.execute(select(GameEntry.id, GameEntry.balance))).all()}
+
+
+async def apply_events(workers, stream, concurrency: int) -> float:
+    queue = list(enumerate(stream))
+
+    async def caller(offset: int):
+        for n, (game_entry_id, amount) in queue[offset::concurrency]:
+            ledger = workers[n % len(workers)]
+            if amount > 0:
+                await ledger.credit(game_entry_id, amount, 'bench')
+            else:
+                await ledger.debit(game_entry_id, -amount, 'bench')
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(offset) for offset in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    prepare_database(args.games)
+    ids = await game_ids('active')
+
+    stream = list(event_stream(ids, args.events, args.seed))
+    expected = defaultdict(lambda: Decimal(SEED_BALANCE))
+    for game_entry_id, amount in stream:
+        expected[game_entry_id] += amount
+
+    # Settlement needs a chain; keep it from running here
+    workers = [GameLedger(None) for _ in range(args.workers)]
+    events_seconds = await apply_events(workers, stream, args.concurrency)
+    matches = all(balance == rounded(expected[i]) for i, balance in (await balances()).items())
+
+    start = time.perf_counter()
+    payouts = [await workers[i % len(workers)].cash_out(game_entry_id) for i, game_entry_id in enumerate(ids)]
+    cash_out_seconds = time.perf_counter() - start
+
+    async with AsyncSessionLocal() as db:
+        paid_out = -(await db.scalar(select(func.sum(LedgerEntry.amount)).where(LedgerEntry.kind == 'payout')))
+        results = await db.scalar(select(func.count()).select_from(GameResult))
+    print(json.dumps({
+        "games": args.games,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "events_per_second": round(args.events / events_seconds, 1),
+        "balances_match": matches,
+        "cash_out_ms": round(cash_out_seconds / len(ids) * 1000, 2),
+        "payouts_match": all(rounded(paid) == rounded(expected[i]) for i, paid in zip(ids, payouts)),
+        "payouts_recorded": rounded(paid_out) == rounded(sum(payouts)),
+        "completed_games": len(await game_ids('completed')),
+        "results_recorded": results,
+        "ledger": [ledger.stats() for ledger in workers],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="GameLedger instances standing in for workers")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    asyncio.run(main(args))
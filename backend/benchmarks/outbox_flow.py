@@ -0,0 +1,241 @@
+"""
+End-to-end run of the transaction outbox: queue, broadcast, confirm, activate.
+
+Queues one pending game entry per seeded user, each paid by a transaction
+signed with the same key, then waits for the outbox and block confirmer to
+move every entry to active. Reports the time each enqueue took (what the HTTP
+request now waits for) and the time until all entries were confirmed.
+
+By default the chain is a stub JSON-RPC server producing a block every
+--block-time seconds; --reorg-depth replaces that many blocks mid-run. Pass
+--rpc-url to run against a local anvil node instead (start it with
+--block-time so blocks keep coming); the default --private-key is anvil's
+first dev account.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    DATABASE_URL=sqlite:////tmp/outbox.db python -m benchmarks.outbox_flow --transactions 200
+    DATABASE_URL=sqlite:////tmp/outbox.db python -m benchmarks.outbox_flow --rpc-url http://127.0.0.1:8545
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from eth_account import Account
+from sqlalchemy import func, select
+from web3 import Web3
+
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal, create_sqlite_schema
+from app.models import GameEntry, User
+from app.utils.confirmer import BlockConfirmer
+from app.utils.outbox import TransactionOutbox, queue_transaction
+from app.utils.rpc import RPCClient
+from benchmarks.rpc_load import STUB_RESULTS, start_stub
+
+ANVIL_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+RECIPIENT = "0x000000000000000000000000000000000000dEaD"
+
+
+class StubChain:
+    """
+    Stub results for a chain that mines every accepted transaction into the
+    next block. reorg() replaces the newest blocks with a fork that carries
+    their transactions one block later.
+    """
+
+    def __init__(self, block_time: float):
+        self.block_time = block_time
+        self.started = time.monotonic()
+        self.fork_from = None
+        self.mined_in = {}
+        self.blocks = {}
+
+    def head(self) -> int:
+        return 1_000 + int((time.monotonic() - self.started) / self.block_time)
+
+    def block_hash(self, number: int) -> str:
+        fork = 1 if self.fork_from is not None and number >= self.fork_from else 0
+        return Web3.keccak(text=f"block {number} fork {fork}").to_0x_hex()
+
+    def reorg(self, depth: int):
+        self.fork_from = self.head() - depth + 1
+        moved = [h for n in range(self.fork_from, self.head() + 1) for h in self.blocks.pop(n, [])]
+        for tx_hash in moved:
+            self.mined_in[tx_hash] = self.head() + 1
+        self.blocks.setdefault(self.head() + 1, []).extend(moved)
+
+    def send_raw_transaction(self, params):
+        tx_hash = Web3.keccak(hexstr=params[0]).to_0x_hex()
+        if tx_hash not in self.mined_in:
+            self.mined_in[tx_hash] = self.head() + 1
+            self.blocks.setdefault(self.head() + 1, []).append(tx_hash)
+        return tx_hash
+
+    def get_block(self, params):
+        number = int(params[0], 16)
+        if number > self.head():
+            return None
+        return {
+            "number": params[0],
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1),
+            "transactions": list(self.blocks.get(number, [])),
+        }
+
+    def get_receipt(self, params):
+        number = self.mined_in.get(params[0])
+        if number is None or number > self.head():
+            return None
+        return {
+            "transactionHash": params[0],
+            "status": "0x1",
+            "blockNumber": hex(number),
+            "blockHash": self.block_hash(number),
+        }
+
+    def results(self) -> dict:
+        return {
+            **STUB_RESULTS,
+            "eth_getTransactionCount": "0x0",
+            "eth_blockNumber": lambda params: hex(self.head()),
+            "eth_sendRawTransaction": self.send_raw_transaction,
+            "eth_getBlockByNumber": self.get_block,
+            "eth_getTransactionReceipt": self.get_receipt,
+        }
+
+
+def prepare_database(users: int):
+    create_sqlite_schema()
+    with SessionLocal() as db:
+        db.add_all(
+            User(email=f"bench{i}@example.com", username=f"bench{i}", hashed_password="x")
+            for i in range(users)
+        )
+        db.commit()
+        return [user_id for (user_id,) in db.execute(select(User.id)).all()]
+
+
+async def enqueue(account, user_id: int, chain_id: int, gas_price: int, chain_nonce: int) -> float:
+    start = time.perf_counter()
+    transaction = {
+        'from': account.address,
+        'to': RECIPIENT,
+        'value': 1,
+        'chainId': chain_id,
+        'gasPrice': gas_price,
+        'gas': 21000
+    }
+    async with AsyncSessionLocal() as db:
+        outbound = await queue_transaction(db, account, transaction, chain_nonce)
+        entry = GameEntry(
+            user_id=user_id,
+            entry_fee_amount=0,
+            transaction_hash=outbound.tx_hash,
+            status='pending'
+        )
+        db.add(entry)
+        await db.flush()
+        outbound.game_entry_id = entry.id
+        await db.commit()
+    return time.perf_counter() - start
+
+
+async def count_active() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(GameEntry).where(GameEntry.status == 'active'))
+
+
+async def main(args):
+    rpc_url = args.rpc_url
+    chain = None
+    if rpc_url is None:
+        chain = StubChain(args.block_time)
+        start_stub(args.latency / 1000, args.port, chain.results())
+        rpc_url = f"http://127.0.0.1:{args.port}/"
+
+    user_ids = prepare_database(args.transactions)
+    account = Account.from_key(args.private_key)
+
+    rpc = RPCClient(rpc_url, pool_size=args.workers + 2, timeout=30)
+    await rpc.connect()
+    confirmer = BlockConfirmer(
+        rpc,
+        None,
+        depth=args.depth,
+        poll_interval=min(args.block_time / 4, 1.0),
+        max_blocks=50,
+        reorg_window=128,
+        reload_interval=30
+    )
+    outbox = TransactionOutbox(
+        rpc,
+        confirmer,
+        None,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        poll_interval=0.5,
+        sweep_interval=5,
+        rebroadcast_after=30,
+        max_attempts=3
+    )
+    try:
+        chain_id = await rpc.w3.eth.chain_id
+        gas_price = await rpc.w3.eth.gas_price
+        chain_nonce = await rpc.w3.eth.get_transaction_count(account.address, 'pending')
+
+        confirmer.start()
+        outbox.start()
+        start = time.perf_counter()
+        enqueue_times = []
+        for user_id in user_ids:
+            enqueue_times.append(await enqueue(account, user_id, chain_id, gas_price, chain_nonce))
+            outbox.notify()
+
+        if chain is not None and args.reorg_depth:
+            # Let some transactions get included, then replace the newest blocks
+            await asyncio.sleep(args.block_time * 1.5)
+            chain.reorg(args.reorg_depth)
+
+        while await count_active() < len(user_ids):
+            if time.perf_counter() - start > args.timeout:
+                raise SystemExit(f"only {await count_active()} of {len(user_ids)} entries confirmed")
+            await asyncio.sleep(0.05)
+        total = time.perf_counter() - start
+    finally:
+        await outbox.stop()
+        await confirmer.stop()
+        await rpc.close()
+
+    enqueue_times.sort()
+    print(json.dumps({
+        "transactions": len(user_ids),
+        "enqueue_p50_ms": round(statistics.median(enqueue_times) * 1000, 2),
+        "enqueue_p99_ms": round(enqueue_times[int(len(enqueue_times) * 0.99) - 1] * 1000, 2),
+        "all_confirmed_seconds": round(total, 3),
+        "outbox": outbox.stats(),
+        "confirmer": confirmer.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transactions", type=int, default=200)
+    parser.add_argument("--rpc-url", default=None, help="e.g. a local anvil node; a stub chain is used if omitted")
+    parser.add_argument("--private-key", default=ANVIL_KEY)
+    parser.add_argument("--workers", type=int, default=1, help="SQLite has no SKIP LOCKED, so extra workers re-send rows")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=20, help="stub RPC latency in ms")
+    parser.add_argument("--block-time", type=float, default=1.0, help="stub seconds until a transaction is mined")
+    parser.add_argument("--depth", type=int, default=3, help="confirmations before an entry turns active")
+    parser.add_argument("--reorg-depth", type=int, default=0, help="stub only: replace this many blocks mid-run")
+    parser.add_argument("--port", type=int, default=8547)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    asyncio.run(main(args))
@@ -0,0 +1,42 @@
+"""
+Throughput of the bcrypt worker pool at different pool sizes.
+
+Run from backend/:
+    python -m benchmarks.password_hashing --sizes 1 2 4 8 --hashes 64 --rounds 12
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from passlib.context import CryptContext
+
+from app.utils.auth import PasswordHasherPool
+
+
+async def measure(pool: PasswordHasherPool, context: CryptContext, hashes: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.run(context.hash, f"password-{i}") for i in range(hashes)))
+    return hashes / (time.perf_counter() - start)
+
+
+async def main(args):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds)
+    results = []
+    for size in args.sizes:
+        pool = PasswordHasherPool(workers=size, queue_size=args.hashes)
+        try:
+            rate = await measure(pool, context, args.hashes)
+        finally:
+            pool.executor.shutdown()
+        results.append({"workers": size, "hashes_per_second": round(rate, 1)})
+
+    print(json.dumps({"rounds": args.rounds, "hashes": args.hashes, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--hashes", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=12)
+    asyncio.run(main(parser.parse_args()))
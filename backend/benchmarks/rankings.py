@@ -0,0 +1,215 @@
+"""
+Leaderboard pages from the incremental aggregates versus GROUP BY per request.
+
+Seeds --results finished games for --players players over the last two
+weeks, folds them into leaderboard_aggregates with the ranking aggregator,
+and checks every window matches a GROUP BY over game_results. Then times
+the first page of each window both ways, times an incremental refresh of
+--new-results more games, walks /api/leaderboard page by page over HTTP
+to check keyset pagination returns every player once and in order, and
+checks a repeated request with If-None-Match gets a 304.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    DATABASE_URL=sqlite:////tmp/rankings.db python -m benchmarks.rankings --results 200000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from aiohttp import ClientSession
+from sqlalchemy import func, insert, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal, create_sqlite_schema
+from app.models import GameEntry, GameResult, LeaderboardAggregate, User
+from app.utils.auth import create_access_token, token_claims
+from app.utils.rankings import RankingAggregator, current_windows
+from benchmarks.leaderboard_fanout import start_server
+
+
+def seed(players: int, results: int, seed: int, first_id: int = 1) -> str:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc) - timedelta(minutes=1)
+    with SessionLocal() as db:
+        if first_id == 1:
+            db.execute(insert(User), [
+                {"email": f"rank{i}@example.com", "username": f"rank{i}", "hashed_password": "x"}
+                for i in range(1, players + 1)
+            ])
+        db.execute(insert(GameEntry), [
+            {"id": i, "user_id": rng.randint(1, players), "entry_fee_amount": 1, "transaction_hash": "0x", "status": 'completed'}
+            for i in range(first_id, first_id + results)
+        ])
+        db.execute(insert(GameResult), [
+            {
+                "game_entry_id": i,
+                "user_id": entry_user,
+                "score": Decimal(rng.randint(0, 10**6)) / 1000,
+                "reward": Decimal(rng.randint(0, 10**4)) / 1000,
+                "finished_at": now - timedelta(seconds=rng.randint(0, 14 * 86400))
+            }
+            for i, entry_user in db.execute(
+                select(GameEntry.id, GameEntry.user_id).where(GameEntry.id >= first_id)
+            ).all()
+        ])
+        db.commit()
+        user = db.get(User, 1)
+        return create_access_token(token_claims(user))
+
+
+def grouped(start, limit=None):
+    """What the endpoint would do without aggregates."""
+    since = datetime.combine(start, datetime.min.time())
+    total = func.sum(GameResult.score)
+    query = (
+        select(GameResult.user_id, total, func.max(GameResult.score), func.count(), func.sum(GameResult.reward))
+        .where(GameResult.finished_at >= since)
+        .group_by(GameResult.user_id)
+        .order_by(total.desc(), GameResult.user_id.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+async def timed(query, repeat: int) -> float:
+    times = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            (await db.execute(query)).all()
+            times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1000, 2)
+
+
+def close(a, b) -> bool:
+    # SQLite keeps DECIMAL columns as floats
+    return abs(Decimal(a) - Decimal(b)) < Decimal("0.000001")
+
+
+async def verify(windows) -> bool:
+    async with AsyncSessionLocal() as db:
+        for period, start in windows.items():
+            expected = {row[0]: row[1:] for row in (await db.execute(grouped(start))).all()}
+            actual = {
+                row.user_id: (row.total_score, row.best_score, row.games, row.rewards)
+                for row in (await db.scalars(
+                    select(LeaderboardAggregate).where(
+                        LeaderboardAggregate.period == period,
+                        LeaderboardAggregate.period_start == start
+                    )
+                )).all()
+            }
+            if expected.keys() != actual.keys():
+                return False
+            for user_id, (total, best, games, rewards) in expected.items():
+                got = actual[user_id]
+                if not (close(total, got[0]) and close(best, got[1]) and games == got[2] and close(rewards, got[3])):
+                    return False
+    return True
+
+
+async def walk_pages(port: int, token: str, page_size: int):
+    base = f"http://127.0.0.1:{port}/api"
+    seen = []
+    pages = 0
+    async with ClientSession() as session:
+        cursor = None
+        while True:
+            params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+            async with session.get(f"{base}/leaderboard", params=params) as response:
+                page = await response.json()
+                etag = response.headers["ETag"]
+            pages += 1
+            seen += page["entries"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        async with session.get(f"{base}/leaderboard", headers={"If-None-Match": etag}, params=params) as response:
+            revalidated = response.status
+        async with session.get(f"{base}/player/stats", headers={"Authorization": f"Bearer {token}"}) as response:
+            stats = await response.json()
+    return seen, pages, revalidated, stats
+
+
+async def main(args):
+    aggregator = RankingAggregator(refresh_interval=1, batch_size=args.batch_size, lag=0)
+    start = time.perf_counter()
+    folded = await aggregator.refresh()
+    full_refresh = time.perf_counter() - start
+
+    windows = current_windows()
+    report = {
+        "results": args.results,
+        "players": args.players,
+        "initial_refresh_seconds": round(full_refresh, 3),
+        "folded": folded,
+        "aggregates_match_group_by": await verify(windows),
+    }
+
+    for period, window_start in windows.items():
+        page = (
+            select(LeaderboardAggregate)
+            .where(LeaderboardAggregate.period == period, LeaderboardAggregate.period_start == window_start)
+            .order_by(LeaderboardAggregate.total_score.desc(), LeaderboardAggregate.user_id.desc())
+            .limit(25)
+        )
+        report[f"{period}_page_ms"] = {
+            "group_by": await timed(grouped(window_start, 25), args.repeat),
+            "aggregate": await timed(page, args.repeat),
+        }
+
+    return aggregator, report
+
+
+def incremental(args, aggregator) -> dict:
+    seed(args.players, args.new_results, args.seed + 1, first_id=args.results + 1)
+    start = time.perf_counter()
+    folded = asyncio.run(aggregator.refresh())
+    return {
+        "new_results": folded,
+        "incremental_refresh_ms": round((time.perf_counter() - start) * 1000, 2),
+        "match_after_increment": asyncio.run(verify(current_windows())),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=5000)
+    parser.add_argument("--results", type=int, default=100000)
+    parser.add_argument("--new-results", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=settings.RANKINGS_BATCH_SIZE)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    create_sqlite_schema()
+    token = seed(args.players, args.results, args.seed)
+    aggregator, report = asyncio.run(main(args))
+    report.update(incremental(args, aggregator))
+
+    start_server(args.port, settings.LEADERBOARD_BROADCAST_INTERVAL)
+    seen, pages, revalidated, stats = asyncio.run(walk_pages(args.port, token, args.page_size))
+    ranked = [(Decimal(str(row["score"])), row["id"]) for row in seen]
+    report["pagination"] = {
+        "pages": pages,
+        "players_seen": len(seen),
+        "unique": len({row["id"] for row in seen}) == len(seen),
+        "ordered": ranked == sorted(ranked, reverse=True),
+        "ranks_contiguous": [row["rank"] for row in seen] == list(range(1, len(seen) + 1)),
+        "if_none_match_status": revalidated,
+    }
+    report["player_stats"] = stats
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,135 @@
+"""
+Admission control on the chain-touching endpoints: per-user buckets and the in-flight cap.
+
+Boots the full app the way benchmarks.app_suite does, behind the fault
+proxy with --latency ms per RPC request, then:
+
+- has one buggy client poll /wallet/estimate-gas as fast as it can for
+  --seconds, and reports how many polls were admitted, what Retry-After
+  said, and how many RPC requests reached the node;
+- meanwhile has --users other clients estimate once each, spread over
+  the same period, to show they are unaffected by the poller;
+- sends --users withdrawals at once with RPC_MAX_IN_FLIGHT set to
+  --max-in-flight, and reports how many were turned away with 503.
+
+--backend picks the bucket store: "memory" (per worker) or "database"
+(the rate_limit_buckets table, shared by workers).
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    BCRYPT_ROUNDS=4 DATABASE_URL=sqlite:////tmp/limits.db python -m benchmarks.rate_limits
+    BCRYPT_ROUNDS=4 DATABASE_URL=sqlite:////tmp/limits.db python -m benchmarks.rate_limits --backend database
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from aiohttp import ClientSession
+
+from app.config import settings
+from benchmarks.app_suite import FaultProxy, seed_users, start_app
+from benchmarks.outbox_flow import RECIPIENT, StubChain
+
+
+def auth(user: tuple) -> dict:
+    return {"Authorization": f"Bearer {user[3]}"}
+
+
+async def poll(session: ClientSession, base: str, user: tuple, seconds: float) -> dict:
+    statuses = {}
+    retry_after = set()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        async with session.get(
+            f"{base}/wallet/estimate-gas", params={"recipient_address": RECIPIENT, "amount": "0.001"}, headers=auth(user)
+        ) as response:
+            await response.read()
+            statuses[str(response.status)] = statuses.get(str(response.status), 0) + 1
+            if "Retry-After" in response.headers:
+                retry_after.add(int(response.headers["Retry-After"]))
+    return {"polls": sum(statuses.values()), "statuses": statuses, "retry_after_s": sorted(retry_after)}
+
+
+async def once(session: ClientSession, method: str, url: str, user: tuple, **kwargs) -> str:
+    async with session.request(method, url, headers=auth(user), **kwargs) as response:
+        await response.read()
+        return str(response.status)
+
+
+def counts(statuses) -> dict:
+    result = {}
+    for status in statuses:
+        result[status] = result.get(status, 0) + 1
+    return result
+
+
+async def main(args, users: list, proxy: FaultProxy):
+    base = f"http://127.0.0.1:{args.port}"
+    poller, others = users[0], users[1:]
+    async with ClientSession() as session:
+        before = proxy.stats()["requests"]
+        estimate = {"params": {"recipient_address": RECIPIENT, "amount": "0.001"}}
+        # Spread over the poll, and below the in-flight cap, so only the buckets are in play
+        semaphore = asyncio.Semaphore(max(1, args.max_in_flight // 2))
+
+        async def estimate_once(user):
+            async with semaphore:
+                await asyncio.sleep(args.seconds / 2 * others.index(user) / len(others))
+                return await once(session, "GET", f"{base}/wallet/estimate-gas", user, **estimate)
+
+        polled, *other_statuses = await asyncio.gather(
+            poll(session, base, poller, args.seconds),
+            *(estimate_once(user) for user in others)
+        )
+        polled["rpc_requests"] = proxy.stats()["requests"] - before
+
+        withdrawals = await asyncio.gather(*(
+            once(session, "POST", f"{base}/wallet/withdraw", user, json={"recipient_address": RECIPIENT, "amount": 0.0001})
+            for user in others
+        ))
+        async with session.get(f"{base}/stats") as response:
+            limiter = (await response.json())["rate_limiter"]
+
+    print(json.dumps({
+        "backend": args.backend,
+        "estimate_rule": f"{settings.RATE_LIMIT_ESTIMATE_BURST} burst, {settings.RATE_LIMIT_ESTIMATE_PER_MINUTE}/min",
+        "rpc_latency_ms": args.latency,
+        "buggy_poller": polled,
+        "other_users_estimates": counts(other_statuses),
+        "simultaneous_withdrawals": {"max_in_flight": args.max_in_flight, "statuses": counts(withdrawals)},
+        "limiter": limiter
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=("memory", "database"), default="memory")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=50.0, help="ms per RPC request")
+    parser.add_argument("--port", type=int, default=8772)
+    parser.add_argument("--rpc-port", type=int, default=8773)
+    parser.add_argument("--log-file", default=os.path.join(tempfile.gettempdir(), "rate_limits.log"))
+    args = parser.parse_args()
+
+    chain = StubChain(1.0)
+    proxy = FaultProxy(args.latency / 1000, 0, 0, 0, seed=1, results=chain.results())
+    proxy.start(args.rpc_port)
+
+    settings.BASE_RPC_URL = f"http://127.0.0.1:{args.rpc_port}/"
+    settings.WALLET_POOL_SIZE = 0
+    settings.RATE_LIMIT_BACKEND = args.backend
+    settings.RPC_MAX_IN_FLIGHT = args.max_in_flight
+
+    from app.utils import log as log_module
+    log_file = open(args.log_file, "w")
+    for handler in log_module._listener.handlers:
+        handler.setStream(log_file)
+
+    users = seed_users(args.users + 1)
+    start_app(args.port)
+    asyncio.run(main(args, users, proxy))
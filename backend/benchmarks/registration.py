@@ -0,0 +1,158 @@
+"""
+Registration latency and throughput: keys generated inline versus the wallet pool.
+
+Boots the auth router on uvicorn against a throwaway SQLite database next
+to a copy of the old /register handler (two existence queries, then key
+derivation and encryption inline), fills the wallet pool, and registers
+--users fresh accounts through each with --concurrency clients. Then
+checks duplicate emails and usernames are still rejected with 400 now
+that only the unique indexes catch them, and reports how fast the pool
+refills.
+
+bcrypt costs the same on both paths and dwarfs the rest at the default
+cost, so run with a low BCRYPT_ROUNDS to see the wallet work.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    BCRYPT_ROUNDS=4 DATABASE_URL=sqlite:////tmp/register.db python -m benchmarks.registration --users 500
+"""
+import argparse
+import asyncio
+import json
+import secrets
+import statistics
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import uvicorn
+from aiohttp import ClientSession
+from eth_account import Account
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import create_sqlite_schema, get_db
+from app.models import User as UserModel, Wallet
+from app.routes import auth
+from app.schemas.user import User, UserCreate
+from app.utils.auth import get_password_hash_async
+from app.utils.crypto import encrypt_private_key
+from app.utils.wallet import WalletPool
+
+legacy = APIRouter()
+
+
+@legacy.post("/register", response_model=User)
+async def legacy_register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    """The handler before the wallet pool, for comparison."""
+    if await db.scalar(select(UserModel).where(UserModel.email == user.email)):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if await db.scalar(select(UserModel).where(UserModel.username == user.username)):
+        raise HTTPException(status_code=400, detail="Username already taken")
+
+    private_key = secrets.token_hex(32)
+    account = Account.from_key(private_key)
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = UserModel(email=user.email, username=user.username, hashed_password=hashed_password, wallet_address=account.address)
+    db.add(db_user)
+    await db.flush()
+    db.add(Wallet(user_id=db_user.id, encrypted_private_key=encrypt_private_key(private_key)))
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+def start_server(port: int, pool: WalletPool) -> uvicorn.Server:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.wallet_pool = pool
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(auth.router, prefix="/auth")
+    app.include_router(legacy, prefix="/legacy")
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def register_all(url: str, prefix: str, users: int, concurrency: int) -> dict:
+    latencies = []
+    statuses = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with ClientSession() as session:
+        async def one(i: int):
+            body = {"email": f"{prefix}{i}@example.com", "username": f"{prefix}{i}", "password": "correct horse"}
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(url, json=body) as response:
+                    await response.read()
+                    statuses.append(response.status)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "registrations_per_second": round(users / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "succeeded": statuses.count(200),
+    }
+
+
+async def duplicates(url: str) -> dict:
+    async with ClientSession() as session:
+        checks = {
+            "duplicate_email": {"email": "pool0@example.com", "username": "someone-new", "password": "x"},
+            "duplicate_username": {"email": "someone-new@example.com", "username": "pool0", "password": "x"},
+        }
+        results = {}
+        for name, body in checks.items():
+            async with session.post(url, json=body) as response:
+                results[name] = [response.status, (await response.json())["detail"]]
+        return results
+
+
+async def main(args, pool: WalletPool):
+    base = f"http://127.0.0.1:{args.port}"
+    report = {"users": args.users, "concurrency": args.concurrency, "bcrypt_rounds": settings.BCRYPT_ROUNDS}
+    report["inline_keys"] = await register_all(f"{base}/legacy/register", "legacy", args.users, args.concurrency)
+    report["wallet_pool"] = await register_all(f"{base}/auth/register", "pool", args.users, args.concurrency)
+    report["rejections"] = await duplicates(f"{base}/auth/register")
+
+    start = time.perf_counter()
+    added = await pool.refill()
+    report["pool"] = {
+        **pool.stats(),
+        "refilled": added,
+        "refill_seconds": round(time.perf_counter() - start, 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=settings.WALLET_POOL_BATCH_SIZE)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    create_sqlite_schema()
+    # Enough wallets for every registration, and no refills while they run
+    pool = WalletPool(target_size=args.users, low_water=0, batch_size=args.batch_size, refill_interval=3600)
+    asyncio.run(pool.refill())
+    start_server(args.port, pool)
+    asyncio.run(main(args, pool))
@@ -0,0 +1,190 @@
+"""
+Replay verification throughput: NumPy-batched simulation versus one session at a time.
+
+Generates input logs from a bot that heads for the top of the field while
+checking each run of moves is safe, replays them with a plain per-session Python
+simulation of the same rules, and checks the batched simulator agrees on
+every score, tick count and collision. Then reports sessions per second
+for the batched simulator at several batch sizes, and for ReplayVerifier
+end to end with every session submitted concurrently, including claims
+that were tampered with and must be rejected.
+
+Needs no database:
+    python -m benchmarks.replay_verify --sessions 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from app.utils import replay
+from app.utils.replay import ReplayVerifier, decode_inputs, encode_inputs, simulate
+
+
+def _obstacle(seed, speeds, per_lane, span, margin, lane, k, tick):
+    phase = (seed * 7919 + (lane + 1) * 104729) % span
+    return (phase + k * (span // per_lane) + int(speeds[lane]) * tick) % span - margin
+
+
+def step(seed: int, x: int, y: int, mask: int, tick: int):
+    """One tick of the rules for one session: returns (x, y, event)."""
+    clamp = lambda v, low, high: max(low, min(high, v))
+    x += -replay.PLAYER_SPEED if mask & replay.LEFT else replay.PLAYER_SPEED if mask & replay.RIGHT else 0
+    y += -replay.PLAYER_SPEED if mask & replay.UP else replay.PLAYER_SPEED if mask & replay.DOWN else 0
+    x = clamp(x, replay.PLAYER_HALF, replay.WORLD_WIDTH - replay.PLAYER_HALF)
+    y = clamp(y, replay.PLAYER_HALF, replay.WORLD_HEIGHT - replay.PLAYER_HALF)
+
+    if replay.ROAD_TOP <= y < replay.ROAD_TOP + replay.LANE_HEIGHT * len(replay.CAR_SPEEDS):
+        lane = (y - replay.ROAD_TOP) // replay.LANE_HEIGHT
+        for k in range(replay.CARS_PER_LANE):
+            car = _obstacle(seed, replay.CAR_SPEEDS, replay.CARS_PER_LANE, replay.CAR_SPAN, 100, lane, k, tick + 1)
+            if abs(car - x) < replay.CAR_HALF + replay.PLAYER_HALF:
+                return x, y, "hit"
+
+    if replay.WATER_TOP <= y < replay.WATER_TOP + replay.LANE_HEIGHT * len(replay.LOG_SPEEDS):
+        lane = (y - replay.WATER_TOP) // replay.LANE_HEIGHT
+        riding = any(
+            abs(_obstacle(seed, replay.LOG_SPEEDS, replay.LOGS_PER_LANE, replay.LOG_SPAN, 2 * replay.LOG_HALF, lane, k, tick + 1) - x)
+            < replay.LOG_HALF
+            for k in range(replay.LOGS_PER_LANE)
+        )
+        if not riding:
+            return replay.START_X, replay.START_Y, "drown"
+        x = clamp(x + int(replay.LOG_SPEEDS[lane]), replay.PLAYER_HALF, replay.WORLD_WIDTH - replay.PLAYER_HALF)
+
+    if y < replay.FINISH_Y:
+        return replay.START_X, replay.START_Y, "cross"
+    return x, y, None
+
+
+def _survives(seed: int, x: int, y: int, plan, tick: int) -> bool:
+    for i, mask in enumerate(plan):
+        x, y, event = step(seed, x, y, mask, tick + i)
+        if event == "hit":
+            return False
+        if event in ("cross", "drown"):
+            return True
+    return True
+
+
+def bot_inputs(seed: int, rng: random.Random) -> list:
+    """
+    A player that checks no car hits it during a run of moves before starting
+    it (crossing the road takes twenty ticks), so most sessions last the
+    whole game. Falling in the water only sends it back to the start.
+    """
+    plans = [[replay.UP] * 40] + [[mask] * 12 for mask in (0, replay.LEFT, replay.RIGHT, replay.DOWN)]
+    masks = []
+    x, y = replay.START_X, replay.START_Y
+    length = rng.randint(replay.MAX_TICKS // 2, replay.MAX_TICKS)
+    for tick in range(length):
+        order = plans if rng.random() > 0.05 else rng.sample(plans, len(plans))
+        choice = next((plan[0] for plan in order if _survives(seed, x, y, plan, tick)), replay.DOWN)
+        masks.append(choice)
+        x, y, event = step(seed, x, y, choice, tick)
+        if event == "hit":
+            break
+    return masks
+
+
+def reference(seed: int, masks) -> tuple:
+    """The same rules, one session and one obstacle at a time."""
+    x, y = replay.START_X, replay.START_Y
+    reward, score = replay.FIRST_REWARD, 0
+    for tick, mask in enumerate(masks[:replay.MAX_TICKS]):
+        x, y, event = step(seed, x, y, mask, tick)
+        if event == "hit":
+            return score, tick + 1, True
+        if event == "cross":
+            score += reward
+            reward = min(reward * 2, replay.REWARD_CAP)
+    return score, min(len(masks), replay.MAX_TICKS), False
+
+
+def batch_arrays(seeds, logs):
+    decoded = [decode_inputs(log) for log in logs]
+    lengths = np.array([len(masks) for masks in decoded], dtype=np.int64)
+    inputs = np.zeros((len(decoded), int(lengths.max())), dtype=np.uint8)
+    for row, masks in enumerate(decoded):
+        inputs[row, :len(masks)] = masks
+    return np.array(seeds, dtype=np.int64), inputs, lengths
+
+
+async def verify_all(seeds, logs, claims, batch_size: int):
+    verifier = ReplayVerifier(batch_size=batch_size, max_wait=0.05, max_log_bytes=1 << 20)
+    verifier.start()
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            verifier.verify(seed, log, claim) for seed, log, claim in zip(seeds, logs, claims)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        await verifier.stop()
+    return results, elapsed, verifier.stats()
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    # The bot is slow, so a few distinct games are repeated to fill the batch
+    games = [(seed, bot_inputs(seed, rng)) for seed in range(1, args.unique + 1)]
+    seeds = [games[i % len(games)][0] for i in range(args.sessions)]
+    masks = [games[i % len(games)][1] for i in range(args.sessions)]
+    logs = [encode_inputs(m) for m in masks]
+
+    start = time.perf_counter()
+    expected = [reference(seed, m) for seed, m in zip(seeds[:args.reference], masks)]
+    reference_rate = len(expected) / (time.perf_counter() - start)
+
+    scores, ticks, hit = simulate(*batch_arrays(seeds[:args.reference], logs[:args.reference]))
+    agree = all(
+        (int(s), int(t), bool(h)) == e for s, t, h, e in zip(scores, ticks, hit, expected)
+    )
+
+    rates = {}
+    for size in args.batch_sizes:
+        arrays = batch_arrays(seeds[:size], logs[:size])
+        start = time.perf_counter()
+        simulate(*arrays)
+        rates[size] = round(size / (time.perf_counter() - start), 1)
+
+    # Every tenth claim is inflated and must be rejected
+    all_scores, _, _ = simulate(*batch_arrays(seeds, logs))
+    claims = [Decimal(int(s)) * replay.SCORE_UNIT for s in all_scores]
+    tampered = set(range(0, len(claims), 10))
+    for i in tampered:
+        claims[i] += Decimal("0.5")
+    results, elapsed, stats = asyncio.run(verify_all(seeds, logs, claims, args.verifier_batch))
+    correct = all(result.valid == (i not in tampered) for i, result in enumerate(results))
+
+    print(json.dumps({
+        "sessions": args.sessions,
+        "mean_log_bytes": round(sum(map(len, logs)) / len(logs), 1),
+        "mean_ticks": round(sum(map(len, masks)) / len(masks), 1),
+        "sessions_hit_by_car": int(hit.sum()),
+        "sessions_with_points": int((all_scores > 0).sum()),
+        "batched_matches_reference": agree,
+        "reference_sessions_per_second": round(reference_rate, 1),
+        "batched_sessions_per_second": rates,
+        "verifier": {
+            "sessions_per_second": round(len(results) / elapsed, 1),
+            "sessions_per_minute": round(len(results) / elapsed * 60),
+            "tampered_rejected_and_rest_accepted": correct,
+            **stats,
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--unique", type=int, default=40, help="distinct bot games; the rest are repeats")
+    parser.add_argument("--reference", type=int, default=40, help="sessions replayed by the per-session simulation")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 256, 1024])
+    parser.add_argument("--verifier-batch", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=11)
+    main(parser.parse_args())
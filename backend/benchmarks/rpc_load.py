@@ -0,0 +1,151 @@
+"""
+Load test for the RPC layer against a stub JSON-RPC server with fixed latency.
+
+Compares the old per-request blocking pattern (new HTTPProvider, sequential
+sync calls on the event loop) with the shared async client fanning out the
+independent reads through asyncio.gather.
+
+Run from backend/:
+    python -m benchmarks.rpc_load --latency 50 --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from aiohttp import web
+from web3 import Web3
+
+from app.utils.rpc import RPCClient
+
+STUB_RESULTS = {
+    "eth_chainId": hex(84532),
+    "eth_gasPrice": hex(1_000_000),
+    "eth_blockNumber": hex(1_000),
+    "eth_getBalance": hex(10**18),
+    "eth_getTransactionCount": hex(7),
+    "eth_estimateGas": hex(21000),
+    "eth_getCode": "0x",
+    "net_listening": True,
+}
+
+
+class StubError(Exception):
+    """Raised by a stub result callable to answer the call with a JSON-RPC error."""
+
+
+def stub_rpc_app(latency: float, results: dict = STUB_RESULTS) -> web.Application:
+    # A result may be a callable taking the call's params, for stateful stubs
+    def respond(call):
+        value = results.get(call["method"], "0x0")
+        try:
+            result = value(call.get("params", [])) if callable(value) else value
+        except StubError as e:
+            return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    async def handle(request):
+        await asyncio.sleep(latency)
+        payload = await request.json()
+        calls = payload if isinstance(payload, list) else [payload]
+        responses = [respond(call) for call in calls]
+        body = responses if isinstance(payload, list) else responses[0]
+        return web.json_response(body)
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    return app
+
+
+def start_stub(latency: float, port: int, results: dict = STUB_RESULTS) -> threading.Thread:
+    # The stub gets its own loop so a blocked benchmark loop can't stall it
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def serve():
+        runner = web.AppRunner(stub_rpc_app(latency, results))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        ready.set()
+
+    def run():
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+    return thread
+
+
+def blocking_request(url: str, address: str):
+    # What every handler used to do: fresh provider, sequential calls
+    w3 = Web3(Web3.HTTPProvider(url))
+    return (
+        w3.eth.get_balance(address),
+        w3.eth.get_transaction_count(address),
+        w3.eth.gas_price,
+        w3.eth.chain_id,
+    )
+
+
+async def async_request(rpc: RPCClient, address: str):
+    w3 = rpc.w3
+    return await asyncio.gather(
+        w3.eth.get_balance(address),
+        w3.eth.get_transaction_count(address),
+        w3.eth.gas_price,
+        w3.eth.chain_id,
+    )
+
+
+async def drive(make_request, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await make_request()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(args):
+    url = f"http://127.0.0.1:{args.port}/"
+    address = "0x0000000000000000000000000000000000000001"
+    start_stub(args.latency / 1000, args.port)
+
+    # The blocking variant runs inside the loop exactly as the old handlers did
+    async def blocking():
+        blocking_request(url, address)
+
+    blocking_rps = await drive(blocking, args.requests, args.concurrency)
+
+    rpc = RPCClient(url, pool_size=args.concurrency, timeout=10)
+    await rpc.connect()
+    try:
+        async_rps = await drive(lambda: async_request(rpc, address), args.requests, args.concurrency)
+        pool = rpc.pool_stats()
+    finally:
+        await rpc.close()
+
+    print(json.dumps({
+        "latency_ms": args.latency,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "blocking_rps": round(blocking_rps, 1),
+        "async_rps": round(async_rps, 1),
+        "speedup": round(async_rps / blocking_rps, 1),
+        "rpc_pool": pool,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=50, help="stub RPC latency in ms")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8545)
+    asyncio.run(main(parser.parse_args()))
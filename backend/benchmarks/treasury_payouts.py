@@ -0,0 +1,304 @@
+"""
+Treasury payouts: one transfer per winner versus batched disperseEther calls.
+
+Seeds --payouts unsettled payout rows spread over --wallets player wallets,
+then pays them out three times through PayoutEngine, the outbox and the
+block confirmer: with no disperse contract (one plain transfer per wallet),
+through the disperse contract, and through the contract with --rejecting
+wallets whose groups fail gas estimation and fall back to plain transfers.
+For each run reports the transactions and payout-related RPC calls made,
+the gas used and fees recorded on payout_batches, and checks every wallet
+received exactly what it was owed.
+
+The chain is a stub that mines every transaction and charges gas with a
+simple model of the EVM: 21000 per transaction plus calldata, and for
+disperseEther a fixed overhead plus a value CALL to a warm-up-cold existing
+account per recipient. Absolute numbers are estimates; the transaction and
+RPC counts are exact.
+
+Run from backend/ with DATABASE_URL pointing at a scratch SQLite file
+(requires aiosqlite for the async engine):
+    DATABASE_URL=sqlite:////tmp/payouts.db python -m benchmarks.treasury_payouts --payouts 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+import rlp
+from eth_abi import decode
+from sqlalchemy import func, insert, select
+from web3 import Web3
+
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import GameEntry, LedgerEntry, OutboundTransaction, PayoutBatch, User
+from app.utils.chain_cache import ChainCache
+from app.utils.confirmer import BlockConfirmer
+from app.utils.crypto import encrypt_private_key
+from app.utils.outbox import TransactionOutbox
+from app.utils.payouts import DISPERSE_ETHER, PayoutEngine
+from app.utils.rpc import RPCClient
+from benchmarks.outbox_flow import ANVIL_KEY, StubChain, prepare_database
+from benchmarks.rpc_load import STUB_RESULTS, StubError, start_stub
+
+DISPERSE_ADDRESS = "0xD152f549545093347A162Dce210e7293f1452150"
+GAS_PRICE = int(STUB_RESULTS["eth_gasPrice"], 16)
+# disperseEther: dispatch, the two array loops and the refund check
+DISPERSE_OVERHEAD = 3000
+# CALL with value (9000) to a cold existing account (2600), plus loop bookkeeping
+DISPERSE_PER_RECIPIENT = 11800
+PAYOUT_METHODS = ("eth_getTransactionCount", "eth_estimateGas", "eth_sendRawTransaction", "eth_getTransactionReceipt")
+
+
+def calldata_gas(data: bytes) -> int:
+    return sum(4 if byte == 0 else 16 for byte in data)
+
+
+def disperse_args(data: bytes):
+    if data[:4] != DISPERSE_ETHER:
+        raise StubError("execution reverted: unknown selector")
+    return decode(['address[]', 'uint256[]'], data[4:])
+
+
+class PayoutChain(StubChain):
+    """StubChain that charges gas, records who was paid, and counts calls."""
+
+    def __init__(self, block_time: float):
+        super().__init__(block_time)
+        self.rejecting = set()
+        self.gas_used = {}
+        self.paid = defaultdict(int)
+        self.calls = Counter()
+
+    def gas(self, data: bytes, recipients: int) -> int:
+        if not data:
+            return 21000
+        return 21000 + calldata_gas(data) + DISPERSE_OVERHEAD + DISPERSE_PER_RECIPIENT * recipients
+
+    def estimate_gas(self, params):
+        data = bytes.fromhex(params[0].get("data", "0x")[2:])
+        if not data:
+            return hex(21000)
+        recipients, _ = disperse_args(data)
+        if any(address.lower() in self.rejecting for address in recipients):
+            raise StubError("execution reverted")
+        return hex(self.gas(data, len(recipients)))
+
+    def send_raw_transaction(self, params):
+        tx_hash = super().send_raw_transaction(params)
+        if tx_hash not in self.gas_used:
+            # Legacy transaction: nonce, gasPrice, gas, to, value, data, v, r, s
+            _, _, _, to, value, data, *_ = rlp.decode(bytes.fromhex(params[0][2:]))
+            if data:
+                recipients, values = disperse_args(data)
+                for address, amount in zip(recipients, values):
+                    self.paid[address.lower()] += amount
+            else:
+                recipients = ['0x' + to.hex()]
+                self.paid[recipients[0].lower()] += int.from_bytes(value, 'big')
+            self.gas_used[tx_hash] = self.gas(data, len(recipients))
+        return tx_hash
+
+    def get_receipt(self, params):
+        receipt = super().get_receipt(params)
+        if receipt is not None:
+            receipt["gasUsed"] = hex(self.gas_used[params[0]])
+            receipt["effectiveGasPrice"] = hex(GAS_PRICE)
+        return receipt
+
+    def results(self) -> dict:
+        results = {
+            **super().results(),
+            "eth_estimateGas": self.estimate_gas,
+            "eth_sendRawTransaction": self.send_raw_transaction,
+            "eth_getTransactionReceipt": self.get_receipt,
+        }
+
+        def counted(method, value):
+            def call(params):
+                self.calls[method] += 1
+                return value(params) if callable(value) else value
+            return call
+
+        return {method: counted(method, value) for method, value in results.items()}
+
+
+def seed_wallets(wallets: int):
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {
+                "email": f"payee{i}@example.com",
+                "username": f"payee{i}",
+                "hashed_password": "x",
+                "wallet_address": Web3.to_checksum_address(f"0x{0xbeef0000 + i:040x}")
+            }
+            for i in range(wallets)
+        ])
+        db.commit()
+        return {user_id: address.lower() for user_id, address in db.execute(select(User.id, User.wallet_address)).all()}
+
+
+def seed_payouts(wallets: dict, payouts: int, rng: random.Random) -> dict:
+    """Completed games with unsettled payout rows; returns the wei owed per wallet."""
+    owed = defaultdict(Decimal)
+    with SessionLocal() as db:
+        entries = {}
+        for user_id in wallets:
+            entry = GameEntry(user_id=user_id, entry_fee_amount=0, transaction_hash="0x", status='completed')
+            db.add(entry)
+            entries[user_id] = entry
+        db.flush()
+
+        rows = []
+        for _ in range(payouts):
+            user_id = rng.choice(list(wallets))
+            amount = Decimal(rng.randint(1, 10**6)) / 10**7
+            owed[wallets[user_id]] += amount
+            rows.append({"game_entry_id": entries[user_id].id, "amount": -amount, "kind": 'payout', "reason": 'cash out'})
+        db.execute(insert(LedgerEntry), rows)
+        db.commit()
+    return {address: Web3.to_wei(amount, 'ether') for address, amount in owed.items()}
+
+
+async def unsettled_payouts() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(func.count()).select_from(LedgerEntry)
+            .where(LedgerEntry.kind == 'payout', LedgerEntry.settlement_tx_hash.is_(None))
+        )
+
+
+async def batches_after(first_id: int):
+    async with AsyncSessionLocal() as db:
+        return (await db.scalars(select(PayoutBatch).where(PayoutBatch.id > first_id).order_by(PayoutBatch.id))).all()
+
+
+async def last_batch_id() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.coalesce(func.max(PayoutBatch.id), 0)))
+
+
+async def run(name: str, args, stub: PayoutChain, rpc, chain, outbox, wallets, rng, contract, rejecting) -> dict:
+    owed = seed_payouts(wallets, args.payouts, rng)
+    stub.rejecting = {address for address in list(owed)[:rejecting]}
+    stub.paid.clear()
+    stub.calls.clear()
+    first_batch = await last_batch_id()
+
+    engine = PayoutEngine(
+        rpc,
+        chain,
+        outbox,
+        treasury_key=encrypt_private_key(args.private_key),
+        contract_address=contract,
+        flush_interval=3600,
+        flush_size=10**9,
+        claim_limit=args.claim_limit,
+        max_recipients=args.max_recipients,
+        min_payout=Decimal(0),
+        gas_margin=1.2
+    )
+    start = time.perf_counter()
+    while await engine.flush() and engine.backlog:
+        pass
+    flushed = time.perf_counter() - start
+
+    while True:
+        batches = await batches_after(first_batch)
+        if all(batch.status != 'queued' for batch in batches):
+            break
+        if time.perf_counter() - start > args.timeout:
+            raise SystemExit(f"{name}: payouts not confirmed after {args.timeout}s")
+        await asyncio.sleep(0.05)
+    settled = time.perf_counter() - start
+
+    transactions = sum(batch.transactions for batch in batches)
+    gas_used = sum(batch.gas_used for batch in batches)
+    return {
+        "wallets_paid": len(owed),
+        "batches": len(batches),
+        "methods": dict(Counter(batch.method for batch in batches)),
+        "transactions": transactions,
+        "payout_rpc_calls": {method: stub.calls[method] for method in PAYOUT_METHODS},
+        "gas_used": gas_used,
+        "gas_per_wallet": round(gas_used / len(owed)),
+        "fee_eth": str(sum(Decimal(str(batch.fee)) for batch in batches)),
+        "flush_seconds": round(flushed, 3),
+        "confirmed_seconds": round(settled, 3),
+        "all_batches_confirmed": all(batch.status == 'confirmed' for batch in batches),
+        "gas_recorded_matches_chain": gas_used == sum(stub.gas_used[tx] for tx in await payout_hashes(first_batch)),
+        "every_wallet_paid_exactly": all(
+            abs(stub.paid.get(address, 0) - amount) <= len(owed) for address, amount in owed.items()
+        ) and set(stub.paid) == set(owed),
+        "unsettled_left": await unsettled_payouts(),
+        "fallbacks": engine.fallbacks,
+    }
+
+
+async def payout_hashes(first_batch: int):
+    async with AsyncSessionLocal() as db:
+        return (await db.scalars(
+            select(OutboundTransaction.tx_hash).where(OutboundTransaction.payout_batch_id > first_batch)
+        )).all()
+
+
+async def main(args):
+    stub = PayoutChain(args.block_time)
+    start_stub(args.latency / 1000, args.port, stub.results())
+    prepare_database(0)
+    wallets = seed_wallets(args.wallets)
+    rng = random.Random(args.seed)
+
+    rpc = RPCClient(f"http://127.0.0.1:{args.port}/", pool_size=4, timeout=30)
+    await rpc.connect()
+    chain = ChainCache(rpc, max_age=4, poll_interval=1)
+    confirmer = BlockConfirmer(rpc, None, depth=args.depth, poll_interval=args.block_time / 4, max_blocks=50, reorg_window=128, reload_interval=30)
+    outbox = TransactionOutbox(rpc, confirmer, None, workers=1, batch_size=args.outbox_batch, poll_interval=0.2, sweep_interval=5, rebroadcast_after=30, max_attempts=3)
+    confirmer.start()
+    outbox.start()
+    try:
+        report = {"payouts": args.payouts, "wallets": args.wallets}
+        report["transfer_per_wallet"] = await run("transfer", args, stub, rpc, chain, outbox, wallets, rng, None, 0)
+        report["disperse"] = await run("disperse", args, stub, rpc, chain, outbox, wallets, rng, DISPERSE_ADDRESS, 0)
+        report["disperse_with_fallback"] = await run(
+            "fallback", args, stub, rpc, chain, outbox, wallets, rng, DISPERSE_ADDRESS, args.rejecting
+        )
+    finally:
+        await outbox.stop()
+        await confirmer.stop()
+        await rpc.close()
+
+    single, batched = report["transfer_per_wallet"], report["disperse"]
+    report["reduction"] = {
+        "transactions": round(single["transactions"] / batched["transactions"], 1),
+        "payout_rpc_calls": round(sum(single["payout_rpc_calls"].values()) / sum(batched["payout_rpc_calls"].values()), 1),
+        "gas": round(single["gas_used"] / batched["gas_used"], 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--payouts", type=int, default=2000)
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--claim-limit", type=int, default=settings.PAYOUT_CLAIM_LIMIT)
+    parser.add_argument("--max-recipients", type=int, default=settings.PAYOUT_MAX_RECIPIENTS)
+    parser.add_argument("--rejecting", type=int, default=3, help="wallets whose disperse estimate reverts in the fallback run")
+    parser.add_argument("--private-key", default=ANVIL_KEY)
+    parser.add_argument("--outbox-batch", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    parser.add_argument("--latency", type=float, default=20, help="stub RPC latency in ms")
+    parser.add_argument("--block-time", type=float, default=0.5)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8548)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        raise SystemExit("Point DATABASE_URL at a scratch SQLite file for this benchmark")
+
+    asyncio.run(main(args))
@@ -0,0 +1,91 @@
+"""Initial schema: users, wallets, game_entries, account_nonces
+
+Matches the tables previously created by Base.metadata.create_all. A database
+that was set up that way can be adopted with `alembic stamp 0001` before
+running `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.execute(f'CREATE SCHEMA IF NOT EXISTS "{SCHEMA}"')
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('wallet_address', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('wallet_address'),
+        schema=SCHEMA
+    )
+    op.create_index('ix_wonder-realm_users_id', 'users', ['id'], schema=SCHEMA)
+    op.create_index('ix_wonder-realm_users_email', 'users', ['email'], unique=True, schema=SCHEMA)
+    op.create_index('ix_wonder-realm_users_username', 'users', ['username'], unique=True, schema=SCHEMA)
+
+    op.create_table(
+        'wallets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('encrypted_private_key', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        schema=SCHEMA
+    )
+    op.create_index('ix_wonder-realm_wallets_id', 'wallets', ['id'], schema=SCHEMA)
+
+    op.create_table(
+        'game_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entry_fee_amount', sa.DECIMAL(20, 18), nullable=False),
+        sa.Column('entry_timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('transaction_hash', sa.String(66), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('balance', sa.DECIMAL(20, 18), server_default='0', nullable=False),
+        sa.Column('last_activity', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        schema=SCHEMA
+    )
+
+    op.create_table(
+        'account_nonces',
+        sa.Column('address', sa.String(42), nullable=False),
+        sa.Column('next_nonce', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('address'),
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('account_nonces', schema=SCHEMA)
+    op.drop_table('game_entries', schema=SCHEMA)
+    op.drop_index('ix_wonder-realm_wallets_id', table_name='wallets', schema=SCHEMA)
+    op.drop_table('wallets', schema=SCHEMA)
+    op.drop_index('ix_wonder-realm_users_username', table_name='users', schema=SCHEMA)
+    op.drop_index('ix_wonder-realm_users_email', table_name='users', schema=SCHEMA)
+    op.drop_index('ix_wonder-realm_users_id', table_name='users', schema=SCHEMA)
+    op.drop_table('users', schema=SCHEMA)
@@ -0,0 +1,61 @@
+"""Indexes for the active-game lookup, transaction hashes and wallet owners
+
+uq_game_entries_user_active is a partial unique index on user_id for rows with
+status = 'active': it answers the per-user active-game query and stops a user
+from holding two active games. Creating it fails if such duplicates already
+exist; resolve them before upgrading.
+
+Indexes are built CONCURRENTLY so live tables are not locked for writes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_game_entries_user_active', 'game_entries', ['user_id'],
+            unique=True,
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True,
+            schema=SCHEMA
+        )
+        op.create_index(
+            'ix_game_entries_transaction_hash', 'game_entries', ['transaction_hash'],
+            postgresql_concurrently=True,
+            schema=SCHEMA
+        )
+        op.create_index(
+            'ix_game_entries_last_activity', 'game_entries', ['last_activity'],
+            postgresql_concurrently=True,
+            schema=SCHEMA
+        )
+        op.create_index(
+            'ix_wonder-realm_wallets_user_id', 'wallets', ['user_id'],
+            postgresql_concurrently=True,
+            schema=SCHEMA
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_wonder-realm_wallets_user_id', table_name='wallets', postgresql_concurrently=True, schema=SCHEMA)
+        op.drop_index('ix_game_entries_last_activity', table_name='game_entries', postgresql_concurrently=True, schema=SCHEMA)
+        op.drop_index('ix_game_entries_transaction_hash', table_name='game_entries', postgresql_concurrently=True, schema=SCHEMA)
+        op.drop_index('uq_game_entries_user_active', table_name='game_entries', postgresql_concurrently=True, schema=SCHEMA)
@@ -0,0 +1,80 @@
+"""Transaction outbox and pending game entries
+
+Adds outbound_transactions, the queue of signed transactions the background
+broadcaster sends and tracks to a receipt. Game entries now start out
+'pending', so the one-game-per-user index covers pending entries too.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbound_transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('game_entry_id', sa.Integer(), nullable=True),
+        sa.Column('sender', sa.String(42), nullable=False),
+        sa.Column('nonce', sa.BigInteger(), nullable=False),
+        sa.Column('tx_hash', sa.String(66), nullable=False),
+        sa.Column('raw_transaction', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(20), server_default='queued', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('block_number', sa.BigInteger(), nullable=True),
+        sa.Column('broadcast_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['game_entry_id'], [f'{SCHEMA}.game_entries.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tx_hash'),
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_wonder-realm_outbound_transactions_game_entry_id', 'outbound_transactions', ['game_entry_id'],
+        schema=SCHEMA
+    )
+    op.create_index('ix_outbound_transactions_status', 'outbound_transactions', ['status', 'id'], schema=SCHEMA)
+
+    # Build the wider index before dropping the old one so uniqueness is never unenforced
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_game_entries_user_open', 'game_entries', ['user_id'],
+            unique=True,
+            postgresql_where=sa.text("status IN ('pending', 'active')"),
+            postgresql_concurrently=True,
+            schema=SCHEMA
+        )
+        op.drop_index('uq_game_entries_user_active', table_name='game_entries', postgresql_concurrently=True, schema=SCHEMA)
+    op.execute(f'ALTER INDEX "{SCHEMA}".uq_game_entries_user_open RENAME TO uq_game_entries_user_active')
+
+
+def downgrade() -> None:
+    op.execute(f'ALTER INDEX "{SCHEMA}".uq_game_entries_user_active RENAME TO uq_game_entries_user_open')
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_game_entries_user_active', 'game_entries', ['user_id'],
+            unique=True,
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True,
+            schema=SCHEMA
+        )
+        op.drop_index('uq_game_entries_user_open', table_name='game_entries', postgresql_concurrently=True, schema=SCHEMA)
+    op.drop_index('ix_outbound_transactions_status', table_name='outbound_transactions', schema=SCHEMA)
+    op.drop_index('ix_wonder-realm_outbound_transactions_game_entry_id', table_name='outbound_transactions', schema=SCHEMA)
+    op.drop_table('outbound_transactions', schema=SCHEMA)
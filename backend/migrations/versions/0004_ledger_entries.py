@@ -0,0 +1,51 @@
+"""Append-only game balance ledger
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ledger_entries',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('game_entry_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.DECIMAL(20, 18), nullable=False),
+        sa.Column('kind', sa.String(10), nullable=False),
+        sa.Column('reason', sa.String(50), nullable=True),
+        sa.Column('settlement_tx_hash', sa.String(66), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['game_entry_id'], [f'{SCHEMA}.game_entries.id']),
+        sa.PrimaryKeyConstraint('id'),
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_wonder-realm_ledger_entries_game_entry_id', 'ledger_entries', ['game_entry_id'],
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_ledger_entries_unsettled', 'ledger_entries', ['id'],
+        postgresql_where=sa.text("kind = 'payout' AND settlement_tx_hash IS NULL"),
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ledger_entries_unsettled', table_name='ledger_entries', schema=SCHEMA)
+    op.drop_index('ix_wonder-realm_ledger_entries_game_entry_id', table_name='ledger_entries', schema=SCHEMA)
+    op.drop_table('ledger_entries', schema=SCHEMA)
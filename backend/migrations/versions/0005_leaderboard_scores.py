@@ -0,0 +1,41 @@
+"""Persisted leaderboard scores
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'leaderboard_scores',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.DECIMAL(38, 18), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_wonder-realm_leaderboard_scores_updated_at', 'leaderboard_scores', ['updated_at'],
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wonder-realm_leaderboard_scores_updated_at', table_name='leaderboard_scores', schema=SCHEMA)
+    op.drop_table('leaderboard_scores', schema=SCHEMA)
@@ -0,0 +1,70 @@
+"""Game results and incrementally maintained leaderboard aggregates
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'game_results',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('game_entry_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.DECIMAL(38, 18), nullable=False),
+        sa.Column('reward', sa.DECIMAL(38, 18), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['game_entry_id'], [f'{SCHEMA}.game_entries.id']),
+        sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('game_entry_id'),
+        schema=SCHEMA
+    )
+    op.create_table(
+        'leaderboard_aggregates',
+        sa.Column('period', sa.String(10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_score', sa.DECIMAL(38, 18), nullable=False),
+        sa.Column('best_score', sa.DECIMAL(38, 18), nullable=False),
+        sa.Column('games', sa.Integer(), nullable=False),
+        sa.Column('rewards', sa.DECIMAL(38, 18), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], [f'{SCHEMA}.users.id']),
+        sa.PrimaryKeyConstraint('period', 'period_start', 'user_id'),
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_leaderboard_aggregates_ranking', 'leaderboard_aggregates',
+        ['period', 'period_start', 'total_score', 'user_id'],
+        schema=SCHEMA
+    )
+    op.create_table(
+        'aggregate_watermarks',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('aggregate_watermarks', schema=SCHEMA)
+    op.drop_index('ix_leaderboard_aggregates_ranking', table_name='leaderboard_aggregates', schema=SCHEMA)
+    op.drop_table('leaderboard_aggregates', schema=SCHEMA)
+    op.drop_table('game_results', schema=SCHEMA)
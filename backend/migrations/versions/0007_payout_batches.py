@@ -0,0 +1,76 @@
+"""Batched treasury payouts with per-batch gas accounting
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payout_batches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('method', sa.String(10), nullable=False),
+        sa.Column('recipients', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.DECIMAL(38, 18), nullable=False),
+        sa.Column('transactions', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), server_default='queued', nullable=False),
+        sa.Column('gas_price', sa.BigInteger(), nullable=False),
+        sa.Column('gas_limit', sa.BigInteger(), nullable=False),
+        sa.Column('confirmed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('failed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('gas_used', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('fee', sa.DECIMAL(38, 18), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        schema=SCHEMA
+    )
+    op.create_index('ix_payout_batches_status', 'payout_batches', ['status', 'id'], schema=SCHEMA)
+
+    op.add_column(
+        'outbound_transactions',
+        sa.Column('payout_batch_id', sa.Integer(), nullable=True),
+        schema=SCHEMA
+    )
+    op.create_foreign_key(
+        'fk_outbound_transactions_payout_batch_id', 'outbound_transactions', 'payout_batches',
+        ['payout_batch_id'], ['id'],
+        source_schema=SCHEMA, referent_schema=SCHEMA
+    )
+    op.create_index(
+        'ix_wonder-realm_outbound_transactions_payout_batch_id', 'outbound_transactions', ['payout_batch_id'],
+        schema=SCHEMA
+    )
+    # Lets a failed settlement hand its payouts back to the queue
+    op.create_index(
+        'ix_ledger_entries_settlement_tx_hash', 'ledger_entries', ['settlement_tx_hash'],
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ledger_entries_settlement_tx_hash', table_name='ledger_entries', schema=SCHEMA)
+    op.drop_index(
+        'ix_wonder-realm_outbound_transactions_payout_batch_id', table_name='outbound_transactions', schema=SCHEMA
+    )
+    op.drop_constraint(
+        'fk_outbound_transactions_payout_batch_id', 'outbound_transactions', type_='foreignkey', schema=SCHEMA
+    )
+    op.drop_column('outbound_transactions', 'payout_batch_id', schema=SCHEMA)
+    op.drop_index('ix_payout_batches_status', table_name='payout_batches', schema=SCHEMA)
+    op.drop_table('payout_batches', schema=SCHEMA)
@@ -0,0 +1,44 @@
+"""Pool of pre-generated wallets for registration
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'wallet_pool',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('address', sa.String(42), nullable=False),
+        sa.Column('encrypted_private_key', sa.String(), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('address'),
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_wallet_pool_available', 'wallet_pool', ['id'],
+        postgresql_where=sa.text("claimed_at IS NULL"),
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wallet_pool_available', table_name='wallet_pool', schema=SCHEMA)
+    op.drop_table('wallet_pool', schema=SCHEMA)
@@ -0,0 +1,40 @@
+"""Shared token buckets for per-user rate limits
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('key', sa.String(128), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('refilled_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        schema=SCHEMA
+    )
+    op.create_index(
+        'ix_rate_limit_buckets_refilled_at', 'rate_limit_buckets', ['refilled_at'],
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rate_limit_buckets_refilled_at', table_name='rate_limit_buckets', schema=SCHEMA)
+    op.drop_table('rate_limit_buckets', schema=SCHEMA)
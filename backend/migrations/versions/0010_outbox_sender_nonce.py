@@ -0,0 +1,30 @@
+"""Index outbox rows by sender and nonce for nonce resyncs
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 21:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = 'wonder-realm'
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_outbound_transactions_sender_nonce', 'outbound_transactions', ['sender', 'nonce'],
+        schema=SCHEMA
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbound_transactions_sender_nonce', table_name='outbound_transactions', schema=SCHEMA)
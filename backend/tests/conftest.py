@@ -0,0 +1,64 @@
+"""
+Behaviour tests for the services behind the routes.
+
+They run against a scratch SQLite database unless DATABASE_URL is already
+set, in which case that database must be migrated (alembic upgrade head).
+pytest-asyncio is not a dependency, so async code is driven with asyncio.run.
+
+Run from backend/:
+    pip install -r requirements-dev.txt && python -m pytest
+"""
+import itertools
+import os
+import tempfile
+
+from cryptography.fernet import Fernet
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "tests.db"))
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+os.environ.setdefault("DEV_WALLET_ADDRESS", "0x0000000000000000000000000000000000000001")
+os.environ.setdefault("TREASURY_WALLET_ADDRESS", "0x0000000000000000000000000000000000000002")
+os.environ.setdefault("TREASURY_ENCRYPTED_KEY", "unused")
+
+import pytest
+
+from app.config import settings
+from app.database import SessionLocal, create_sqlite_schema
+from app.models import User
+
+_users = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def database():
+    if settings.DATABASE_URL.startswith("sqlite"):
+        create_sqlite_schema()
+
+
+@pytest.fixture
+def make_user(database):
+    """Adds a user with a wallet address of its own; returns (id, wallet address)."""
+
+    def make():
+        n = next(_users)
+        with SessionLocal() as db:
+            user = User(
+                email=f"test{os.getpid()}-{n}@example.com",
+                username=f"test{os.getpid()}-{n}",
+                hashed_password="x",
+                wallet_address="0x" + os.urandom(20).hex()
+            )
+            db.add(user)
+            db.commit()
+            return user.id, user.wallet_address
+
+    return make
+
+
+@pytest.fixture
+def address(database):
+    """A sender address no other test uses."""
+    return "0x" + os.urandom(20).hex()
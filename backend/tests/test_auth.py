@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, update
+
+from app.database import SessionLocal, get_async_engine
+from app.models import User
+from app.routes import auth as auth_routes
+from app.utils import auth
+from app.utils.auth import create_access_token, get_fresh_user, token_claims, user_from_token
+
+
+def token_for(user_id: int, **overrides) -> str:
+    with SessionLocal() as db:
+        claims = token_claims(db.get(User, user_id))
+    claims.update(overrides)
+    return create_access_token({key: value for key, value in claims.items() if value is not None})
+
+
+def deactivate(user_id: int):
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(is_active=False))
+        db.commit()
+
+
+def test_current_user_comes_from_the_claims(make_user, monkeypatch):
+    user_id, wallet_address = make_user()
+    token = token_for(user_id)
+
+    async def no_lookups(user_id, email):
+        raise AssertionError("looked the user up")
+
+    monkeypatch.setattr(auth, "_load_user", no_lookups)
+    user = asyncio.run(user_from_token(token))
+    assert (user.id, user.wallet_address, user.is_active) == (user_id, wallet_address, True)
+
+
+def test_older_token_is_looked_up(make_user):
+    user_id, wallet_address = make_user()
+    user = asyncio.run(user_from_token(token_for(user_id, username=None, wallet=None, active=None)))
+    assert (user.id, user.wallet_address) == (user_id, wallet_address)
+
+
+def test_fresh_user_refuses_a_user_deactivated_after_login(make_user):
+    user_id, _ = make_user()
+    token = token_for(user_id)
+    deactivate(user_id)
+
+    # The token's claims still say active until it expires
+    assert asyncio.run(user_from_token(token)).is_active
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(get_fresh_user(token))
+    assert refused.value.status_code == 403
+
+
+def test_login_returns_its_connection_before_bcrypt(make_user, monkeypatch):
+    user_id, _ = make_user()
+    with SessionLocal() as db:
+        email = db.get(User, user_id).email
+
+    engine = get_async_engine().sync_engine
+    held = {"connections": 0}
+    held_during_bcrypt = []
+
+    def checkout(*args):
+        held["connections"] += 1
+
+    def checkin(*args):
+        held["connections"] -= 1
+
+    async def verify(plain_password, hashed_password):
+        held_during_bcrypt.append(held["connections"])
+        return True
+
+    monkeypatch.setattr(auth_routes, "verify_password_async", verify)
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+    try:
+        form = type("Form", (), {"username": email, "password": "secret"})()
+        token = asyncio.run(auth_routes.login(form))
+    finally:
+        event.remove(engine, "checkout", checkout)
+        event.remove(engine, "checkin", checkin)
+
+    assert held_during_bcrypt == [0]
+    assert asyncio.run(user_from_token(token["access_token"])).id == user_id
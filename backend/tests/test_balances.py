@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from app.utils.balances import BalanceFetchError, fetch_balances
+
+
+class FlakyNode:
+    """Fails every batch that asks for one of the addresses in broken."""
+
+    def __init__(self, broken):
+        self.broken = set(broken)
+
+    async def batch(self, calls):
+        if any(params[0] in self.broken for _, params in calls):
+            raise asyncio.TimeoutError()
+        return [hex(int(params[0], 16)) for _, params in calls]
+
+
+def test_failed_chunk_is_reported_after_the_others():
+    addresses = [f"0x{i:040x}" for i in range(1, 11)]
+    fetched = {}
+
+    async def run():
+        async for address, balance in fetch_balances(
+            FlakyNode({addresses[4]}), addresses, chunk_size=3, concurrency=2, block_number=1
+        ):
+            fetched[address] = balance
+
+    with pytest.raises(BalanceFetchError) as failed:
+        asyncio.run(run())
+    assert failed.value.addresses == addresses[3:6]
+    assert fetched == {address: int(address, 16) for address in addresses if address not in addresses[3:6]}
@@ -0,0 +1,194 @@
+import asyncio
+import os
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import GameEntry, OutboundTransaction, PayoutBatch
+from app.utils.confirmer import BlockConfirmer
+
+
+class Chain:
+    """Canned eth_* results for a chain whose blocks the test lays out by hand."""
+
+    def __init__(self, head: int):
+        self.blocks = {}
+        self.head = -1
+        self.fork = 0
+        for number in range(head - 2, head + 1):
+            self.mine(number)
+
+    def block_hash(self, number: int, fork: int) -> str:
+        return "0x" + f"{fork:04x}{number:060x}"
+
+    def mine(self, number: int, transactions=()):
+        parent = self.blocks.get(number - 1)
+        self.blocks[number] = {
+            "number": hex(number),
+            "hash": self.block_hash(number, self.fork),
+            "parentHash": parent["hash"] if parent else self.block_hash(number - 1, self.fork),
+            "transactions": list(transactions),
+        }
+        self.head = max(self.head, number)
+
+    def reorg(self, from_number: int):
+        """Drop from_number and everything above it; blocks mined after this are a new fork."""
+        self.fork += 1
+        for number in [n for n in self.blocks if n >= from_number]:
+            del self.blocks[number]
+        self.head = from_number - 1
+
+    def receipt(self, tx_hash: str):
+        for block in self.blocks.values():
+            if tx_hash in block["transactions"]:
+                return {
+                    "status": "0x1",
+                    "blockHash": block["hash"],
+                    "blockNumber": block["number"],
+                    "gasUsed": "0x5208",
+                    "effectiveGasPrice": "0x3b9aca00"
+                }
+        return None
+
+    async def batch(self, calls):
+        results = []
+        for method, params in calls:
+            if method == "eth_blockNumber":
+                results.append(hex(self.head))
+            elif method == "eth_getBlockByNumber":
+                results.append(self.blocks.get(int(params[0], 16)))
+            elif method == "eth_getTransactionReceipt":
+                results.append(self.receipt(params[0]))
+        return results
+
+
+def broadcast_entry(user_id: int) -> tuple:
+    tx_hash = "0x" + os.urandom(32).hex()
+    with SessionLocal() as db:
+        entry = GameEntry(user_id=user_id, entry_fee_amount=0, transaction_hash=tx_hash, status='pending')
+        db.add(entry)
+        db.flush()
+        db.add(OutboundTransaction(
+            game_entry_id=entry.id,
+            sender="0x" + os.urandom(20).hex(),
+            nonce=0,
+            tx_hash=tx_hash,
+            raw_transaction="0x",
+            status='broadcast',
+            attempts=1
+        ))
+        db.commit()
+        return entry.id, tx_hash
+
+
+def broadcast_payout() -> tuple:
+    tx_hash = "0x" + os.urandom(32).hex()
+    with SessionLocal() as db:
+        batch = PayoutBatch(method='transfer', recipients=1, amount=1, transactions=1, gas_price=10**9, gas_limit=21000)
+        db.add(batch)
+        db.flush()
+        db.add(OutboundTransaction(
+            payout_batch_id=batch.id,
+            sender="0x" + os.urandom(20).hex(),
+            nonce=0,
+            tx_hash=tx_hash,
+            raw_transaction="0x",
+            status='broadcast',
+            attempts=1
+        ))
+        db.commit()
+        return batch.id, tx_hash
+
+
+async def settled(entry_id: int, tx_hash: str) -> tuple:
+    async with AsyncSessionLocal() as db:
+        entry_status = await db.scalar(select(GameEntry.status).where(GameEntry.id == entry_id))
+        row = (await db.execute(
+            select(OutboundTransaction.status, OutboundTransaction.block_number)
+            .where(OutboundTransaction.tx_hash == tx_hash)
+        )).one()
+    return entry_status, row.status, row.block_number
+
+
+def test_reorg_moves_inclusion_to_the_new_block(make_user):
+    user_id, _ = make_user()
+    entry_id, tx_hash = broadcast_entry(user_id)
+
+    async def run():
+        chain = Chain(head=100)
+        confirmer = BlockConfirmer(
+            chain, None, depth=2, poll_interval=0, max_blocks=50, reorg_window=16, reload_interval=3600
+        )
+        await confirmer.tick()
+
+        chain.mine(101, [tx_hash])
+        await confirmer.tick()
+        assert confirmer.included[tx_hash].block_number == 101
+
+        # 101 is replaced before the transaction is deep enough; it lands in 102 instead
+        chain.reorg(101)
+        chain.mine(101)
+        chain.mine(102, [tx_hash])
+        await confirmer.tick()
+        assert confirmer.reorgs == 1
+        assert tx_hash not in confirmer.included
+        assert await settled(entry_id, tx_hash) == ('pending', 'broadcast', None)
+
+        await confirmer.tick()
+        assert confirmer.included[tx_hash].block_number == 102
+        assert await settled(entry_id, tx_hash) == ('pending', 'broadcast', None)
+
+        chain.mine(103)
+        await confirmer.tick()
+        assert await settled(entry_id, tx_hash) == ('active', 'confirmed', 102)
+        assert confirmer.confirmed == 1
+        assert tx_hash not in confirmer.pending
+
+    asyncio.run(run())
+
+
+def test_stale_receipt_waits_for_new_inclusion(make_user):
+    user_id, _ = make_user()
+    entry_id, tx_hash = broadcast_entry(user_id)
+
+    async def run():
+        chain = Chain(head=200)
+        confirmer = BlockConfirmer(
+            chain, None, depth=1, poll_interval=0, max_blocks=50, reorg_window=16, reload_interval=3600
+        )
+        await confirmer.tick()
+        # Seen by the outbox sweep in a block that has since been replaced
+        confirmer.note_inclusion(tx_hash, 200, "0x" + "ff" * 32)
+        await confirmer.settle(200)
+        assert tx_hash not in confirmer.included
+        assert await settled(entry_id, tx_hash) == ('pending', 'broadcast', None)
+
+    asyncio.run(run())
+
+
+def test_payout_settled_by_two_workers_is_counted_once(database):
+    batch_id, tx_hash = broadcast_payout()
+
+    async def run():
+        chain = Chain(head=300)
+        workers = [
+            BlockConfirmer(chain, None, depth=1, poll_interval=0, max_blocks=50, reorg_window=16, reload_interval=3600)
+            for _ in range(2)
+        ]
+        for confirmer in workers:
+            await confirmer.tick()
+
+        chain.mine(301, [tx_hash])
+        # Both see the inclusion before either has written it out
+        for confirmer in workers:
+            await confirmer.follow(301)
+        for confirmer in workers:
+            await confirmer.settle(301)
+
+        async with AsyncSessionLocal() as db:
+            batch = await db.get(PayoutBatch, batch_id)
+        assert (batch.status, batch.confirmed, batch.failed, batch.gas_used) == ('confirmed', 1, 0, 21000)
+        assert sum(confirmer.confirmed for confirmer in workers) == 1
+        assert all(tx_hash not in confirmer.pending for confirmer in workers)
+
+    asyncio.run(run())
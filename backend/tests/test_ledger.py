@@ -0,0 +1,71 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import GameEntry, GameResult, LedgerEntry
+from app.utils.ledger import GameLedger, LedgerError
+
+
+def active_game(user_id: int, balance: int) -> int:
+    with SessionLocal() as db:
+        entry = GameEntry(user_id=user_id, entry_fee_amount=1, transaction_hash="0x", status='active', balance=balance)
+        db.add(entry)
+        db.commit()
+        return entry.id
+
+
+async def payouts(game_entry_id: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return list(await db.scalars(
+            select(LedgerEntry.amount).where(LedgerEntry.game_entry_id == game_entry_id, LedgerEntry.kind == 'payout')
+        ))
+
+
+async def results(game_entry_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(GameResult).where(GameResult.game_entry_id == game_entry_id))
+
+
+async def balance(game_entry_id: int) -> Decimal:
+    async with AsyncSessionLocal() as db:
+        return Decimal(await db.scalar(select(GameEntry.balance).where(GameEntry.id == game_entry_id)))
+
+
+def test_credits_from_every_worker_are_paid_once(make_user):
+    game = active_game(make_user()[0], 100)
+
+    async def run():
+        first = GameLedger(None)
+        second = GameLedger(None)
+        # A client's events spread over two workers
+        await first.credit(game, Decimal(5))
+        assert await second.credit(game, Decimal(7)) == Decimal(112)
+
+        assert await first.cash_out(game) == Decimal(112)
+        with pytest.raises(LedgerError):
+            await second.cash_out(game)
+        with pytest.raises(LedgerError):
+            await second.credit(game, Decimal(1))
+
+        assert [Decimal(amount) for amount in await payouts(game)] == [Decimal(-112)]
+        assert await results(game) == 1
+        assert await balance(game) == 0
+
+    asyncio.run(run())
+
+
+def test_debit_past_the_balance_is_refused(make_user):
+    game = active_game(make_user()[0], 10)
+
+    async def run():
+        ledger = GameLedger(None)
+        with pytest.raises(LedgerError, match="Insufficient"):
+            await ledger.debit(game, Decimal(11))
+        assert await ledger.debit(game, Decimal(4)) == Decimal(6)
+        assert await balance(game) == Decimal(6)
+        assert ledger.stats() == {"events": 1, "cash_outs": 0, "rejected": 1}
+
+    asyncio.run(run())
@@ -0,0 +1,68 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import AccountNonce, OutboundTransaction
+from app.utils.nonce import allocate_nonce
+
+
+def sent(address: str, nonce: int, status: str):
+    with SessionLocal() as db:
+        db.add(OutboundTransaction(
+            sender=address,
+            nonce=nonce,
+            tx_hash="0x" + os.urandom(32).hex(),
+            raw_transaction="0x",
+            status=status,
+            attempts=1
+        ))
+        db.commit()
+
+
+def counter_idle_for(address: str, seconds: float):
+    with SessionLocal() as db:
+        db.execute(
+            update(AccountNonce)
+            .where(AccountNonce.address == address)
+            .values(updated_at=datetime.now(timezone.utc) - timedelta(seconds=seconds))
+        )
+        db.commit()
+
+
+def allocate(address: str, chain_nonce: int, count: int = 1) -> list:
+    async def run():
+        return [await allocate_nonce(address, chain_nonce) for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_counter_rewinds_over_failed_transactions(address):
+    assert allocate(address, 0, 3) == [0, 1, 2]
+    for nonce in (0, 1, 2):
+        sent(address, nonce, 'failed')
+    assert allocate(address, 0) == [0]
+
+
+def test_outstanding_transaction_blocks_the_rewind(address):
+    assert allocate(address, 3, 2) == [3, 4]
+    sent(address, 3, 'failed')
+    sent(address, 4, 'broadcast')
+    counter_idle_for(address, 3600)
+    assert allocate(address, 3) == [5]
+
+
+def test_allocation_not_yet_in_the_outbox_is_left_alone(address):
+    assert allocate(address, 7) == [7]
+    # The request holding 7 hasn't committed its outbox row yet
+    assert allocate(address, 7) == [8]
+
+
+def test_allocation_that_never_reached_the_outbox_is_reused(address):
+    assert allocate(address, 7, 2) == [7, 8]
+    sent(address, 7, 'failed')
+    # 8 was allocated by a worker that died before committing its outbox row
+    assert allocate(address, 7) == [9]
+    counter_idle_for(address, 3600)
+    assert allocate(address, 7) == [7]
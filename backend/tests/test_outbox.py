@@ -0,0 +1,138 @@
+import asyncio
+
+from eth_account import Account
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models import AccountNonce, OutboundTransaction
+from app.utils.balance_cache import BalanceCache
+from app.utils.confirmer import BlockConfirmer
+from app.utils.outbox import TransactionOutbox, queue_transaction
+from app.utils.rpc import RPCError
+
+
+class Node:
+    """
+    Accepts every transaction except those with a nonce in reject, and
+    counts it as pending if no nonce before it is missing; nothing is mined.
+    """
+
+    def __init__(self, pending: int, reject=()):
+        self.pending = pending
+        self.reject = set(reject)
+        self.nonces = {}
+
+    async def batch(self, calls):
+        results = []
+        for method, params in calls:
+            if method == "eth_getTransactionCount":
+                results.append(hex(self.pending))
+            elif method == "eth_sendRawTransaction":
+                # Rows left queued by other tests are simply accepted
+                nonce = self.nonces.get(params[0])
+                if nonce in self.reject:
+                    results.append(RPCError(method, {"code": -32000, "message": "insufficient funds for gas * price + value"}))
+                else:
+                    if nonce == self.pending:
+                        self.pending += 1
+                    results.append("0x")
+            elif method == "eth_getTransactionReceipt":
+                results.append(None)
+        return results
+
+
+def outbox_for(node: Node, balances: BalanceCache = None) -> TransactionOutbox:
+    confirmer = BlockConfirmer(node, None, depth=1, poll_interval=0, max_blocks=1, reorg_window=1, reload_interval=3600)
+    return TransactionOutbox(
+        node, confirmer, balances, workers=1, batch_size=50, poll_interval=0, sweep_interval=0, rebroadcast_after=0, max_attempts=1
+    )
+
+
+async def queue(node: Node, account, count: int) -> list:
+    nonces = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(count):
+            transaction = {
+                'from': account.address,
+                'to': account.address,
+                # Distinct from any earlier transaction with the same nonce
+                'value': len(node.nonces) + 1,
+                'chainId': 1,
+                'gasPrice': 1,
+                'gas': 21000
+            }
+            outbound = await queue_transaction(db, account, transaction, node.pending)
+            node.nonces[outbound.raw_transaction] = outbound.nonce
+            nonces.append(outbound.nonce)
+        await db.commit()
+    return nonces
+
+
+async def next_nonce(address: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(AccountNonce.next_nonce).where(AccountNonce.address == address))
+
+
+async def statuses(address: str) -> list:
+    async with AsyncSessionLocal() as db:
+        return list(await db.scalars(
+            select(OutboundTransaction.status)
+            .where(OutboundTransaction.sender == address)
+            .order_by(OutboundTransaction.nonce, OutboundTransaction.id)
+        ))
+
+
+def test_rejected_newest_nonces_are_reused(database):
+    account = Account.create()
+
+    async def run():
+        node = Node(pending=5, reject={6, 7})
+        assert await queue(node, account, 3) == [5, 6, 7]
+        await outbox_for(node).broadcast_once()
+        assert await statuses(account.address) == ['broadcast', 'failed', 'failed']
+        assert await next_nonce(account.address) == 6
+
+        node.reject.clear()
+        assert await queue(node, account, 1) == [6]
+
+    asyncio.run(run())
+
+
+def test_gap_left_by_a_rejection_is_closed_once_nothing_is_outstanding(database):
+    account = Account.create()
+
+    async def run():
+        node = Node(pending=3, reject={3})
+        outbox = outbox_for(node)
+        assert await queue(node, account, 2) == [3, 4]
+        await outbox.broadcast_once()
+        # 4 is still outstanding, so 3 can't be handed out again yet without risking a duplicate
+        assert await statuses(account.address) == ['failed', 'broadcast']
+        assert await next_nonce(account.address) == 5
+
+        # The node never mines 4 behind the gap; once the sweep gives up on it the counter rewinds
+        await outbox.sweep_once()
+        assert await statuses(account.address) == ['failed', 'failed']
+        assert await next_nonce(account.address) == 3
+
+        node.reject.clear()
+        assert await queue(node, account, 1) == [3]
+
+    asyncio.run(run())
+
+
+def test_broadcast_drops_the_senders_cached_balance(database):
+    account = Account.create()
+    other = Account.create()
+
+    async def run():
+        balances = BalanceCache(maxsize=100, ttl=60)
+        balances.set(account.address, 10, 5 * 10**18)
+        balances.set(other.address, 10, 10**18)
+        node = Node(pending=0)
+        await queue(node, account, 1)
+        await outbox_for(node, balances).broadcast_once()
+        assert balances.get(account.address, 10) is None
+        assert balances.get(other.address, 10) == 10**18
+
+    asyncio.run(run())
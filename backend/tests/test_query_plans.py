@@ -0,0 +1,92 @@
+"""
+Query-plan regression check for the game_entries, wallets and outbox lookups.
+
+Runs EXPLAIN on the queries the request handlers and background workers
+issue and fails if any of them stops using its index. Sequential scans are
+disabled for the check, so a tiny or empty table still reports whether the
+index is usable at all.
+
+Needs a migrated PostgreSQL database and is skipped otherwise:
+    alembic upgrade head && DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import get_engine
+from app.models import GameEntry, OutboundTransaction, Wallet
+
+pytestmark = pytest.mark.skipif(
+    not settings.DATABASE_URL.startswith(("postgresql", "postgres:")),
+    reason="query plans are checked on a migrated PostgreSQL database"
+)
+
+CHECKS = [
+    (
+        "open game by user",
+        select(GameEntry).where(GameEntry.user_id == 1, GameEntry.status.in_(('pending', 'active'))),
+        "uq_game_entries_user_active"
+    ),
+    (
+        "entry by transaction hash",
+        select(GameEntry).where(GameEntry.transaction_hash == "0x" + "00" * 32),
+        "ix_game_entries_transaction_hash"
+    ),
+    (
+        "idle games",
+        select(GameEntry.id).where(GameEntry.last_activity < datetime.now(timezone.utc) - timedelta(hours=1)),
+        "ix_game_entries_last_activity"
+    ),
+    (
+        "wallet by user",
+        select(Wallet).where(Wallet.user_id == 1),
+        "ix_wonder-realm_wallets_user_id"
+    ),
+    (
+        "queued outbox rows",
+        select(OutboundTransaction).where(OutboundTransaction.status == 'queued').order_by(OutboundTransaction.id).limit(50),
+        "ix_outbound_transactions_status"
+    ),
+    (
+        "broadcast outbox rows",
+        select(OutboundTransaction).where(
+            OutboundTransaction.status == 'broadcast', OutboundTransaction.id > 0
+        ).order_by(OutboundTransaction.id).limit(50),
+        "ix_outbound_transactions_status"
+    ),
+    (
+        "sender's newest nonces",
+        select(OutboundTransaction.nonce, OutboundTransaction.status).where(
+            OutboundTransaction.sender == "0x" + "00" * 20, OutboundTransaction.nonce >= 0
+        ),
+        "ix_outbound_transactions_sender_nonce"
+    ),
+]
+
+
+def _indexes(plan):
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from _indexes(child)
+
+
+@pytest.fixture(scope="module")
+def connection():
+    with get_engine().connect() as connection:
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        yield connection
+
+
+@pytest.mark.parametrize("statement, index_name", [check[1:] for check in CHECKS], ids=[check[0] for check in CHECKS])
+def test_query_uses_its_index(connection, statement, index_name):
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, params).all()[0][0][0]["Plan"]
+    assert index_name in set(_indexes(plan)), json.dumps(plan, indent=2)
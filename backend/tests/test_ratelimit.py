@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.auth import CurrentUser
+from app.utils.ratelimit import BucketRule, MemoryBucketStore, RateLimiter, rate_limit
+
+
+class StalledStore:
+    """A shared store that never answers, like a database stuck on a lock."""
+
+    def __init__(self):
+        self.called = asyncio.Event()
+
+    async def take(self, route_class, user_id, rule):
+        self.called.set()
+        await asyncio.Event().wait()
+
+    async def purge(self, older_than):
+        pass
+
+
+def limiter(store, max_in_flight: int = 2) -> RateLimiter:
+    return RateLimiter({"withdraw": BucketRule(1, 1.0)}, store, max_in_flight, purge_interval=3600)
+
+
+def test_cancelled_request_gives_its_slot_back():
+    async def run():
+        store = StalledStore()
+        limits = limiter(store)
+        # The client disconnects while the request waits on the store
+        request = asyncio.create_task(limits.acquire("withdraw", 1))
+        await store.called.wait()
+        assert limits.in_flight == 1
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        assert limits.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_limited_request_gives_its_slot_back_and_admitted_one_holds_it():
+    async def run():
+        limits = limiter(MemoryBucketStore(100))
+        await limits.acquire("withdraw", 1)
+        assert limits.in_flight == 1
+
+        with pytest.raises(HTTPException) as limited:
+            await limits.acquire("withdraw", 1)
+        assert limited.value.status_code == 429
+        assert limits.in_flight == 1
+
+        limits.release()
+        assert limits.in_flight == 0
+        assert (limits.admitted, limits.limited) == ({"withdraw": 1}, {"withdraw": 1})
+
+    asyncio.run(run())
+
+
+def test_full_worker_turns_requests_away():
+    async def run():
+        limits = limiter(MemoryBucketStore(100), max_in_flight=1)
+        await limits.acquire("withdraw", 1)
+        with pytest.raises(HTTPException) as busy:
+            await limits.acquire("withdraw", 2)
+        assert busy.value.status_code == 503
+        assert limits.in_flight == 1
+
+    asyncio.run(run())
+
+
+def admitted(limits: RateLimiter):
+    """Enter the rate_limit dependency the way FastAPI does; returns it and the slot it yields."""
+    user = CurrentUser(id=1, email="a@example.com", username="a", wallet_address="0x", is_active=True)
+    dependency = rate_limit("withdraw")(user, limits)
+    return dependency, dependency.__anext__()
+
+
+async def chunks(*items):
+    for item in items:
+        yield item
+
+
+def test_streaming_response_holds_the_slot_until_its_body_is_sent():
+    async def run():
+        limits = limiter(MemoryBucketStore(100))
+        dependency, entered = admitted(limits)
+        response = (await entered).stream(chunks("first\n", "last\n"), media_type="text/plain")
+        # FastAPI leaves the dependency before it starts sending the body
+        await dependency.aclose()
+        assert limits.in_flight == 1
+
+        assert [chunk async for chunk in response.body_iterator] == ["first\n", "last\n"]
+        assert limits.in_flight == 0
+        await response.background()
+        assert limits.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_stream_never_started_is_released_by_its_background_task():
+    async def run():
+        limits = limiter(MemoryBucketStore(100))
+        dependency, entered = admitted(limits)
+        response = (await entered).stream(chunks("never sent\n"), media_type="text/plain")
+        await dependency.aclose()
+        assert limits.in_flight == 1
+        # The client went away before the first chunk
+        await response.background()
+        assert limits.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_plain_handler_gives_the_slot_back_with_the_dependency():
+    async def run():
+        limits = limiter(MemoryBucketStore(100))
+        dependency, entered = admitted(limits)
+        await entered
+        await dependency.aclose()
+        assert limits.in_flight == 0
+
+    asyncio.run(run())
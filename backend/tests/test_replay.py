@@ -0,0 +1,61 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.utils.replay import ReplayVerifier, encode_inputs, session_seed
+
+
+def test_failed_batch_fails_its_sessions_and_keeps_running(monkeypatch):
+    calls = []
+
+    def broken_once(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("simulation blew up")
+        return ReplayVerifier._run(batch)
+
+    async def run():
+        verifier = ReplayVerifier(batch_size=8, max_wait=0.05, max_log_bytes=8192)
+        monkeypatch.setattr(verifier, "_run", broken_once)
+        verifier.start()
+        try:
+            log = encode_inputs([0] * 10)
+            results = await asyncio.wait_for(asyncio.gather(
+                verifier.verify(1, log, Decimal(0)),
+                verifier.verify(2, log, Decimal(0)),
+                return_exceptions=True
+            ), 5)
+            assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+            assert verifier.errors == 1
+
+            # The task survived the failure and verifies the next batch
+            result = await asyncio.wait_for(verifier.verify(3, log, Decimal(0)), 5)
+            assert result.valid
+        finally:
+            await verifier.stop()
+
+    asyncio.run(run())
+
+
+def test_log_longer_than_the_game_has_run_is_refused():
+    async def run():
+        verifier = ReplayVerifier(batch_size=8, max_wait=0.05, max_log_bytes=8192)
+        verifier.start()
+        try:
+            log = encode_inputs([0] * 41)
+            with pytest.raises(ValueError):
+                await verifier.verify(1, log, Decimal(0), max_ticks=40)
+            assert (await asyncio.wait_for(verifier.verify(1, log, Decimal(0), max_ticks=41), 5)).valid
+        finally:
+            await verifier.stop()
+
+    asyncio.run(run())
+
+
+def test_seed_is_keyed_and_not_the_entry_id(monkeypatch):
+    seed = session_seed(1)
+    assert seed != 1 and seed == session_seed(1) and seed != session_seed(2)
+    monkeypatch.setattr(settings, "SECRET_KEY", "another key")
+    assert session_seed(1) != seed
@@ -1,6 +1,5 @@
 import React, { useEffect, useRef } from 'react';
 import Phaser from 'phaser';
-import { io } from 'socket.io-client';
 
 function GameMap() {
   const gameContainer = useRef(null);
@@ -8,7 +7,30 @@ function GameMap() {
   const socket = useRef(null);
 
   useEffect(() => {
-    socket.current = io('http://localhost:3000');
+    const token = encodeURIComponent(localStorage.getItem('token') || '');
+    socket.current = new WebSocket(`ws://localhost:8000/api/leaderboard/ws?token=${token}`);
+
+    // Top players by id, kept in step with the server's snapshot and diff frames
+    let leaderboardRows = {};
+    socket.current.onmessage = (event) => {
+      const frame = JSON.parse(event.data);
+      if (frame.type === 'snapshot') {
+        leaderboardRows = {};
+        frame.top.forEach((row) => { leaderboardRows[row.id] = row; });
+      } else if (frame.type === 'diff') {
+        frame.removed.forEach((id) => { delete leaderboardRows[id]; });
+        frame.updated.forEach((row) => { leaderboardRows[row.id] = row; });
+      } else {
+        return;
+      }
+      updateLeaderboard(Object.values(leaderboardRows).sort((a, b) => a.rank - b.rank).slice(0, 3));
+    };
+
+    function sendScore(type, score) {
+      if (socket.current && socket.current.readyState === WebSocket.OPEN) {
+        socket.current.send(JSON.stringify({ type, score }));
+      }
+    }
 
     const config = {
       type: Phaser.AUTO,
@@ -147,8 +169,6 @@ function GameMap() {
         callbackScope: this,
         loop: true,
       });
-
-      socket.current.on('leaderboardUpdate', updateLeaderboard);
     }
 
     function update() {
@@ -187,7 +207,7 @@ function GameMap() {
         currentReward *= 2; // Double the reward for next round
         scoreText.setText(`ETH: ${score}`);
         instructionsText.setText(`Arrow keys to move. Reach the top to win ${currentReward} ETH! Round ${currentRound}`);
-        socket.current.emit('scoreUpdate', score);
+        sendScore('scoreUpdate', score);
         player.setPosition(window.innerWidth/2, window.innerHeight-50);
       }
     }
@@ -196,7 +216,7 @@ function GameMap() {
       // Game over when hit by car
       timerEvent.remove();
       this.scene.pause();
-      socket.current.emit('gameOver', score);
+      sendScore('gameOver', score);
       missedText.setText('GAME OVER! Final Score: ' + score + ' ETH');
     }
 
@@ -224,11 +244,14 @@ function GameMap() {
       if (timeRemaining <= 0) {
         timerEvent.remove();
         this.scene.pause();
-        socket.current.emit('gameOver', score);
+        sendScore('gameOver', score);
       }
     }
 
     function updateLeaderboard(leaderboard) {
+      if (!leaderboardText) {
+        return;
+      }
       let leaderboardDisplay = 'Whale Watch:\n';
       leaderboard.forEach((player, idx) => {
         leaderboardDisplay += `${idx + 1}. ${player.name}: ${player.score} ETH\n`;
@@ -241,7 +264,7 @@ function GameMap() {
         gameInstance.current.destroy(true);
       }
       if (socket.current) {
-        socket.current.disconnect();
+        socket.current.close();
       }
     };
   }, []);
@@ -24,11 +24,11 @@ function Leaderboard() {
           </tr>
         </thead>
         <tbody>
-          {leaderboard.map((player, index) => (
+          {leaderboard.map((player) => (
             <tr key={player.id} className="border-t">
-              <td className="px-4 py-2">{index + 1}</td>
+              <td className="px-4 py-2">{player.rank}</td>
               <td className="px-4 py-2">{player.name}</td>
-              <td className="px-4 py-2">{player.goldCollected}</td>
+              <td className="px-4 py-2">{player.score}</td>
             </tr>
           ))}
         </tbody>
@@ -1,6 +1,10 @@
 export async function getPlayerStats() {
   try {
-    const response = await fetch('/api/player/stats');
+    const response = await fetch('http://localhost:8000/api/player/stats', {
+      headers: {
+        'Authorization': `Bearer ${localStorage.getItem('token')}`
+      }
+    });
     const data = await response.json();
     return data;
   } catch (error) {
@@ -15,9 +19,9 @@ export async function getPlayerStats() {
 
 export async function getLeaderboardData() {
   try {
-    const response = await fetch('/api/leaderboard');
+    const response = await fetch('http://localhost:8000/api/leaderboard');
     const data = await response.json();
-    return data;
+    return data.entries;
   } catch (error) {
     console.error('Error fetching leaderboard data:', error);
     return [];